@@ -18,6 +18,7 @@ import os, json, time, uuid, random, datetime, traceback, math
 from typing import Dict, Any, Iterable, Optional
 
 from tt_client import TastytradeAuth, TastytradeClient
+from utils.dates import days_until
 ACCOUNT_NUMBER = os.getenv("TASTYTRADE_ACCOUNT_NUMBER")
 
 # — Initialize Tastytrade API Client —
@@ -89,12 +90,7 @@ def fetch_iv_rank(symbol: str) -> Optional[float]:
 
 # ---- LIVE chain helpers ----
 def _days_until(date_str: str) -> Optional[int]:
-    try:
-        y,m,d = [int(x) for x in date_str.split("-")]
-        dt = datetime.date(y,m,d)
-        return (dt - datetime.date.today()).days
-    except Exception:
-        return None
+    return days_until(date_str)
 
 def _as_float(d: dict, *keys, default=None) -> Optional[float]:
     for k in keys:
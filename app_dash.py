@@ -8,9 +8,11 @@ from utils import (
     graduation,
     coaching_engine,
     scaling,
+    sizing,
     filters,
     profits,
     discipline_ai,
+    projection,
     preferences,
     broker,
 )
@@ -31,10 +33,16 @@ def get_enriched_session():
     session["preferences"] = prefs
 
     # Journal & graduation
-    trades = journal.load_all_trades(JOURNAL_PATH)
+    # One cached, read-only view shared by every builder in this render
+    trades = journal.load_trades_cached(JOURNAL_PATH)
+    records = journal.load_trade_records(JOURNAL_PATH)
     session["trades"] = trades
-    grad = graduation.check_graduation()
+    session["records"] = records
+    session["journal_path"] = JOURNAL_PATH
+    grad = graduation.check_graduation(path=JOURNAL_PATH)
     session["graduation"] = grad
+    if not grad.get("graduated"):
+        session["graduation_eta"] = projection.project_graduation(JOURNAL_PATH, prefs)
 
     # Default broker info
     session["broker"] = {"status": "❌ Not connected", "accounts": [], "positions": []}
@@ -73,16 +81,17 @@ def get_enriched_session():
         session["mode"] = "SIM"
         session["broker"]["status"] = "🔒 Graduation lock — broker disabled"
 
-    # Expectancy
+    # Expectancy over all trades, the definition the graduation verdict uses
+    # (the graduation tracker's running stats; no rescan unless the journal changed)
     try:
-        exp = profits.calculate_expectancy(trades)
+        exp = graduation.load_tracker(JOURNAL_PATH).expectancy.as_dict()
         session["expectancy"] = exp
     except Exception:
         session["expectancy"] = {"expectancy": 0, "win_rate": 0}
 
-    # Discipline AI
+    # Discipline AI (persisted habit state, no rescan unless the journal changed)
     try:
-        da = discipline_ai.evaluate(trades, prefs)
+        da = discipline_ai.evaluate_journal(JOURNAL_PATH)
         session["discipline_ai"] = da
     except Exception:
         session["discipline_ai"] = {"messages": ["⚠️ Discipline AI unavailable"], "score": 0}
@@ -168,15 +177,29 @@ def build_graduation(session):
             items.append(html.P(f"🚧 LIVE locked → {sandbox_ready['reason']}"))
     else:
         items.append(html.P("🚧 Graduation not yet passed."))
+        eta = session.get("graduation_eta")
+        if eta:
+            items.append(html.P(eta["message"]))
 
     items.append(html.P(msg))
+
+    ci = grad.get("confidence")
+    if ci and ci.get("n_trades"):
+        level = int(ci["confidence"] * 100)
+        exp_ci, win_ci = ci["expectancy"], ci["win_rate"]
+        items.append(html.P(
+            f"📐 {level}% CI → Expectancy [{exp_ci['low']:.2f}, {exp_ci['high']:.2f}] | "
+            f"Win Rate [{win_ci['low']:.1f}%, {win_ci['high']:.1f}%]"
+        ))
     return html.Div(items)
 
 def build_coaching(session):
     return html.Div([html.P(m) for m in coaching_engine.generate(session).get("messages", [])])
 
 def build_scaling(session):
-    return html.Div([html.P(m) for m in scaling.check_allocation(session).get("messages", [])])
+    messages = scaling.check_allocation(session).get("messages", [])
+    messages += sizing.recommend(session).get("messages", [])
+    return html.Div([html.P(m) for m in messages])
 
 def build_filters(session):
     return html.Div([html.P(m) for m in filters.check_market_conditions(session).get("messages", [])])
@@ -16,7 +16,7 @@ def launch(prefs: dict, broker: object):
     while True:
         # Reload portfolio + journal + marketdata each cycle
         port = portfolio.load_portfolio()
-        trades = journal.load_trades("trade_journal.json")
+        trades = journal.load_trades_cached("trade_journal.json")
         mdata = marketdata.fetch_market_snapshot(port)
 
         # Run analytics
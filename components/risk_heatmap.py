@@ -6,11 +6,13 @@ Visual Portfolio Risk Heatmaps
 - Capital concentration by ticker
 - Expiration concentration by week
 - Contract type exposure (calls vs puts)
+- Journal PnL by symbol × strategy (attribution cube)
 """
 
 import matplotlib.pyplot as plt
 from collections import Counter
-from datetime import datetime
+from utils.attribution import load_cube
+from utils.dates import iso_week
 from utils.portfolio import get_portfolio_positions
 
 
@@ -31,13 +33,7 @@ def plot_capital_concentration(portfolio):
 def plot_expiration_clusters(portfolio):
     """Bar chart of contracts expiring by week."""
     expirations = [p.get("expiry") for p in portfolio if p.get("expiry")]
-    weeks = []
-    for exp in expirations:
-        try:
-            dt = datetime.strptime(exp, "%Y-%m-%d")
-            weeks.append(dt.isocalendar()[1])
-        except Exception:
-            continue
+    weeks = [w for w in map(iso_week, expirations) if w is not None]
 
     week_counts = Counter(weeks)
 
@@ -61,14 +57,37 @@ def plot_contract_type_exposure(portfolio):
     plt.show()
 
 
-def show_risk_heatmaps():
+def plot_strategy_attribution(cube):
+    """Heatmap of journal PnL by symbol × normalized strategy, read from the attribution cube."""
+    cells = cube.rollup("symbol", "strategy")
+    symbols = sorted({sym for sym, _ in cells if sym})
+    strategies = sorted({strat for _, strat in cells if strat})
+    if not symbols or not strategies:
+        print("No journal trades available for the attribution heatmap.")
+        return
+
+    grid = [[cells.get((sym, strat), {}).get("pnl", 0) for strat in strategies] for sym in symbols]
+
+    plt.figure(figsize=(6,4))
+    plt.imshow(grid, cmap="RdYlGn", aspect="auto")
+    plt.colorbar(label="PnL ($)")
+    plt.xticks(range(len(strategies)), strategies, rotation=45)
+    plt.yticks(range(len(symbols)), symbols)
+    plt.title("Journal PnL by Symbol × Strategy")
+    plt.tight_layout()
+    plt.show()
+
+
+def show_risk_heatmaps(journal_path=None):
     """Convenience function to show all risk views."""
     portfolio = get_portfolio_positions()
 
     if not portfolio:
         print("No portfolio positions available for risk heatmaps.")
-        return
+    else:
+        plot_capital_concentration(portfolio)
+        plot_expiration_clusters(portfolio)
+        plot_contract_type_exposure(portfolio)
 
-    plot_capital_concentration(portfolio)
-    plot_expiration_clusters(portfolio)
-    plot_contract_type_exposure(portfolio)
+    if journal_path:
+        plot_strategy_attribution(load_cube(journal_path))
@@ -5,30 +5,36 @@ CLI tool for logging trades into trade_journal.json
 Supports:
   - Adding new trades
   - Closing trades with realized PnL
+
+Writes go to the append-only JSONL journal (trade_journal.jsonl), which is
+migrated from trade_journal.json on first use.
 """
 
-import json
 import os
 import datetime
 
+from utils import journal, discipline_ai, expectancy, graduation
+
 JOURNAL_PATH = "trade_journal.json"
 
+# Keep the persisted expectancy, habit and graduation state next to the journal
+# current on every append/close, so the dashboard process reads it without a rescan
+journal.subscribe(expectancy.on_journal_event)
+journal.subscribe(discipline_ai.on_journal_event)
+journal.subscribe(graduation.on_journal_event)
+
 
 def load_journal():
-    """Load the current journal or start a new one."""
-    if not os.path.exists(JOURNAL_PATH):
-        return []
+    """Load the current journal sessions or start a new one."""
     try:
-        with open(JOURNAL_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return journal.load_sessions(JOURNAL_PATH)
     except Exception:
         return []
 
 
 def save_journal(entries):
-    """Save journal back to file."""
-    with open(JOURNAL_PATH, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2)
+    """Rewrite the whole journal (only needed for bulk edits)."""
+    journal.save_trades(JOURNAL_PATH, entries)
 
 
 def add_trade():
@@ -71,12 +77,11 @@ def add_trade():
         "notes": notes
     }
 
-    # Load journal
-    entries = load_journal()
+    path = journal.migrate_to_jsonl(JOURNAL_PATH)
 
     # If no sessions exist, create one
-    if not entries:
-        session = {
+    if os.path.getsize(path) == 0:
+        journal.append_session(path, {
             "timestamp": datetime.datetime.now().isoformat(),
             "mode": "SIM",
             "session_audit": {
@@ -86,14 +91,10 @@ def add_trade():
                 "graduation": "❌ SIM Only — not eligible for LIVE",
                 "expectancy_report": {}
             },
-            "trades": []
-        }
-        entries.append(session)
+        })
 
     # Append to most recent session
-    entries[-1]["trades"].append(trade)
-
-    save_journal(entries)
+    journal.append_trade(path, trade)
     print(f"✅ Trade {trade_id} added to journal.")
 
 
@@ -126,12 +127,12 @@ def close_trade():
     exit_price = float(input("Enter exit price (credit/debit): ").strip())
     realized = (trade["entry_price"] - exit_price) * trade["contracts"] * 100  # per-contract multiplier
 
-    trade["status"] = "CLOSED"
-    trade["exit_price"] = exit_price
-    trade["realized"] = realized
-    trade["closed_at"] = datetime.datetime.now().isoformat()
-
-    save_journal(entries)
+    journal.update_trade(JOURNAL_PATH, trade["id"], {
+        "status": "CLOSED",
+        "exit_price": exit_price,
+        "realized": realized,
+        "closed_at": datetime.datetime.now().isoformat(),
+    })
 
     result = "✅ WIN" if realized > 0 else "❌ LOSS"
     print(f"{result}: Closed {trade['symbol']} {trade['type']} for {realized:.2f}.")
@@ -11,6 +11,12 @@ TESTS = [
     ("Broker", os.path.join(BASE_DIR, "test_broker.py")),
     ("Graduation", os.path.join(BASE_DIR, "test_graduation.py")),
     ("Journal", os.path.join(BASE_DIR, "test_journal.py")),
+    ("Trade", os.path.join(BASE_DIR, "test_trade.py")),
+    ("TradeTable", os.path.join(BASE_DIR, "test_trade_table.py")),
+    ("Expectancy", os.path.join(BASE_DIR, "test_expectancy.py")),
+    ("MonteCarlo", os.path.join(BASE_DIR, "test_montecarlo.py")),
+    ("Equity", os.path.join(BASE_DIR, "test_equity.py")),
+    ("Replay", os.path.join(BASE_DIR, "test_replay.py")),
     ("Scaling", os.path.join(BASE_DIR, "test_scaling.py")),
     ("Filters", os.path.join(BASE_DIR, "test_filters.py")),
     ("Profits", os.path.join(BASE_DIR, "test_profits.py")),
@@ -1,7 +1,7 @@
-import sys, os, datetime
+import sys, os, datetime, tempfile
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from utils import discipline_ai
+from utils import discipline_ai, journal
 
 today = datetime.date.today().strftime("%Y-%m-%d")
 
@@ -22,6 +22,96 @@ def test_revenge_trading_flagged():
     result = discipline_ai.analyze_habits(journal)
     assert any("revenge" in m.lower() for m in result["messages"])
 
+def test_rules_share_one_pass():
+    journal = [
+        {"date": today, "symbol": "SPY", "pnl": -150, "max_loss": 100},
+        {"date": today, "symbol": "SPY", "pnl": 40, "max_loss": 100},
+        {"date": "2025-01-02", "symbol": "QQQ", "pnl": 10, "max_loss": 100},
+    ]
+    state = discipline_ai.build_state(journal)
+    assert state.trades == 3 and state.revenge == 1 and state.stop_violations == 1
+    messages = discipline_ai.report(state)["messages"]
+    assert messages == discipline_ai.analyze_habits(journal)["messages"]
+    assert any("1 session(s) were clean" in m for m in messages)
+
+    # A new rule only declares what it reads; unused accumulators are skipped
+    losers = discipline_ai.HabitRule(
+        "losers", ("stop_violations",), lambda st, day: [f"{st.stop_violations} blown stop(s)"]
+    )
+    lean = discipline_ai.build_state(journal, rules=(losers,))
+    assert lean.stop_violations == 1 and lean.symbol_counts == {} and lean.day_trades == {}
+    assert discipline_ai.analyze_habits(journal, rules=(losers,))["messages"] == ["1 blown stop(s)"]
+
+def test_incremental_state_follows_journal():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [{"id": 1, "date": today, "symbol": "SPY", "pnl": 20, "max_loss": 100, "status": "CLOSED"}])
+        journal.subscribe(discipline_ai.on_journal_event)
+        try:
+            discipline_ai.HabitTracker.load(path)
+            journal.append_trade(path, {"id": 2, "date": today, "symbol": "SPY", "pnl": 0, "max_loss": 100, "status": "OPEN"})
+            journal.append_trade(path, {"id": 3, "date": today, "symbol": "QQQ", "pnl": 10, "max_loss": 100, "status": "CLOSED"})
+            journal.update_trade(path, 2, {"status": "CLOSED", "pnl": -150})
+        finally:
+            journal.unsubscribe(discipline_ai.on_journal_event)
+
+        # Persisted state is current, so loading it needs no rescan
+        tracker = discipline_ai.HabitTracker._read(path)
+        assert tracker.version == journal.journal_version(path)
+        assert tracker.state.revenge == 1 and tracker.state.stop_violations == 1
+        assert tracker.verify() == {}
+        full = discipline_ai.analyze_habits(journal.load_trade_records(path))
+        assert discipline_ai.evaluate_journal(path, verify=True) == full
+        assert any("overtrading" in m for m in full["messages"])
+
+def test_reads_do_not_persist_and_reused_ids_supersede():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [{"id": 1, "date": today, "symbol": "SPY", "pnl": -50, "max_loss": 100, "status": "CLOSED"}])
+        state_file = discipline_ai.HabitTracker.state_path(path)
+        discipline_ai.evaluate_journal(path)
+        discipline_ai.check_alerts({"journal_path": path})
+        assert not os.path.exists(state_file)
+
+        journal.subscribe(discipline_ai.on_journal_event)
+        try:
+            journal.append_trade(path, {"id": 2, "date": today, "symbol": "SPY", "pnl": 0, "max_loss": 100, "status": "OPEN"})
+            # Same id again: the JSONL journal supersedes the open record
+            journal.append_trade(path, {"id": 2, "date": today, "symbol": "QQQ", "pnl": -200, "max_loss": 100, "status": "CLOSED"})
+        finally:
+            journal.unsubscribe(discipline_ai.on_journal_event)
+
+        tracker = discipline_ai.HabitTracker._read(path)
+        assert tracker.version == journal.journal_version(path)
+        assert tracker.state.trades == 2 and tracker.state.symbol_counts == {"SPY": 1, "QQQ": 1}
+        assert tracker.verify() == {}
+
+def test_past_days_settle_into_clean_tally():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [
+            {"id": i, "date": f"2025-02-{i + 1:02d}", "symbol": "SPY", "pnl": -150 if i == 3 else 10, "max_loss": 100, "status": "CLOSED"}
+            for i in range(20)
+        ])
+        journal.subscribe(discipline_ai.on_journal_event)
+        try:
+            journal.append_trade(path, {"id": 20, "date": "2025-01-15", "symbol": "SPY", "pnl": 0, "max_loss": 100, "status": "OPEN"})
+            journal.append_trade(path, {"id": 21, "date": today, "symbol": "QQQ", "pnl": 5, "max_loss": 100, "status": "CLOSED"})
+            tracker = discipline_ai.HabitTracker._read(path)
+            # Only today and the open trade's day keep per-day counts
+            assert set(tracker.state.day_trades) == {datetime.date(2025, 1, 15).toordinal(), datetime.date.today().toordinal()}
+            assert tracker.state.clean_sessions() == 21 and tracker.verify() == {}
+            # Closing the open trade settles its day; a back-dated append rebuilds
+            journal.update_trade(path, 20, {"status": "CLOSED", "pnl": -150})
+            journal.append_trade(path, {"id": 22, "date": "2025-02-02", "symbol": "SPY", "pnl": -150, "max_loss": 100, "status": "CLOSED"})
+        finally:
+            journal.unsubscribe(discipline_ai.on_journal_event)
+
+        tracker = discipline_ai.HabitTracker._read(path)
+        assert tracker.version == journal.journal_version(path)
+        assert set(tracker.state.day_trades) == {datetime.date.today().toordinal()}
+        assert tracker.state.clean_sessions() == 19 and tracker.verify() == {}
+
 if __name__ == "__main__":
     try:
         test_overtrading_flagged()
@@ -34,3 +124,27 @@ if __name__ == "__main__":
         print("[PASS] Revenge trading flagged")
     except AssertionError:
         print("[FAIL] Revenge trading not flagged")
+
+    try:
+        test_rules_share_one_pass()
+        print("[PASS] Habit rules share one pass")
+    except AssertionError:
+        print("[FAIL] Habit rules share one pass")
+
+    try:
+        test_incremental_state_follows_journal()
+        print("[PASS] Incremental habit state follows journal")
+    except AssertionError:
+        print("[FAIL] Incremental habit state follows journal")
+
+    try:
+        test_reads_do_not_persist_and_reused_ids_supersede()
+        print("[PASS] Habit reads do not persist; reused ids supersede")
+    except AssertionError:
+        print("[FAIL] Habit reads do not persist; reused ids supersede")
+
+    try:
+        test_past_days_settle_into_clean_tally()
+        print("[PASS] Past days settle into the clean-session tally")
+    except AssertionError:
+        print("[FAIL] Past days settle into the clean-session tally")
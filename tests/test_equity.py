@@ -0,0 +1,62 @@
+import sys, os, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from utils import equity, journal
+from utils.equity import EquityCurve
+
+PNL = [5, -10, 3, 4, 8, -2]
+
+
+def test_drawdown_and_underwater():
+    curve = EquityCurve().extend(PNL, dates=[f"2025-03-0{i + 1}" for i in range(6)], symbols=["SPY", "QQQ"] * 3)
+    assert list(curve.equity) == [5, -5, -2, 2, 10, 8]
+    dd = curve.max_drawdown()
+    assert dd["amount"] == 10 and dd["peak"] == 0 and dd["trough"] == 1 and dd["recovery_trades"] == 3
+    assert dd["pct"] is None  # no account size to take a percentage of
+    funded = EquityCurve(1000).extend([100, -130]).max_drawdown()
+    assert funded["amount"] == 130 and abs(funded["pct"] - 130 / 1100 * 100) < 1e-9
+    uw = curve.underwater()
+    assert uw["longest_trades"] == 3 and uw["longest_days"] == 4 and uw["current_trades"] == 1
+    per_symbol = curve.per_symbol()
+    assert per_symbol["SPY"]["total"] == 16 and per_symbol["QQQ"]["max_drawdown"] == 10
+
+
+def test_incremental_extend_matches_bulk():
+    pnl = np.random.default_rng(3).normal(0.5, 20, 5000)
+    bulk = EquityCurve(1000).extend(pnl)
+    parts = EquityCurve(1000)
+    for chunk in np.array_split(pnl, 7):
+        parts.extend(chunk)
+    assert np.allclose(bulk.peak, parts.peak)
+    a, b = bulk.max_drawdown(), parts.max_drawdown()
+    assert abs(a["amount"] - b["amount"]) < 1e-6 and a["trough"] == b["trough"]
+
+
+def test_journal_curve_follows_appends():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [{"id": i, "symbol": "SPY", "pnl": p} for i, p in enumerate(PNL)])
+        curve = equity.load_equity(path)
+        assert equity.load_equity(path) is curve  # reused until the journal changes
+        journal.append_trade(path, {"id": 10, "symbol": "IWM", "pnl": -20})
+        curve = equity.load_equity(path)
+        assert len(curve) == 7 and curve.max_drawdown()["amount"] == 22
+
+
+def main():
+    for name, fn in [
+        ("Drawdown and underwater stretch", test_drawdown_and_underwater),
+        ("Incremental extend matches bulk", test_incremental_extend_matches_bulk),
+        ("Journal curve follows appends", test_journal_curve_follows_appends),
+    ]:
+        try:
+            fn()
+            print(f"[PASS] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import sys, os, json, statistics, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils import analytics, journal, profits
+from utils.analytics import AnalyticsEngine, RollingExpectancy
+from utils.bootstrap import bootstrap_ci
+from utils.expectancy import ExpectancyAccumulator, compute_expectancy, on_journal_event
+
+TRADES = [{"pnl": p} for p in (120, -80, 0, 45, -30, 60, 0, -100)]
+
+
+def test_single_pass_stats():
+    stats = compute_expectancy(iter(TRADES))
+    pnls = [t["pnl"] for t in TRADES]
+    assert stats.count == 8 and stats.wins == 3 and stats.losses == 3 and stats.breakevens == 2
+    assert abs(stats.expectancy - statistics.mean(pnls)) < 1e-9
+    assert abs(stats.variance - statistics.variance(pnls)) < 1e-9
+    assert abs(stats.payoff_ratio - (225 / 3) / (210 / 3)) < 1e-9
+
+
+def test_call_sites_agree():
+    a = analytics.calculate_expectancy(TRADES)
+    p = profits.calculate_expectancy(TRADES)
+    e = AnalyticsEngine({})._calculate_expectancy(TRADES)
+    assert a == p == e
+    decomposed = a["win_rate"] / 100 * a["avg_win"] - a["loss_rate"] / 100 * a["avg_loss"]
+    assert abs(decomposed - a["expectancy"]) < 1e-9
+
+
+def test_empty():
+    stats = compute_expectancy([]).as_dict()
+    assert stats["expectancy"] == 0 and stats["win_rate"] == 0 and stats["variance"] == 0
+
+
+def test_accumulator_tracks_appends_and_rebuilds():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [{"id": 1, "pnl": 40}, {"id": 2, "pnl": -10}])
+        journal.subscribe(on_journal_event)
+        try:
+            assert ExpectancyAccumulator.load(path).stats.count == 2
+            assert not os.path.exists(ExpectancyAccumulator.state_path(path))  # reads never write
+            journal.append_trade(path, {"id": 3, "symbol": "SPY", "status": "OPEN"})
+            journal.update_trade(path, 3, {"status": "CLOSED", "realized": 30})
+            acc = ExpectancyAccumulator._read(path)
+            assert acc.stats.count == 3 and abs(acc.stats.expectancy - 20) < 1e-9
+
+            # Out-of-band edit: accumulator notices the version change and rebuilds
+            target = journal.resolve_journal_path(path)
+            with open(target, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": 4, "pnl": 100}) + "\n")
+            assert ExpectancyAccumulator.load(path).stats.count == 4
+
+            # Re-appending an existing id supersedes it instead of counting it twice
+            journal.append_trade(path, {"id": 2, "pnl": 50})
+            journal.append_trade(path, {"id": 5, "pnl": 10})
+            acc = ExpectancyAccumulator._read(path)
+            closed = [t for t in journal.load_all_trades(path) if t.get("pnl") is not None or t.get("realized")]
+            assert acc.stats.count == len(closed) == 5 and acc.version == journal.journal_version(path)
+            assert abs(acc.stats.total_pnl - (40 + 50 + 30 + 100 + 10)) < 1e-9
+        finally:
+            journal.unsubscribe(on_journal_event)
+
+
+def test_rolling_expectancy_weights_recent_trades():
+    trades = [{"symbol": "SPY", "pnl": -50, "max_loss": 100}] * 5 + [{"symbol": "SPY", "pnl": 80, "max_loss": 100}] * 5
+    trades.append({"symbol": "QQQ", "pnl": -300, "max_loss": 100})
+    report = RollingExpectancy(half_life=2).update_many(trades).report()
+    assert report["SPY"]["expectancy"] > 15  # plain mean is 15
+    assert report["SPY"]["realized"] == 150 and report["SPY"]["status"] == "ok"
+    assert report["QQQ"]["status"] == "block_new" and report["QQQ"]["discipline_gap"] == 100
+
+
+def test_bootstrap_ci_brackets_estimate():
+    pnls = [t["pnl"] for t in TRADES] * 10
+    ci = bootstrap_ci(pnls, n_resamples=2000, seed=7, max_chunk_cells=500)
+    for key in ("expectancy", "win_rate"):
+        assert ci[key]["low"] <= ci[key]["estimate"] <= ci[key]["high"]
+    assert abs(ci["expectancy"]["estimate"] - statistics.mean(pnls)) < 1e-9
+    # Chunking and seeding are deterministic
+    assert bootstrap_ci(pnls, n_resamples=2000, seed=7, max_chunk_cells=500) == ci
+    assert bootstrap_ci(pnls, n_resamples=2000, seed=7, max_chunk_cells=500, workers=2) == ci
+    assert bootstrap_ci([])["n_trades"] == 0
+
+
+def main():
+    for name, fn in [
+        ("Single-pass expectancy statistics", test_single_pass_stats),
+        ("All expectancy call sites agree", test_call_sites_agree),
+        ("Empty journal expectancy", test_empty),
+        ("Accumulator tracks appends and rebuilds", test_accumulator_tracks_appends_and_rebuilds),
+        ("Rolling expectancy weights recent trades", test_rolling_expectancy_weights_recent_trades),
+        ("Bootstrap CI brackets the estimate", test_bootstrap_ci_brackets_estimate),
+    ]:
+        try:
+            fn()
+            print(f"[PASS] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-import sys, os
+import sys, os, datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from utils import filters
+from utils import dates, filters
 
 
 def test_high_vix_blocks_trade():
@@ -16,6 +16,18 @@ def test_normal_conditions_allow_trade():
     assert result["compliant"] is True
 
 
+def test_earnings_window_uses_shared_dates():
+    soon = (datetime.date.today() + datetime.timedelta(days=2)).isoformat()
+    market = {"symbols": {"AAPL": {"earnings_date": soon}, "MSFT": {"earnings_date": "not-a-date"}}}
+    result = filters.check_filters(market, events=[], vix=18)
+    assert result["compliant"] is False and sum("earnings" in m for m in result["messages"]) == 1
+    column = dates.to_datetime64(["2025-01-02", None, "bad", "2025-01-02T09:30"])
+    assert str(column[0]) == str(column[3]) == "2025-01-02" and str(column[1]) == str(column[2]) == "NaT"
+    # Non-zero-padded dates still parse, as the old split("-") helpers allowed
+    assert dates.to_date("2025-3-7") == datetime.date(2025, 3, 7)
+    assert dates.days_until("2025-3-7", today=datetime.date(2025, 3, 1)) == 6
+
+
 def main():
     try:
         test_high_vix_blocks_trade()
@@ -29,6 +41,12 @@ def main():
     except AssertionError:
         print("[FAIL] Normal conditions incorrectly blocked")
 
+    try:
+        test_earnings_window_uses_shared_dates()
+        print("[PASS] Earnings window blocked trade")
+    except AssertionError:
+        print("[FAIL] Earnings window not blocked")
+
 
 if __name__ == "__main__":
     main()
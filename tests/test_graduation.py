@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
-import sys, os
+import sys, os, tempfile
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils import graduation
+from utils import graduation, journal, projection
+from utils.analytics import calculate_expectancy
 from utils.broker import BrokerSession, broker_status
-from app_dash import get_enriched_session
+from app_dash import JOURNAL_PATH, get_enriched_session
 
 TEST_RESULTS = {"pass": 0, "fail": 0}
 
@@ -55,6 +56,69 @@ def main():
     grad_pass = graduation.check_graduation(session=pass_session, test_mode=True)
     record_result(grad_pass.get("graduated", False), "Pass case accepted")
 
+    # --- Incremental tracker matches a full recompute ---
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [
+            {"id": i, "date": f"2025-01-{i % 5 + 1:02d}", "pnl": p, "max_loss": 100}
+            for i, p in enumerate([50, -20, -30, -150, 80, 10, -5, -5, -5, 40, 25, -60])
+        ])
+        journal.subscribe(graduation.on_journal_event)
+        try:
+            tracker = graduation.load_tracker(path)
+            record_result(tracker.verify() == {}, "GraduationTracker matches full recompute")
+            journal.append_trade(path, {"id": 99, "date": "2025-01-09", "pnl": 30})
+            tracker = graduation.load_tracker(path)
+            record_result(tracker.count == 13 and tracker.verify() == {}, "GraduationTracker absorbs appends")
+            journal.update_trade(path, 3, {"pnl": -20})
+            tracker = graduation.load_tracker(path)
+            record_result(tracker.clean == 5 and tracker.verify() == {}, "GraduationTracker rebuilds after update")
+            # Open trades count toward expectancy and win rate, as calculate_expectancy(trades) does
+            journal.append_trade(path, {"id": 100, "date": "2025-01-10", "status": "OPEN"})
+            tracker = graduation.load_tracker(path)
+            baseline = calculate_expectancy(journal.load_all_trades(path))
+            record_result(
+                tracker.metrics()["expectancy"] == baseline["expectancy"]
+                and tracker.metrics()["win_rate"] == baseline["win_rate"] and tracker.verify() == {},
+                "Graduation expectancy covers all trades",
+            )
+            # Timestamped dates share their calendar day's session
+            journal.append_trade(path, {"id": 101, "date": "2025-01-11T09:30", "pnl": 10, "max_loss": 100})
+            journal.append_trade(path, {"id": 102, "date": "2025-01-11T14:00", "pnl": -150, "max_loss": 100})
+            tracker = graduation.load_tracker(path)
+            record_result(tracker.verify() == {}, "GraduationTracker keys timestamped dates by day")
+            # A reader process picks up the state the writer persisted, without rescanning
+            journal.append_trade(path, {"id": 103, "date": "2025-01-12", "pnl": 15, "max_loss": 100})
+            journal.clear_trade_cache()
+            rebuild, rebuilds = graduation.GraduationTracker.rebuild, []
+            graduation.GraduationTracker.rebuild = classmethod(lambda cls, p, save=True: rebuilds.append(p) or rebuild(p, save))
+            try:
+                persisted = graduation.load_tracker(path)
+            finally:
+                graduation.GraduationTracker.rebuild = rebuild
+            record_result(
+                not rebuilds and persisted.count == 17 and persisted.verify() == {},
+                "GraduationTracker state persists across processes",
+            )
+            # Back-dated trades fall outside the persisted day and trigger a rebuild
+            journal.append_trade(path, {"id": 104, "date": "2025-01-02", "pnl": -150, "max_loss": 100})
+            journal.clear_trade_cache()
+            tracker = graduation.load_tracker(path)
+            record_result(tracker.count == 18 and tracker.verify() == {}, "GraduationTracker rebuilds on back-dated trades")
+        finally:
+            journal.unsubscribe(graduation.on_journal_event)
+        metrics = dict(tracker.metrics(), trades=30, clean_sessions=20, loss_streak=0, win_rate=60, expectancy=5)
+        verdict = graduation.evaluate_graduation(metrics, {"graduation": {"min_trades": 25, "clean_sessions": 15}})
+        record_result(verdict["graduated"], "Pure criteria accept passing metrics")
+
+        # --- Graduation ETA projection ---
+        prefs = {"graduation": {"min_trades": 20, "clean_sessions": 6, "min_win_rate": 40}}
+        eta = projection.project_graduation(path, prefs, n_paths=500, horizon=120)
+        needed = eta.get("trades_needed", {})
+        record_result(0 < eta["probability"] <= 1 and needed[10] <= needed[50] <= needed[90], "Projection yields ordered ETA distribution")
+        again = projection.project_graduation(path, prefs, n_paths=500, horizon=120)
+        record_result(again["eta"] == eta["eta"], "Projection is deterministic per journal version")
+
     # --- Broker gate after graduation (only if creds exist) ---
     broker = BrokerSession(paper=True, base_url="https://api.cert.tastyworks.com")
     if os.getenv("BROKER_SANDBOX_USER") and os.getenv("BROKER_SANDBOX_PASS"):
@@ -88,6 +152,12 @@ def main():
     session = get_enriched_session()
     record_result(session.get("mode") in ["SIM", "SANDBOX", "LIVE"], f"Valid mode -> {session.get('mode')}")
     record_result("discipline_ai" in session, "Discipline AI included")
+    grad_metrics = graduation.load_tracker(JOURNAL_PATH).metrics()
+    record_result(
+        session["expectancy"]["expectancy"] == grad_metrics["expectancy"]
+        and session["expectancy"]["win_rate"] == grad_metrics["win_rate"],
+        "Expectancy card matches the graduation verdict's expectancy",
+    )
 
     print_summary("Graduation + Sandbox Test Harness", TEST_RESULTS)
 
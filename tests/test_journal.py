@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
+import json
+import tempfile
 from utils import journal
 
 
@@ -65,6 +67,196 @@ def main():
     else:
         print("[FAIL] Broker info included in session")
 
+    # ---- Append-only JSONL journal ----
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "trade_journal.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([{"mode": "SIM", "trades": [{"id": "a", "symbol": "SPY", "status": "OPEN"}]}], f)
+
+        journal.append_trade(legacy, {"id": "b", "symbol": "QQQ", "status": "OPEN"})
+        journal.update_trade(legacy, "a", {"status": "CLOSED", "realized": 120})
+        trades = journal.load_all_trades(legacy)
+        sessions = journal.load_sessions(legacy)
+        if (
+            [t["id"] for t in trades] == ["a", "b"]
+            and trades[0]["status"] == "CLOSED"
+            and len(sessions) == 1 and sessions[0]["mode"] == "SIM"
+        ):
+            print("[PASS] JSONL migration, append and update")
+        else:
+            print("[FAIL] JSONL migration, append and update")
+
+        if journal.get_trade(legacy, "a").get("realized") == 120:
+            print("[PASS] JSONL offset index lookup")
+        else:
+            print("[FAIL] JSONL offset index lookup")
+
+        os.remove(journal.index_path(legacy))
+        if journal.get_trade(legacy, "b").get("symbol") == "QQQ":
+            print("[PASS] JSONL index rebuilt when missing")
+        else:
+            print("[FAIL] JSONL index rebuilt when missing")
+
+        # Appends and updates patch the in-memory index instead of re-reading the sidecar
+        reads = []
+        read_index = journal._read_index
+        journal._read_index = lambda p: reads.append(p) or read_index(p)
+        try:
+            journal.get_trade(legacy, "a")
+            for i in range(50):
+                journal.append_trade(legacy, {"id": f"n{i}", "symbol": "SPY", "status": "OPEN"})
+                journal.update_trade(legacy, f"n{i}", {"status": "CLOSED", "pnl": i})
+        finally:
+            journal._read_index = read_index
+        if not reads and journal.get_trade(legacy, "n49")["pnl"] == 49 and set(journal._read_index(journal.jsonl_path(legacy))) >= {"a", "b", "n49"}:
+            print("[PASS] JSONL appends reuse the in-memory index")
+        else:
+            print(f"[FAIL] JSONL appends reuse the in-memory index ({len(reads)} sidecar reads)")
+
+    # ---- SQLite backend ----
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "trade_journal.db")
+        journal.save_trades(db, [
+            {"mode": "SIM", "trades": [
+                {"id": 1, "symbol": "SPY", "date": "2025-09-02", "closed_date": "2025-09-03", "pnl": 40},
+                {"id": 2, "symbol": "QQQ", "date": "2025-09-10", "status": "OPEN"},
+            ]},
+        ])
+        journal.append_trade(db, {"id": 3, "symbol": "SPY", "date": "2025-10-01", "status": "OPEN"})
+        journal.update_trade(db, 3, {"status": "CLOSED", "closed_date": "2025-10-02T14:00", "pnl": -15})
+
+        between = journal.trades_between(db, "2025-09-01", "2025-09-30")
+        spy = journal.by_symbol(db, "SPY")
+        still_open = journal.open_trades(db)
+        if (
+            [t["id"] for t in between] == [1]
+            and [t["id"] for t in spy] == [1, 3]
+            and [t["id"] for t in still_open] == [2]
+            and [t["id"] for t in journal.trades_between(db, "2025-10-02", "2025-10-02")] == [3]
+            and journal.load_sessions(db)[0]["mode"] == "SIM"
+        ):
+            print("[PASS] SQLite indexed queries")
+        else:
+            print("[FAIL] SQLite indexed queries")
+
+        exported = journal.export_journal(db, os.path.join(tmp, "export.json"))
+        if len(journal.load_all_trades(exported)) == 3:
+            print("[PASS] SQLite export to JSON")
+        else:
+            print("[FAIL] SQLite export to JSON")
+
+        # Loose trades keep their place between sessions
+        mixed = [
+            {"id": "x", "symbol": "SPY", "pnl": 1},
+            {"mode": "SIM", "trades": [{"id": "y", "symbol": "QQQ", "pnl": 2}]},
+            {"id": "z", "symbol": "IWM", "pnl": 3},
+            {"mode": "LIVE", "trades": []},
+        ]
+        shapes = lambda entries: [(e.get("mode"), [t["id"] for t in e["trades"]]) for e in entries]
+        mixed_db = os.path.join(tmp, "mixed.db")
+        journal.save_trades(mixed_db, mixed)
+        if shapes(journal.load_sessions(mixed_db)) == [(None, ["x"]), ("SIM", ["y"]), (None, ["z"]), ("LIVE", [])]:
+            print("[PASS] SQLite sessions keep stored interleaving")
+        else:
+            print("[FAIL] SQLite sessions keep stored interleaving")
+
+        # Timestamped dates match day bounds in every backend
+        stamped = [{"id": 1, "symbol": "SPY", "date": "2025-03-01T09:30", "pnl": 5}]
+        found = []
+        for name in ("stamped.json", "stamped.db"):
+            stamped_path = os.path.join(tmp, name)
+            journal.save_trades(stamped_path, stamped)
+            found.append([t["id"] for t in journal.trades_between(stamped_path, "2025-03-01", "2025-03-01", field="date")])
+        if found == [[1], [1]]:
+            print("[PASS] Date range queries trim timestamps to the day")
+        else:
+            print(f"[FAIL] Date range queries trim timestamps to the day ({found})")
+
+    # ---- Cached read-only view ----
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, [{"id": 1, "symbol": "SPY", "pnl": 10}])
+        first = journal.load_trades_cached(path)
+        second = journal.load_trades_cached(path)
+        journal.append_trade(path, {"id": 2, "symbol": "QQQ", "pnl": -5})
+        third = journal.load_trades_cached(path)
+        try:
+            first[0]["pnl"] = 0
+            read_only = False
+        except TypeError:
+            read_only = True
+        if first is second and len(third) == 2 and read_only and journal.flatten_trades(third) is third:
+            print("[PASS] Cached view reused until journal changes")
+        else:
+            print("[FAIL] Cached view reused until journal changes")
+
+    # ---- Streaming iterators ----
+    with tempfile.TemporaryDirectory() as tmp:
+        nested_path = os.path.join(tmp, "nested.json")
+        flat_path = os.path.join(tmp, "flat.json")
+        sessions = [
+            {"mode": "SIM", "trades": [{"id": f"{s}-{i}", "symbol": "SPY", "pnl": i - 20} for i in range(40)]}
+            for s in range(60)
+        ]
+        journal.save_trades(nested_path, sessions)
+        journal.save_trades(flat_path, [t for s in sessions for t in s["trades"]])
+
+        streamed = [t["id"] for t in journal.iter_trades(nested_path)]
+        loaded = [t["id"] for t in journal.load_all_trades(nested_path)]
+        flat_streamed = [t["id"] for t in journal.iter_trades(flat_path)]
+        session_count = sum(1 for _ in journal.iter_sessions(nested_path))
+        if streamed == loaded == flat_streamed and session_count == 60:
+            print("[PASS] Streaming iterators match loaders (nested + flat)")
+        else:
+            print("[FAIL] Streaming iterators match loaders (nested + flat)")
+
+        journal.update_trade(nested_path, "0-0", {"pnl": 99})
+        latest = [t for t in journal.iter_trades(nested_path) if t["id"] == "0-0"]
+        if len(latest) == 1 and latest[0]["pnl"] == 99:
+            print("[PASS] Streaming JSONL yields latest trade version once")
+        else:
+            print("[FAIL] Streaming JSONL yields latest trade version once")
+
+        # Closing a trade after a new session started keeps it in its original session
+        jsonl = os.path.join(tmp, "sessions.jsonl")
+        journal.append_session(jsonl, {"mode": "SIM"})
+        journal.append_trade(jsonl, {"id": 1, "symbol": "SPY", "status": "OPEN"})
+        journal.append_session(jsonl, {"mode": "LIVE"})
+        journal.append_trade(jsonl, {"id": 2, "symbol": "QQQ", "status": "OPEN"})
+        journal.update_trade(jsonl, 1, {"status": "CLOSED", "pnl": 25})
+        expected = [(s.get("mode"), [t["id"] for t in s["trades"]]) for s in journal.load_sessions(jsonl)]
+        streamed = [(s.get("mode"), [t["id"] for t in s["trades"]]) for s in journal.iter_sessions(jsonl)]
+        closed = [t for t in journal.iter_trades(jsonl) if t["id"] == 1]
+        if (
+            streamed == expected == [("SIM", [1]), ("LIVE", [2])]
+            and [t["id"] for t in journal.iter_trades(jsonl)] == [1, 2]
+            and closed[0]["status"] == "CLOSED"
+        ):
+            print("[PASS] Streaming JSONL keeps updated trades in their first session")
+        else:
+            print("[FAIL] Streaming JSONL keeps updated trades in their first session")
+
+        # One large top-level session is re-decoded O(log n) times, not once per chunk
+        big_path = os.path.join(tmp, "big.json")
+        big = [{"mode": "SIM", "trades": [{"id": i, "symbol": "SPY", "pnl": i % 7 - 3} for i in range(5000)]}]
+        journal.save_trades(big_path, big)
+        decodes = []
+
+        class CountingDecoder(json.JSONDecoder):
+            def raw_decode(self, s, idx=0):
+                decodes.append(idx)
+                return super().raw_decode(s, idx)
+
+        journal.json.JSONDecoder, original = CountingDecoder, journal.json.JSONDecoder
+        try:
+            entries = list(journal._iter_json_entries(big_path, chunk_size=1024))
+        finally:
+            journal.json.JSONDecoder = original
+        if entries == big and len(decodes) <= 16:
+            print("[PASS] Streaming decodes a large session with a growing window")
+        else:
+            print(f"[FAIL] Streaming decodes a large session with a growing window ({len(decodes)} decodes)")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+import sys, os, json, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils import helpers
+from utils.montecarlo import simulate
+
+
+def test_simulation_is_reproducible_and_ordered():
+    a = simulate(n_paths=2000, n_trades=40, seed=11, max_chunk_cells=8000)
+    b = simulate(n_paths=2000, n_trades=40, seed=11, max_chunk_cells=8000)
+    assert a == b
+    q = a["final_quantiles"]
+    assert q[5] <= q[50] <= q[95] and a["final_balance"] == q[50]
+    assert 0 <= a["drawdown_quantiles"][5] <= a["drawdown_quantiles"][95] < 1
+    assert 0 <= a["ruin_probability"] <= 1
+
+
+def test_ruin_probability_responds_to_risk():
+    safe = simulate(n_paths=2000, n_trades=100, winrate=0.4, risk_fraction=0.01, seed=1)
+    reckless = simulate(n_paths=2000, n_trades=100, winrate=0.4, risk_fraction=0.25, seed=1)
+    assert reckless["ruin_probability"] > safe["ruin_probability"]
+
+
+def test_binary_history_appends_after_legacy_runs():
+    legacy = {"trades": 50, "winrate": 0.55, "reward_risk": 1.5, "risk_fraction": 0.02, "final_balance": 15000.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        old_state, old_history = helpers.STATE_FILE, helpers.HISTORY_FILE
+        helpers.STATE_FILE = os.path.join(tmp, "state.json")
+        helpers.HISTORY_FILE = os.path.join(tmp, "analytics_history.bin")
+        try:
+            with open(helpers.STATE_FILE, "w") as f:
+                json.dump({"analytics_history": [legacy]}, f)
+            run = simulate(n_paths=500, n_trades=20, seed=2)
+            helpers.append_analytics_run(run)
+            helpers.append_analytics_run(legacy)
+            history = helpers.get_analytics_history()
+            assert history[0] == legacy and history[2]["paths"] == 1
+            assert history[1]["ruin_probability"] == run["ruin_probability"]
+            assert len(helpers.load_analytics_history()) == 2
+            assert os.path.getsize(helpers.HISTORY_FILE) == 2 * helpers.HISTORY_DTYPE.itemsize
+        finally:
+            helpers.STATE_FILE, helpers.HISTORY_FILE = old_state, old_history
+
+
+def main():
+    for name, fn in [
+        ("Monte Carlo runs are reproducible", test_simulation_is_reproducible_and_ordered),
+        ("Ruin probability responds to risk", test_ruin_probability_responds_to_risk),
+        ("Binary analytics history", test_binary_history_appends_after_legacy_runs),
+    ]:
+        try:
+            fn()
+            print(f"[PASS] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import sys, os, copy, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils import discipline, journal, sweep
+from utils.replay import build_features, merge_prefs, replay, replay_variant
+
+PREFS = {
+    "mode": "LIVE",
+    "account_size": 5000,
+    "ladder": {"contracts": [1, 2, 5], "enforce_live": True, "warn_sim": True},
+    "graduation": {"min_trades": 4, "min_win_rate": 50, "clean_sessions": 3},
+}
+
+TRADES = [
+    {"id": i, "symbol": "SPY", "date": f"2025-04-{i + 1:02d}", "status": "CLOSED",
+     "pnl": pnl, "max_loss": 100, "max_gain": gain, "contracts": contracts}
+    for i, (pnl, gain, contracts) in enumerate([
+        (40, 200, 1), (35, 120, 2), (-20, 200, 1), (50, 200, 3),
+        (60, 200, 5), (-30, 80, 2), (45, 200, 6), (-10, 200, 5),
+    ])
+]
+
+
+def test_masks_match_discipline_checks():
+    features = build_features(TRADES)
+    result = replay_variant(features, PREFS)
+    # Before graduation only the first two rungs apply
+    ungraduated = discipline.check_scaling_ladder(copy.deepcopy(TRADES[:4]), "LIVE", False, prefs=PREFS)
+    graduated = discipline.check_scaling_ladder(copy.deepcopy(TRADES[4:]), "LIVE", True, prefs=PREFS)
+    assert result["ladder_violations"] == len(ungraduated) + len(graduated) == 2
+    profit = [t for t in copy.deepcopy(TRADES) if discipline.check_profitability([t], "LIVE", prefs=PREFS)]
+    assert result["profit_violations"] == len(profit)
+    assert result["risk_violations"] == 0
+
+    # A stored expectancy overrides the trade's own PnL, as in check_profitability
+    trades = copy.deepcopy(TRADES)
+    trades[0]["expectancy"], trades[2]["expectancy"], trades[4]["expectancy"] = -5, 3, -1
+    stored = replay_variant(build_features(trades), PREFS)
+    profit = [t for t in copy.deepcopy(trades) if discipline.check_profitability([t], "LIVE", prefs=PREFS)]
+    assert stored["profit_violations"] == len(profit) == result["profit_violations"] + 1
+    assert build_features(trades)["trade_expectancy"][:3].tolist() == [-5, 35, 3]
+
+    # With enforce_live off the ladder reports nothing, but precheck still blocks oversize LIVE orders
+    lax = dict(PREFS, ladder=dict(PREFS["ladder"], enforce_live=False), graduation={"min_trades": 50})
+    lax_result = replay_variant(build_features(TRADES), lax)
+    refused = [t for t in TRADES if not discipline.precheck_trade_entry(t, "LIVE", False, prefs=lax)[0]]
+    blocking = [
+        t for t in copy.deepcopy(TRADES)
+        if discipline.run_discipline_checks(False, [t], mode="LIVE", prefs=lax)["blocked"]
+    ]
+    assert lax_result["ladder_violations"] == 0
+    assert lax_result["blocked"] == len(refused) == 4
+    assert lax_result["discipline_blocks"] == len(blocking) == lax_result["profit_violations"]
+
+
+def test_batch_profitability_matches_replay():
+    trades = copy.deepcopy(TRADES)
+    check = discipline.ProfitabilityCheck(trades, "LIVE", prefs=PREFS)
+    assert len(check) == replay_variant(build_features(TRADES), PREFS)["profit_violations"]
+    # Flags are written without formatting any message strings
+    check.annotate(details=False)
+    assert check._formatted is None
+    assert [t["profit_violation"] for t in trades] == check.violations.tolist()
+    assert trades[5]["reward_risk"] == 0.8 and trades[2]["expectancy"] == -20.0
+    assert check.messages() == discipline.check_profitability(copy.deepcopy(TRADES), "LIVE", prefs=PREFS)
+
+    # TradeTable columns (stored expectancy included) give the same flags and messages
+    stored = copy.deepcopy(TRADES)
+    stored[0]["expectancy"], stored[2]["expectancy"] = -5, 3
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, stored)
+        from_table = discipline.ProfitabilityCheck.for_journal(path, "LIVE", prefs=PREFS)
+    from_dicts = discipline.ProfitabilityCheck(stored, "LIVE", prefs=PREFS)
+    assert from_table.violations.tolist() == from_dicts.violations.tolist()
+    assert from_table.messages() == from_dicts.messages() and from_table._formatted is not None
+
+
+def test_timeline_records_graduation():
+    result = replay_variant(build_features(TRADES), PREFS)
+    assert result["graduated_at"]["trade"] == 3 and result["graduated_at"]["date"] == "2025-04-04"
+    events = {e["event"]: e["trade"] for e in result["timeline"]}
+    assert events == {"graduated": 3, "first_ladder_violation": 3, "first_block": 3}
+    strict = replay_variant(build_features(TRADES), dict(PREFS, graduation={"min_trades": 50}))
+    assert strict["graduated_at"] is None and strict["ladder_violations"] == 4
+
+
+def test_parallel_variants_match_in_process():
+    variants = {"base": {}, "sim": {"mode": "SIM"}, "tight": {"min_reward_risk": 2.5, "account_size": 4000}}
+    serial = replay(TRADES, variants, base_prefs=PREFS)
+    parallel = replay(TRADES, variants, base_prefs=PREFS, workers=2)
+    assert serial == parallel
+    assert serial[1]["blocked"] == 0 and serial[2]["risk_violations"] == 8
+
+
+def test_sweep_scores_match_replay():
+    space = {"graduation.min_trades": [3, 4, 50], "ladder.contracts": [[1, 2, 5], [1, 3, 6]],
+             "risk_limits.max_trade_risk": [0.01, 0.02]}
+    rows = sweep.sweep(TRADES, space, base_prefs=PREFS)
+    assert len(rows) == 12 and [r["rank"] for r in rows] == list(range(1, 13))
+    assert all(a["compliant_pnl"] >= b["compliant_pnl"] for a, b in zip(rows, rows[1:]))
+    features = build_features(TRADES)
+    for row in rows:
+        expected = replay_variant(features, merge_prefs(PREFS, sweep.to_overrides(row["params"])))
+        for key in ("ladder_violations", "risk_violations", "portfolio_risk_violations", "profit_violations"):
+            assert row[key] == expected[key]
+    assert sweep.sweep(TRADES, space, base_prefs=PREFS, workers=2) == rows
+    # Ladder not enforced (SIM with warn_sim off): neither side counts oversize trades
+    quiet = merge_prefs(PREFS, {"mode": "SIM", "ladder": {"warn_sim": False}})
+    for row in sweep.sweep(TRADES, space, base_prefs=quiet):
+        expected = replay_variant(features, merge_prefs(quiet, sweep.to_overrides(row["params"])))
+        assert row["ladder_violations"] == expected["ladder_violations"] == 0
+    sampled = sweep.sweep(TRADES, space, n_samples=5, base_prefs=PREFS, seed=1, rank_by="ladder_violations")
+    assert len(sampled) == 5 and sampled[0]["ladder_violations"] <= sampled[-1]["ladder_violations"]
+
+
+def main():
+    for name, fn in [
+        ("Replay masks match discipline checks", test_masks_match_discipline_checks),
+        ("Batch profitability matches replay", test_batch_profitability_matches_replay),
+        ("Timeline records graduation", test_timeline_records_graduation),
+        ("Parallel variants match in-process", test_parallel_variants_match_in_process),
+        ("Sweep scores match replay", test_sweep_scores_match_replay),
+    ]:
+        try:
+            fn()
+            print(f"[PASS] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-import sys, os
+import sys, os, tempfile
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from utils import scaling
+from utils import attribution, discipline, journal, scaling, sizing
+from utils.analytics import AnalyticsEngine
+from utils.attribution import AttributionCube, normalize_strategy
+from utils.exposure import ExposureIndex
 
 
 def test_scaling_blocks_oversized_trade():
@@ -16,6 +19,137 @@ def test_scaling_allows_valid_trade():
     assert result["compliant"] is True
 
 
+def test_strategy_limits_from_cube():
+    positions = [{"symbol": "SPY", "strategy": "Iron Condor", "max_loss": 50}] * 3
+    result = scaling.check_scaling({"positions": positions}, account_size=10000)
+    assert result["compliant"] is False
+    assert any("Iron Condors (3)" in m for m in result["messages"])
+
+
+def test_cube_rollups_and_appends():
+    trades = [
+        {"id": 1, "symbol": "SPY", "strategy": "Bull Put Spread", "date": "2025-09-01", "mode": "SIM", "pnl": 40, "max_loss": 100, "contracts": 1},
+        {"id": 2, "symbol": "SPY", "strategy": "iron condor", "date": "2025-09-08", "mode": "SIM", "pnl": -20, "max_loss": 150, "contracts": 2},
+        {"id": 3, "symbol": "QQQ", "strategy": "vertical", "date": "2025-09-09", "mode": "LIVE", "pnl": 10, "max_loss": 80, "contracts": 1},
+    ]
+    assert normalize_strategy("Bull Put Spread") == "vertical" and normalize_strategy(None) == ""
+    cube = AttributionCube.from_trades(trades)
+    assert cube.rollup("symbol")["SPY"]["count"] == 2 and cube.rollup("symbol")["SPY"]["max_loss"] == 250
+    assert cube.rollup("strategy", mode="SIM") == {
+        "vertical": {"count": 1, "pnl": 40, "wins": 1, "max_loss": 100, "contracts": 1},
+        "iron_condor": {"count": 1, "pnl": -20, "wins": 0, "max_loss": 150, "contracts": 2},
+    }
+    assert cube.rollup("week")["2025-W37"]["count"] == 2 and cube.total()["pnl"] == 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, trades)
+        cube = attribution.load_cube(path)
+        assert attribution.load_cube(path) is cube  # reused until the journal changes
+        journal.append_trade(path, {"id": 4, "symbol": "IWM", "strategy": "butterfly", "pnl": 5})
+        assert attribution.load_cube(path).total()["count"] == 4
+
+
+def test_kelly_and_optimal_f_sizing():
+    # +2 / -1 coin flip: Kelly and optimal-f both peak at 25%
+    assert sizing.kelly([2, -1] * 10)["kelly"] == 0.25
+    assert sizing.optimal_f([2, -1] * 10, max_chunk_cells=99 * 3)["f"] == 0.25
+
+    trades = [
+        {"id": i, "symbol": "SPY", "strategy": "Iron Condor", "status": "CLOSED",
+         "pnl": 200 if i % 2 else -100, "max_loss": 200, "contracts": 2}
+        for i in range(12)
+    ] + [{"id": 99, "symbol": "QQQ", "status": "CLOSED", "pnl": 10, "max_loss": 50}]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trade_journal.json")
+        journal.save_trades(path, trades)
+        table = sizing.load_sizing(path, account_size=20000)
+        assert sizing.load_sizing(path, account_size=20000) is table
+        spy = table["by_symbol"]["SPY"]
+        # Half-Kelly 12.5% of 20k over $100 risk per contract, capped at 2% -> 4 contracts
+        assert spy["kelly_contracts"] == 25 and spy["cap_contracts"] == 4 and spy["recommended_contracts"] == 4
+        assert table["by_strategy"]["iron_condor"]["trades"] == 12
+        assert table["by_symbol"]["QQQ"]["unsized"] == "trades"
+        messages = sizing.recommend({"journal_path": path, "account_size": 20000})["messages"]
+        assert any("SPY: recommended 4 contract(s)" in m for m in messages)
+
+
+def test_compiled_ladder_matches_rung_scan():
+    for rungs in ([1, 2, 5, 10], [3, 1, 6, 2], [2]):
+        ladder = discipline.Ladder(rungs)
+        sizes = list(range(0, 15))
+        for graduated in (False, True):
+            view = rungs if graduated else rungs[:2]
+            expected = [max([r for r in view if r <= c], default=view[0]) for c in sizes]
+            assert [ladder.allowed(c, graduated) for c in sizes] == expected
+            assert ladder.allowed_many(sizes, graduated).tolist() == expected
+
+    ladder = discipline.Ladder([1, 2, 5])
+    assert discipline.precheck_trade_entry({"symbol": "SPY", "contracts": 4}, "LIVE", False, ladder=ladder)[0] is False
+    assert discipline.precheck_trade_entry({"symbol": "SPY", "contracts": 5}, "LIVE", True, ladder=ladder)[0] is True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "preferences.json")
+        with open(path, "w") as f:
+            f.write('{"ladder": {"contracts": [1, 2, 5]}}')
+        first = discipline.load_ladder(path)
+        assert discipline.load_ladder(path) is first
+        with open(path, "w") as f:
+            f.write('{"ladder": {"contracts": [1, 3, 6, 9]}}')
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+        assert discipline.load_ladder(path).view(True) == [1, 3, 6, 9]
+
+
+def test_exposure_index_checks_and_sync():
+    prefs = {"account_size": 1000, "risk_limits": {"max_symbol_allocation": 0.3, "max_expiry_cluster": 2}}
+    positions = [
+        {"id": 1, "symbol": "SPY", "max_loss": 200, "expiry": "2025-10-17", "option_type": "put", "contracts": 2},
+        {"id": 2, "symbol": "SPY", "max_loss": 150, "expiry": "2025-10-15", "option_type": "put", "contracts": 2},
+        {"id": 3, "symbol": "QQQ   251017C00450000", "max_loss": 100, "expiry": "2025-10-16", "quantity": 1},
+    ]
+    index = ExposureIndex.from_positions(positions)
+    assert index.overexposed(1000, 0.3) == [("SPY", 0.35)]
+    assert index.clusters(2) == [("2025-W42", 3)]
+    assert index.skewed() == [("SPY", 0, 4)] and index.sides["QQQ"] == [1, 0]
+
+    assert discipline.check_overexposure({"positions": positions}, "LIVE", prefs) == [
+        "❌ Exposure violation: SPY risk is 35% of account, above the 30% limit."
+    ]
+    assert len(discipline.check_expiration_clusters(positions, "SIM", prefs)) == 1
+    assert discipline.check_contract_skew({"positions": positions}, prefs)
+
+    # Closing one position and resizing another matches a fresh index
+    changed = [dict(positions[0], contracts=1), positions[2]]
+    index.sync(changed)
+    fresh = ExposureIndex.from_positions(changed)
+    assert index.entries == fresh.entries and index.weeks == fresh.weeks and index.sides == fresh.sides
+    assert index.overexposed(1000, 0.3) == [] and index.clusters(2) == []
+
+    # Unrealized PnL does not make a broker position closed; an explicit close does
+    live = [{"symbol": "SPY", "max_loss": 500, "pnl": -40}]
+    assert discipline.check_overexposure({"positions": live}, "LIVE", prefs)
+    assert not discipline.check_overexposure({"positions": [dict(live[0], closed_date="2025-10-01")]}, "LIVE", prefs)
+    assert not discipline.check_overexposure({"positions": [dict(live[0], status="closed")]}, "LIVE", prefs)
+
+    # Journal trades use the journal's status inference: a realized pnl closes them
+    history = [dict(p, pnl=25) for p in positions]
+    assert discipline.check_expiration_clusters(history, "SIM", prefs) == []
+    assert not AnalyticsEngine(prefs)._check_risks({}, history)["expiration_cluster"]
+
+    # Journal events update an owned index one trade at a time
+    owned = ExposureIndex()
+    for p in positions:
+        owned.record("append", p)
+    owned.record("close", dict(positions[1], status="CLOSED", pnl=-150))
+    owned.record("update", dict(positions[0], contracts=1))
+    assert owned.entries == ExposureIndex.from_positions(changed).entries
+
+    engine = AnalyticsEngine(prefs)
+    risks = engine._check_risks({"positions": positions}, [])
+    assert risks["concentration"] and risks["expiration_cluster"] and risks["contract_skew"]
+    assert not engine._check_risks({"positions": changed}, [])["concentration"]
+
+
 def main():
     try:
         test_scaling_blocks_oversized_trade()
@@ -29,6 +163,36 @@ def main():
     except AssertionError:
         print("[FAIL] Scaling rejected valid trade")
 
+    try:
+        test_strategy_limits_from_cube()
+        print("[PASS] Strategy limits enforced from cube")
+    except AssertionError:
+        print("[FAIL] Strategy limits not enforced")
+
+    try:
+        test_cube_rollups_and_appends()
+        print("[PASS] Attribution cube rollups and appends")
+    except AssertionError:
+        print("[FAIL] Attribution cube rollups and appends")
+
+    try:
+        test_kelly_and_optimal_f_sizing()
+        print("[PASS] Kelly / optimal-f sizing")
+    except AssertionError:
+        print("[FAIL] Kelly / optimal-f sizing")
+
+    try:
+        test_compiled_ladder_matches_rung_scan()
+        print("[PASS] Compiled scaling ladder")
+    except AssertionError:
+        print("[FAIL] Compiled scaling ladder")
+
+    try:
+        test_exposure_index_checks_and_sync()
+        print("[PASS] Exposure index checks and sync")
+    except AssertionError:
+        print("[FAIL] Exposure index checks and sync")
+
 
 if __name__ == "__main__":
     main()
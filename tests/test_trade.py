@@ -0,0 +1,43 @@
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.trade import Trade, as_trades
+
+
+def test_pnl_keys_normalized():
+    trades = as_trades([
+        {"id": 1, "pnl": 50},
+        {"id": 2, "realized": -20.5, "status": "closed"},
+        [{"id": 3, "realized_pnl": "12"}],
+    ])
+    assert [t.pnl for t in trades] == [50.0, -20.5, 12.0]
+    assert all(t.closed for t in trades)
+
+
+def test_open_trade_defaults():
+    t = Trade.from_mapping({"symbol": "SPY", "type": "put_spread", "expiration": "2025-10-17"})
+    assert t.status == "OPEN" and t.pnl == 0.0
+    assert t.strategy == "put_spread" and t.expiry == "2025-10-17"
+    assert not hasattr(t, "__dict__")
+
+
+def test_normalized_once():
+    trades = as_trades([{"pnl": 1}])
+    assert as_trades(trades) is trades
+
+
+def main():
+    for name, fn in [
+        ("PnL keys normalized", test_pnl_keys_normalized),
+        ("Open trade defaults", test_open_trade_defaults),
+        ("Records normalized once", test_normalized_once),
+    ]:
+        try:
+            fn()
+            print(f"[PASS] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
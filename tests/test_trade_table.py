@@ -0,0 +1,70 @@
+import sys, os, datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.analytics import calculate_expectancy
+from utils.graduation import _compute_clean_sessions
+from utils.time_index import TimeIndex
+from utils.trade_table import TradeTable
+
+JOURNAL = [
+    {"symbol": "SPY", "date": "2025-09-01", "pnl": 50, "max_loss": 100},
+    {"symbol": "SPY", "date": "2025-09-01", "pnl": -150, "max_loss": 100},
+    {"symbol": "QQQ", "date": "2025-09-02", "pnl": -10, "max_loss": 100},
+    {"symbol": "QQQ", "date": "2025-09-03", "pnl": -20, "max_loss": 100},
+    {"symbol": "IWM", "date": "2025-09-03", "pnl": -5},
+    {"symbol": "SPY", "date": "2025-09-04", "pnl": 120, "closed_date": "2025-09-05", "status": "CLOSED"},
+]
+
+
+def test_matches_loop_metrics():
+    table = TradeTable.from_trades(JOURNAL)
+    vectorized, looped = table.expectancy(), calculate_expectancy(JOURNAL)
+    assert vectorized.keys() == looped.keys()
+    assert all(abs(vectorized[k] - looped[k]) < 1e-9 for k in looped)
+    assert table.clean_sessions() == _compute_clean_sessions(JOURNAL)
+    assert table.max_loss_streak() == 4
+    assert table.max_loss_streak(last=2) == 1
+    assert table.max_loss_streak(last=0) == 0 and table.max_loss_streak(last=-3) == 0
+    assert table.symbol_counts() == {"SPY": 3, "QQQ": 2, "IWM": 1}
+
+
+def test_realized_between():
+    table = TradeTable.from_trades(JOURNAL)
+    assert table.realized_between(datetime.date(2025, 9, 1), datetime.date(2025, 9, 30)) == 120
+    assert table.realized_between("2025-10-01", "2025-10-31") == 0
+
+
+def test_time_index_ranges_and_sessions():
+    closed = TimeIndex.from_trades(JOURNAL)
+    assert len(closed) == 1 and closed.realized_between("2025-09-05", "2025-09-05") == 120
+    assert closed.month_to_date(datetime.date(2025, 9, 20))["pnl"] == 120
+    assert closed.week_to_date(datetime.date(2025, 9, 8))["trades"] == 0
+
+    by_date = TimeIndex.from_trades(JOURNAL, field="date")
+    assert by_date.day(datetime.date(2025, 9, 1)) == {"trades": 2, "pnl": -100.0, "wins": 1, "violations": 1}
+    assert by_date.range("2025-09-02", None)["trades"] == 4
+    assert by_date.clean_sessions() == TradeTable.from_trades(JOURNAL).clean_sessions() == 2
+
+
+def test_empty_table():
+    table = TradeTable.from_trades([])
+    assert table.expectancy()["expectancy"] == 0 and table.expectancy()["win_rate"] == 0
+    assert table.clean_sessions() == 0 and table.max_loss_streak() == 0
+
+
+def main():
+    for name, fn in [
+        ("Vectorized metrics match loop versions", test_matches_loop_metrics),
+        ("Realized profit by closed-date range", test_realized_between),
+        ("Time index ranges and sessions", test_time_index_ranges_and_sessions),
+        ("Empty table handled", test_empty_table),
+    ]:
+        try:
+            fn()
+            print(f"[PASS] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
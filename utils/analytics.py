@@ -2,6 +2,72 @@ import statistics
 import datetime
 from typing import List, Dict, Any
 
+from utils.equity import EquityCurve
+from utils.expectancy import compute_expectancy
+from utils.exposure import (
+    MAX_CONTRACT_SKEW, MAX_EXPIRY_CLUSTER, MAX_SYMBOL_ALLOCATION, ExposureIndex, open_positions, open_trades,
+)
+from utils.trade import Trade, iter_records
+
+
+class RollingExpectancy:
+    """
+    Exponentially-weighted rolling expectancy per symbol.
+    - O(1) update per trade; a trade `half_life` trades old counts half as much
+    - Bias-corrected weighted mean (sum of weighted PnL / sum of weights)
+    - Discipline gap = weighted % of recent trades that broke their max loss
+    """
+
+    def __init__(self, half_life: float = 20, target_expectancy: float = 0.0, max_discipline_gap: float = 25.0):
+        self.half_life = half_life
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.target_expectancy = target_expectancy
+        self.max_discipline_gap = max_discipline_gap
+        self._state = {}  # symbol -> [weighted pnl, weighted violations, weight, realized, count]
+
+    def update(self, trade) -> None:
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        state = self._state.get(t.symbol)
+        if state is None:
+            state = self._state[t.symbol] = [0.0, 0.0, 0.0, 0.0, 0]
+        d = self.decay
+        state[0] = state[0] * d + t.pnl
+        state[1] = state[1] * d + (1.0 if t.exceeded_max_loss() else 0.0)
+        state[2] = state[2] * d + 1.0
+        state[3] += t.pnl
+        state[4] += 1
+
+    def update_many(self, trades) -> "RollingExpectancy":
+        """One grouped pass over trades (dicts, records or a generator)."""
+        for t in iter_records(trades):
+            self.update(t)
+        return self
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-symbol rows for the dashboard's "Expectancy Report (Weighted Rolling)":
+        expectancy, realized, discipline_gap, status (ok / reduce / block_new).
+        """
+        report = {}
+        for sym, (w_pnl, w_viol, weight, realized, count) in self._state.items():
+            expectancy = w_pnl / weight if weight else 0.0
+            gap = w_viol / weight * 100 if weight else 0.0
+            if expectancy <= self.target_expectancy:
+                status = "block_new"
+            elif gap > self.max_discipline_gap:
+                status = "reduce"
+            else:
+                status = "ok"
+            report[sym or "UNKNOWN"] = {
+                "expectancy": round(expectancy, 2),
+                "realized": round(realized, 2),
+                "discipline_gap": round(gap, 1),
+                "status": status,
+                "trades": count,
+            }
+        return report
+
+
 class AnalyticsEngine:
     """
     L53.5 Expectancy & Discipline Scoring Engine
@@ -16,6 +82,7 @@ class AnalyticsEngine:
         self.preferences = preferences
         self.broker = broker
         self.sim_mode = False if broker else True  # fail-safe: no broker → SIM only
+        self._exposure = ExposureIndex()  # owned here; synced with the open positions each evaluation
 
     # -----------------------------
     # CORE API
@@ -31,12 +98,16 @@ class AnalyticsEngine:
         Master evaluation function.
         Returns expectancy, risk checks, and instructions.
         """
-        expectancy_report = self._calculate_expectancy(trades)
+        expectancy = self._calculate_expectancy(trades)
+        expectancy_report = self._rolling_expectancy(trades)
+        equity = self._equity_curve(trades)
         risk_report = self._check_risks(portfolio, trades)
         instructions = self._generate_instructions(risk_report)
 
         return {
-            "expectancy": expectancy_report,
+            "expectancy": expectancy,
+            "expectancy_report": expectancy_report,
+            "equity": equity,
             "risk": risk_report,
             "instructions": instructions,
         }
@@ -47,27 +118,52 @@ class AnalyticsEngine:
 
     def _calculate_expectancy(self, trades: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Weighted expectancy calculation (recent trades count more).
-        Suitable for dashboard analytics, not strict graduation gating.
+        Portfolio-wide expectancy for dashboard analytics.
+        Same definitions as calculate_expectancy (see utils/expectancy.py).
         """
-        if not trades:
-            return {"expectancy": 0, "win_rate": 0}
-
-        wins = [t["pnl"] for t in trades if t.get("pnl", 0) > 0]
-        losses = [abs(t["pnl"]) for t in trades if t.get("pnl", 0) < 0]
-        total = len(trades)
-        win_rate = (len(wins) / total) * 100 if total > 0 else 0
-
-        avg_win = statistics.mean(wins) if wins else 0
-        avg_loss = statistics.mean(losses) if losses else 0
+        return compute_expectancy(trades).as_dict()
 
-        expectancy = (avg_win * (win_rate / 100)) - (avg_loss * ((100 - win_rate) / 100))
+    def _rolling_expectancy(self, trades: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Weighted rolling expectancy per symbol (recent trades count more).
+        Half-life in trades comes from preferences["expectancy_half_life"] (default 20).
+        """
+        rolling = RollingExpectancy(half_life=self.preferences.get("expectancy_half_life", 20))
+        return rolling.update_many(trades).report()
 
-        return {"expectancy": expectancy, "win_rate": win_rate}
+    def _equity_curve(self, trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Equity curve summary: max drawdown, underwater stretch, ratios, per-symbol curves.
+        Starting balance comes from preferences["account_size"] (default 0 = PnL only).
+        """
+        curve = EquityCurve.from_trades(trades, start_balance=self.preferences.get("account_size", 0) or 0)
+        return curve.summary()
 
     def _check_risks(self, portfolio, trades):
-        # Simplified placeholder risk checks
-        return {"concentration": False, "expiration_cluster": False}
+        """
+        Concentration, expiration-cluster and call/put skew checks over open positions
+        (the portfolio's, else the journal's open trades). The engine's ExposureIndex is
+        synced to that snapshot, so only opened, closed or changed positions are re-applied.
+        Limits come from preferences["risk_limits"].
+        """
+        index = self._exposure.sync(open_positions(portfolio) or open_trades(trades))
+        limits = self.preferences.get("risk_limits", {})
+        max_share = limits.get("max_symbol_allocation", MAX_SYMBOL_ALLOCATION)
+        max_cluster = limits.get("max_expiry_cluster", MAX_EXPIRY_CLUSTER)
+
+        overexposed = index.overexposed(self.preferences.get("account_size", 10000), max_share)
+        clusters = index.clusters(max_cluster)
+        skewed = index.skewed(limits.get("max_contract_skew", MAX_CONTRACT_SKEW))
+
+        details = [f"{sym}: {share:.0%} of account at risk (limit {max_share:.0%})" for sym, share in overexposed]
+        details += [f"{week}: {n} positions expiring (limit {max_cluster})" for week, n in clusters]
+        details += [f"{sym}: {calls} call vs {puts} put contracts" for sym, calls, puts in skewed]
+        return {
+            "concentration": bool(overexposed),
+            "expiration_cluster": bool(clusters),
+            "contract_skew": bool(skewed),
+            "details": details,
+        }
 
     def _generate_instructions(self, risk_report):
         instructions = []
@@ -75,6 +171,8 @@ class AnalyticsEngine:
             instructions.append("Overexposed to one symbol. Reduce allocation.")
         if risk_report.get("expiration_cluster"):
             instructions.append("Too many options expiring same week. Close or stagger expirations.")
+        if risk_report.get("contract_skew"):
+            instructions.append("Calls and puts are lopsided on one underlying. Balance or reduce the heavy side.")
         if not instructions:
             instructions.append("No violations detected. You may open trades per ladder rules.")
         return instructions
@@ -109,14 +207,7 @@ def calculate_expectancy(trades: List[Dict[str, Any]]) -> Dict[str, Any]:
     Strict version for graduation:
       - Expectancy = mean(PnL of all trades).
       - Win rate = (# winning trades) / total.
+    Single pass, so `trades` may be a generator such as journal.iter_trades(path).
+    Also returns the other fields of utils/expectancy.ExpectancyStats.
     """
-    if not trades:
-        return {"expectancy": 0, "win_rate": 0}
-
-    pnl_values = [t.get("pnl", 0) for t in trades]
-    total = len(pnl_values)
-
-    win_rate = (sum(1 for p in pnl_values if p > 0) / total) * 100 if total > 0 else 0
-    expectancy = sum(pnl_values) / total  # strict: raw average
-
-    return {"expectancy": expectancy, "win_rate": win_rate}
+    return compute_expectancy(trades).as_dict()
@@ -0,0 +1,122 @@
+"""
+utils/attribution.py
+
+Materialized attribution cube over the journal.
+- Dimensions: symbol × normalized strategy × ISO week (trade date) × mode
+- Each cell holds count, PnL sum, wins, max_loss sum and contracts
+- push() updates one cell in O(1); rollup() sums cells over any subset of
+  dimensions (memoized until the next push)
+Scaling, discipline AI and coaching read their per-symbol / per-strategy
+counts from here instead of looping over trades themselves.
+"""
+
+from utils.dates import to_date
+from utils.journal import cached_for_journal, load_trade_records
+from utils.trade import Trade, iter_records
+
+DIMENSIONS = ("symbol", "strategy", "week", "mode")
+MEASURES = ("count", "pnl", "wins", "max_loss", "contracts")
+
+
+def normalize_strategy(name):
+    """
+    Canonical strategy bucket shared by every consumer:
+    iron_condor, butterfly, vertical (verticals and other spreads), else the
+    lower-cased name with spaces as underscores ("" when missing).
+    """
+    strat = str(name or "").strip().lower()
+    if "condor" in strat:
+        return "iron_condor"
+    if "butterfly" in strat:
+        return "butterfly"
+    if "vertical" in strat or "spread" in strat:
+        return "vertical"
+    return strat.replace(" ", "_")
+
+
+def iso_week_key(value):
+    """'YYYY-Www' for a date value, or None."""
+    d = to_date(value)
+    if d is None:
+        return None
+    year, week, _ = d.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class AttributionCube:
+    """Sparse symbol × strategy × week × mode cube of trade aggregates."""
+
+    def __init__(self):
+        self.cells = {}  # (symbol, strategy, week, mode) -> [count, pnl, wins, max_loss, contracts]
+        self._rollups = {}
+
+    @classmethod
+    def from_trades(cls, trades):
+        cube = cls()
+        for t in iter_records(trades):
+            cube.push(t)
+        return cube
+
+    def push(self, trade):
+        """Add one trade (dict or Trade record) to its cell."""
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        key = (t.symbol, normalize_strategy(t.strategy), iso_week_key(t.date), t.mode or None)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = [0, 0.0, 0, 0.0, 0]
+        cell[0] += 1
+        cell[1] += t.pnl
+        cell[2] += t.pnl > 0
+        cell[3] += t.max_loss or 0.0
+        cell[4] += t.contracts
+        self._rollups.clear()
+        return self
+
+    def rollup(self, *dims, **filters):
+        """
+        Sum cells grouped by dims, keeping only cells whose dimensions match filters.
+        Returns {value: measures} for one dim, {tuple: measures} for several,
+        or a single measures dict when no dims are given.
+        e.g. cube.rollup("symbol"), cube.rollup("symbol", "strategy", mode="SIM")
+        """
+        for d in tuple(dims) + tuple(filters):
+            if d not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {d}")
+        memo_key = (dims, tuple(sorted(filters.items())))
+        if memo_key in self._rollups:
+            return self._rollups[memo_key]
+
+        positions = [DIMENSIONS.index(d) for d in dims]
+        checks = [(DIMENSIONS.index(d), v) for d, v in filters.items()]
+        groups = {}
+        for key, cell in self.cells.items():
+            if any(key[i] != v for i, v in checks):
+                continue
+            group = tuple(key[i] for i in positions)
+            acc = groups.get(group)
+            if acc is None:
+                groups[group] = list(cell)
+            else:
+                for j, value in enumerate(cell):
+                    acc[j] += value
+
+        result = {
+            (g[0] if len(g) == 1 else g): dict(zip(MEASURES, acc)) for g, acc in groups.items()
+        }
+        if not dims:
+            result = result.get((), dict.fromkeys(MEASURES, 0))
+        self._rollups[memo_key] = result
+        return result
+
+    def total(self, **filters):
+        return self.rollup(**filters)
+
+
+# -----------------------------
+# Journal-backed cube
+# -----------------------------
+
+def load_cube(path):
+    """Cube for a journal, rebuilt from the cached Trade records once per journal version."""
+    return cached_for_journal(path, "attribution", lambda p: AttributionCube.from_trades(load_trade_records(p)))
+
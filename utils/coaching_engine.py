@@ -3,6 +3,10 @@ Coaching Engine — provides plain-English guidance on entries, exits, adjustmen
 and discipline reinforcement for defined-risk options spreads.
 """
 
+from utils.attribution import load_cube
+
+MIN_STRATEGY_TRADES = 3  # trades a strategy needs before it can be ranked
+
 def live_coaching(marketdata: dict, portfolio: dict, preferences: dict) -> list:
     """
     Core coaching logic. Returns a list of plain-English guidance messages
@@ -61,7 +65,27 @@ def trade_instructions(session: dict) -> dict:
 
 def best_strategy(session: dict) -> dict:
     """
-    Alias for best-strategy recommendation.
-    Currently reuses generate() until specialized logic is added.
+    Best-strategy recommendation.
+    Ranks normalized strategies by average PnL from the journal's attribution
+    cube (when the session carries journal_path), on top of generate().
     """
-    return generate(session)
+    result = generate(session)
+    if not session.get("journal_path"):
+        return result
+
+    ranked = sorted(
+        (
+            (cell["pnl"] / cell["count"], strat, cell)
+            for strat, cell in load_cube(session["journal_path"]).rollup("strategy").items()
+            if strat and cell["count"] >= MIN_STRATEGY_TRADES
+        ),
+        key=lambda item: item[0],
+        reverse=True,
+    )
+    if ranked:
+        avg, strat, cell = ranked[0]
+        result["messages"].append(
+            f"🏆 Best strategy so far: {strat} — avg ${avg:.2f} over {cell['count']} trades "
+            f"({cell['wins'] / cell['count']:.0%} winners)."
+        )
+    return result
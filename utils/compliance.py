@@ -3,11 +3,11 @@ utils/compliance.py
 
 Compliance reporting utilities for Defined-Risk Spreads Cockpit.
 Exports CSV summary of session-level violations including gatekeeper blocks.
+Sessions are streamed from the journal, so memory stays bounded on large journals.
 """
 
 import csv
-import os
-from utils.journal import load_journal
+from utils.journal import iter_sessions
 
 
 def export_compliance_csv(path: str = "compliance_report.csv", journal_path: str = "trade_journal.json"):
@@ -16,11 +16,6 @@ def export_compliance_csv(path: str = "compliance_report.csv", journal_path: str
     Columns: timestamp, mode, graduated, status, reason, scaling_violations,
              profitability_violations, total_violations
     """
-    sessions = load_journal(journal_path)
-    if not sessions:
-        print("No journal entries found.")
-        return None
-
     fieldnames = [
         "timestamp",
         "mode",
@@ -33,11 +28,12 @@ def export_compliance_csv(path: str = "compliance_report.csv", journal_path: str
     ]
 
     try:
+        rows = 0
         with open(path, "w", newline="", encoding="utf-8") as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
 
-            for session in sessions:
+            for session in iter_sessions(journal_path):
                 audit = session.get("session_audit", {})
                 row = {
                     "timestamp": session.get("timestamp"),
@@ -50,7 +46,11 @@ def export_compliance_csv(path: str = "compliance_report.csv", journal_path: str
                     "total_violations": audit.get("total_violations", 0),
                 }
                 writer.writerow(row)
+                rows += 1
 
+        if not rows:
+            print("No journal entries found.")
+            return None
         print(f"✅ Compliance report exported to {path}")
         return path
     except Exception as e:
@@ -62,16 +62,19 @@ def summarize_compliance(journal_path: str = "trade_journal.json"):
     """
     Quick console summary of compliance performance across sessions.
     """
-    sessions = load_journal(journal_path)
-    if not sessions:
-        return "No sessions found."
+    total = clean = scaling = profit = blocked = practice = 0
+    for s in iter_sessions(journal_path):
+        audit = s.get("session_audit", {})
+        status = s.get("status")
+        total += 1
+        clean += audit.get("total_violations", 0) == 0 and status not in ["blocked_entry", "practice_violation"]
+        scaling += audit.get("scaling_violations", 0) > 0
+        profit += audit.get("profitability_violations", 0) > 0
+        blocked += status == "blocked_entry"
+        practice += status == "practice_violation"
 
-    total = len(sessions)
-    clean = sum(1 for s in sessions if s.get("session_audit", {}).get("total_violations", 0) == 0 and s.get("status") not in ["blocked_entry", "practice_violation"])
-    scaling = sum(1 for s in sessions if s.get("session_audit", {}).get("scaling_violations", 0) > 0)
-    profit = sum(1 for s in sessions if s.get("session_audit", {}).get("profitability_violations", 0) > 0)
-    blocked = sum(1 for s in sessions if s.get("status") == "blocked_entry")
-    practice = sum(1 for s in sessions if s.get("status") == "practice_violation")
+    if not total:
+        return "No sessions found."
 
     return (
         f"Total sessions: {total}\n"
@@ -0,0 +1,101 @@
+"""
+utils/dates.py
+
+Shared date coercion for journal, filters and heatmap code.
+- ISO "YYYY-MM-DD" strings (anything after the first 10 characters is ignored,
+  non-zero-padded "YYYY-M-D" is accepted too) are parsed once through a bounded LRU cache into day ordinals
+- Bulk conversion of whole columns to int ordinals or datetime64[D],
+  parsing each distinct value only once
+- Unparseable or missing dates map to NO_DATE / None / NaT instead of raising
+"""
+
+import datetime
+from functools import lru_cache
+
+import numpy as np
+
+NO_DATE = -1  # ordinal used for missing or unparseable dates
+DATE_CACHE_SIZE = 4096
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def iso_ordinal(value: str) -> int:
+    """
+    Day ordinal for an ISO date string (cached); NO_DATE if it does not parse.
+    Non-zero-padded dates ("2025-3-7", optionally with a time) fall back to a split parse.
+    """
+    try:
+        return datetime.date.fromisoformat(value[:10]).toordinal()
+    except ValueError:
+        pass
+    try:
+        y, m, d = (int(x) for x in value.strip().split("T")[0].split()[0].split("-"))
+        return datetime.date(y, m, d).toordinal()
+    except (ValueError, IndexError):
+        return NO_DATE
+
+
+def to_ordinal(value) -> int:
+    """Day ordinal for an ISO string, date, datetime or ordinal; NO_DATE when missing."""
+    if not value:
+        return NO_DATE
+    if isinstance(value, str):
+        return iso_ordinal(value)
+    if isinstance(value, datetime.datetime):
+        return value.date().toordinal()
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return iso_ordinal(str(value))
+
+
+def to_date(value):
+    """datetime.date for any value to_ordinal() accepts, or None."""
+    ordinal = to_ordinal(value)
+    return datetime.date.fromordinal(ordinal) if ordinal != NO_DATE else None
+
+
+def days_until(value, today=None):
+    """Calendar days from today to value (negative if past); None if it does not parse."""
+    ordinal = to_ordinal(value)
+    if ordinal == NO_DATE:
+        return None
+    return ordinal - (today or datetime.date.today()).toordinal()
+
+
+def iso_week(value):
+    """ISO week number of a date value, or None."""
+    d = to_date(value)
+    return d.isocalendar()[1] if d else None
+
+
+def to_ordinals(values) -> np.ndarray:
+    """int32 ordinal column for a sequence of date values (each distinct value parsed once)."""
+    values = list(values)
+    out = np.full(len(values), NO_DATE, dtype=np.int32)
+    if not values:
+        return out
+    lookup = {}
+    for i, v in enumerate(values):
+        try:
+            ordinal = lookup.get(v)
+        except TypeError:  # unhashable
+            ordinal = None
+        if ordinal is None:
+            ordinal = to_ordinal(v)
+            try:
+                lookup[v] = ordinal
+            except TypeError:
+                pass
+        out[i] = ordinal
+    return out
+
+
+def to_datetime64(values) -> np.ndarray:
+    """datetime64[D] column for a sequence of date values; NaT where missing or unparseable."""
+    ordinals = to_ordinals(values)
+    out = (ordinals.astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]")
+    out[ordinals == NO_DATE] = np.datetime64("NaT")
+    return out
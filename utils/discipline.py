@@ -8,28 +8,129 @@ Phase 12: Auto-Scaling Gatekeeper
 """
 
 import datetime
-from utils.preferences import load_preferences
-from utils.analytics import calculate_expectancy
+from bisect import bisect_right
+from functools import lru_cache
+
+import numpy as np
+
+from utils.exposure import (
+    MAX_CONTRACT_SKEW, MAX_EXPIRY_CLUSTER, MAX_SYMBOL_ALLOCATION, ExposureIndex, open_positions, open_trades,
+)
+from utils.preferences import PREFS_PATH, load_preferences, preferences_version
+from utils.trade_table import load_trade_table
+
+MIN_REWARD_RISK = 1.5  # default floor for max_gain / max_loss
+
+
+# ---------------------------
+# Compiled Scaling Ladder
+# ---------------------------
+
+class Ladder:
+    """
+    Scaling-ladder rungs compiled for lookups.
+    The allowed rung for a size is the largest rung <= contracts (the first
+    configured rung if none is), found by binary search over sorted rungs.
+    Ungraduated traders only get the first two configured rungs.
+    """
+
+    def __init__(self, rungs, enforce_live=True, warn_sim=True):
+        self.rungs = tuple(rungs) or (1,)
+        self.enforce_live = enforce_live
+        self.warn_sim = warn_sim
+        self.floor = self.rungs[0]
+        self._views = {True: sorted(self.rungs), False: sorted(self.rungs[:2])}
+        self._arrays = {k: np.asarray(v) for k, v in self._views.items()}
+
+    @classmethod
+    def from_prefs(cls, prefs):
+        ladder_prefs = prefs.get("ladder", {})
+        return _compile_ladder(
+            tuple(ladder_prefs.get("contracts", [1])),
+            ladder_prefs.get("enforce_live", True),
+            ladder_prefs.get("warn_sim", True),
+        )
+
+    def view(self, graduated=False):
+        """Sorted rungs available at this graduation state."""
+        return self._views[bool(graduated)]
+
+    def allowed(self, contracts, graduated=False):
+        """Allowed rung for one order size."""
+        view = self._views[bool(graduated)]
+        i = bisect_right(view, contracts)
+        return view[i - 1] if i else self.floor
+
+    def allowed_many(self, contracts, graduated=False):
+        """
+        Allowed rung for a whole column of sizes in one searchsorted call.
+        graduated may be a bool or a per-trade boolean array.
+        """
+        contracts = np.asarray(contracts)
+
+        def resolve(view):
+            pos = np.searchsorted(view, contracts, side="right")
+            return np.where(pos > 0, view[np.maximum(pos - 1, 0)], self.floor)
+
+        if np.ndim(graduated) == 0:
+            return resolve(self._arrays[bool(graduated)])
+        return np.where(graduated, resolve(self._arrays[True]), resolve(self._arrays[False]))
+
+    def enforced(self, mode):
+        mode = mode.upper()
+        return (mode == "LIVE" and self.enforce_live) or (mode == "SIM" and self.warn_sim)
+
+
+@lru_cache(maxsize=64)
+def _compile_ladder(rungs, enforce_live, warn_sim):
+    return Ladder(rungs, enforce_live, warn_sim)
+
+
+_PREFS_CACHE = {}  # (abs preferences path, name) -> (preferences_version, value)
+
+
+def _cached_for_prefs(path, name, build):
+    """build(prefs) memoized until the preferences file changes."""
+    version = preferences_version(path)
+    key = (version[0], name)
+    cached = _PREFS_CACHE.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    value = build(load_preferences(path))
+    _PREFS_CACHE[key] = (version, value)
+    return value
+
+
+def load_cached_preferences(path=PREFS_PATH):
+    """load_preferences(path), re-read only when the file changes."""
+    return _cached_for_prefs(path, "prefs", lambda prefs: prefs)
+
+
+def load_ladder(path=PREFS_PATH):
+    """Ladder from the preferences file, recompiled only when the file changes."""
+    return _cached_for_prefs(path, "ladder", Ladder.from_prefs)
+
+
+def _resolve_ladder(prefs, ladder):
+    if ladder is not None:
+        return ladder
+    return Ladder.from_prefs(prefs) if prefs is not None else load_ladder()
 
 
 # ---------------------------
 # Pre-Check: Gatekeeper (Phase 12)
 # ---------------------------
 
-def precheck_trade_entry(trade, mode="SIM", graduated=False):
+def precheck_trade_entry(trade, mode="SIM", graduated=False, prefs=None, ladder=None):
     """
     Auto-block trades that exceed ladder rung before logging.
+    The ladder defaults to the compiled preferences-file ladder (see load_ladder);
+    pass prefs or a Ladder to evaluate another preference set.
     Returns (allowed: bool, message: str)
     """
-    prefs = load_preferences()
-    ladder_prefs = prefs.get("ladder", {})
-    allowed_rungs = ladder_prefs.get("contracts", [1])
-
-    if not graduated:
-        allowed_rungs = allowed_rungs[:2]
-
+    ladder = _resolve_ladder(prefs, ladder)
     contracts = trade.get("contracts", 0)
-    allowed = max([r for r in allowed_rungs if r <= contracts], default=allowed_rungs[0])
+    allowed = ladder.allowed(contracts, graduated)
 
     if contracts > allowed:
         msg = f"Trade {trade.get('symbol')} {contracts} exceeds ladder rung {allowed}."
@@ -45,29 +146,22 @@ def precheck_trade_entry(trade, mode="SIM", graduated=False):
 # Scaling Ladder Enforcement
 # ---------------------------
 
-def check_scaling_ladder(trades, mode="SIM", graduated=False):
-    prefs = load_preferences()
-    ladder_prefs = prefs.get("ladder", {})
-    allowed_rungs = ladder_prefs.get("contracts", [1])
-    enforce_live = ladder_prefs.get("enforce_live", True)
-    warn_sim = ladder_prefs.get("warn_sim", True)
-
-    if not graduated:
-        allowed_rungs = allowed_rungs[:2]
-
+def check_scaling_ladder(trades, mode="SIM", graduated=False, prefs=None, ladder=None):
+    ladder = _resolve_ladder(prefs, ladder)
     violations = []
 
-    for trade in trades:
-        contracts = trade.get("contracts", 0)
-        allowed = max([r for r in allowed_rungs if r <= contracts], default=allowed_rungs[0])
+    # Allowed rung for every trade in one batched lookup
+    sizes = [trade.get("contracts", 0) for trade in trades]
+    allowed_rungs = ladder.allowed_many(sizes, graduated).tolist() if sizes else []
 
+    for trade, contracts, allowed in zip(trades, sizes, allowed_rungs):
         if contracts > allowed:
             msg = f"Trade {trade.get('symbol')} {contracts} exceeds ladder rung {allowed}."
-            if mode.upper() == "LIVE" and enforce_live:
+            if mode.upper() == "LIVE" and ladder.enforce_live:
                 violations.append(f"❌ Scaling violation: {msg}")
                 trade["scaling_violation"] = True
                 trade.setdefault("violation_details", []).append(f"❌ {msg}")
-            elif mode.upper() == "SIM" and warn_sim:
+            elif mode.upper() == "SIM" and ladder.warn_sim:
                 violations.append(f"⚠️ Scaling warning: {msg}")
                 trade["scaling_violation"] = True
                 trade.setdefault("violation_details", []).append(f"⚠️ {msg}")
@@ -82,84 +176,217 @@ def check_scaling_ladder(trades, mode="SIM", graduated=False):
 # Profitability Enforcement (Phase 11)
 # ---------------------------
 
-def check_profitability(trades, mode="SIM"):
-    violations = []
+def _trade_pnl(trade):
+    """PnL as calculate_expectancy([trade]) reads it (pnl / realized / realized_pnl, else 0)."""
+    pnl = trade.get("pnl", trade.get("realized", trade.get("realized_pnl")))
+    try:
+        return float(pnl) if pnl is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
 
-    for trade in trades:
-        exp_val = trade.get("expectancy")
-        rr_ratio = None
-
-        if exp_val is None:
-            exp_data = calculate_expectancy([trade])
-            exp_val = exp_data["expectancy"]
-            trade["expectancy"] = exp_val
-
-        max_gain = trade.get("max_gain")
-        max_loss = trade.get("max_loss")
-        if max_gain and max_loss and max_loss > 0:
-            rr_ratio = max_gain / max_loss
-            trade["reward_risk"] = rr_ratio
-
-        if exp_val is not None and exp_val <= 0:
-            msg = f"Trade {trade.get('symbol')} has negative expectancy ({exp_val:.2f})."
-            if mode.upper() == "LIVE":
-                violations.append(f"❌ Profitability violation: {msg}")
-                trade["profit_violation"] = True
-                trade.setdefault("violation_details", []).append(f"❌ {msg}")
-            else:
-                violations.append(f"⚠️ Profitability warning: {msg}")
-                trade["profit_violation"] = True
-                trade.setdefault("violation_details", []).append(f"⚠️ {msg}")
 
-        if rr_ratio is not None and rr_ratio < 1.5:
-            msg = f"Trade {trade.get('symbol')} reward:risk {rr_ratio:.2f} below 1.5."
-            if mode.upper() == "LIVE":
-                violations.append(f"❌ Profitability violation: {msg}")
-                trade["profit_violation"] = True
-                trade.setdefault("violation_details", []).append(f"❌ {msg}")
-            else:
-                violations.append(f"⚠️ Profitability warning: {msg}")
+def reward_risk_ratio(max_gain, max_loss):
+    """(has_rr, max_gain / max_loss) arrays; the ratio only exists when max_gain != 0 and max_loss > 0 (else NaN)."""
+    max_gain = np.asarray(max_gain, dtype=np.float64)
+    max_loss = np.asarray(max_loss, dtype=np.float64)
+    has_rr = (max_gain != 0) & (max_loss > 0)
+    ratio = np.full(len(max_gain), np.nan)
+    np.divide(max_gain, max_loss, out=ratio, where=has_rr)
+    return has_rr, ratio
+
+
+def profitability_masks(expectancy, reward_risk, min_rr=MIN_REWARD_RISK):
+    """
+    (negative expectancy, reward:risk below min_rr) masks, the two profitability rules.
+    Shared by ProfitabilityCheck, replay and sweep so they flag the same trades.
+    """
+    with np.errstate(invalid="ignore"):
+        return np.asarray(expectancy) <= 0, np.asarray(reward_risk) < min_rr
+
+
+class ProfitabilityCheck:
+    """
+    Profitability rules for a batch of trades, evaluated with array masks.
+    - Expectancy: the trade's own "expectancy", else its PnL (single-trade expectancy)
+    - Reward:risk = max_gain / max_loss when both are set and max_loss > 0
+    - negative / low_rr / violations are boolean masks in trade order
+    Columns come from a TradeTable when one is given (e.g. the journal's cached
+    load_trade_table(), so nothing is read per trade), else straight from the dicts.
+    Messages and violation_details strings are only formatted for flagged trades,
+    and only on request (messages(), annotate()).
+    """
+
+    def __init__(self, trades=None, mode="SIM", prefs=None, table=None):
+        self.trades = trades if isinstance(trades, list) or trades is None else list(trades)
+        self.live = mode.upper() == "LIVE"
+        self.min_rr = (prefs or {}).get("min_reward_risk", MIN_REWARD_RISK)
+
+        if table is not None:
+            self.missing = np.isnan(table.stored_expectancy)
+            self.expectancy = np.where(self.missing, table.pnl, table.stored_expectancy)
+            max_gain, max_loss = table.max_gain, np.nan_to_num(table.max_loss, nan=0.0)
+            self._symbols = (table.symbol, table.symbols)
+        else:
+            n = len(self.trades)
+            given = [t.get("expectancy") for t in self.trades]
+            self.missing = np.fromiter((e is None for e in given), dtype=bool, count=n)
+            self.expectancy = np.fromiter(
+                (_trade_pnl(t) if e is None else e for t, e in zip(self.trades, given)), dtype=np.float64, count=n
+            )
+            max_gain = np.fromiter((t.get("max_gain") or 0 for t in self.trades), dtype=np.float64, count=n)
+            max_loss = np.fromiter((t.get("max_loss") or 0 for t in self.trades), dtype=np.float64, count=n)
+            self._symbols = None
+
+        self.has_rr, self.reward_risk = reward_risk_ratio(max_gain, max_loss)
+        self.negative, self.low_rr = profitability_masks(self.expectancy, self.reward_risk, self.min_rr)
+        self.violations = self.negative | self.low_rr
+        self._formatted = None
+
+    @classmethod
+    def for_journal(cls, path, mode="SIM", prefs=None):
+        """Check over a journal's cached TradeTable columns (messages only; nothing to annotate)."""
+        return cls(None, mode=mode, prefs=prefs, table=load_trade_table(path))
+
+    def _hit_symbols(self, hits):
+        if self._symbols is None:
+            return [self.trades[i].get("symbol") for i in hits]
+        codes, labels = self._symbols
+        return [labels[c] if c >= 0 else None for c in codes[hits].tolist()]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.violations))
+
+    def _details(self):
+        """(trade index, [messages]) for each violating trade, formatted on first use."""
+        if self._formatted is None:
+            hits = np.flatnonzero(self.violations)
+            symbols = self._hit_symbols(hits)
+            negative, low_rr = self.negative[hits].tolist(), self.low_rr[hits].tolist()
+            expectancy, reward_risk = self.expectancy[hits].tolist(), self.reward_risk[hits].tolist()
+            formatted = []
+            for k, i in enumerate(hits.tolist()):
+                msgs = []
+                if negative[k]:
+                    msgs.append(f"Trade {symbols[k]} has negative expectancy ({expectancy[k]:.2f}).")
+                if low_rr[k]:
+                    msgs.append(f"Trade {symbols[k]} reward:risk {reward_risk[k]:.2f} below {self.min_rr}.")
+                formatted.append((i, msgs))
+            self._formatted = formatted
+        return self._formatted
+
+    def messages(self):
+        """Violation messages in trade order, as check_profitability returns them."""
+        prefix = "❌ Profitability violation: " if self.live else "⚠️ Profitability warning: "
+        return [prefix + msg for _, msgs in self._details() for msg in msgs]
+
+    def annotate(self, details=True):
+        """
+        Write expectancy, reward_risk and profit_violation back onto the trade dicts,
+        plus violation_details strings unless details=False. Returns self.
+        Touches every trade dict (profit_violation is set on each), so it costs
+        O(n) dict writes; messages() alone only visits flagged trades.
+        """
+        trades = self.trades
+        expectancy = self.expectancy.tolist()
+        for i in np.flatnonzero(self.missing).tolist():
+            trades[i]["expectancy"] = expectancy[i]
+        reward_risk = self.reward_risk.tolist()
+        for i in np.flatnonzero(self.has_rr).tolist():
+            trades[i]["reward_risk"] = reward_risk[i]
+
+        for trade, violated in zip(trades, self.violations.tolist()):
+            if violated:
                 trade["profit_violation"] = True
-                trade.setdefault("violation_details", []).append(f"⚠️ {msg}")
+            elif "profit_violation" not in trade:
+                trade["profit_violation"] = False
+                trade.setdefault("violation_details", [])
+        if details:
+            icon = "❌ " if self.live else "⚠️ "
+            for i, msgs in self._details():
+                trades[i].setdefault("violation_details", []).extend([icon + msg for msg in msgs])
+        return self
 
-        if "profit_violation" not in trade:
-            trade["profit_violation"] = False
-            trade.setdefault("violation_details", [])
 
-    return violations
+def check_profitability(trades, mode="SIM", prefs=None):
+    return ProfitabilityCheck(trades, mode=mode, prefs=prefs).annotate().messages()
 
 
 # ---------------------------
-# Other Checks (placeholders)
+# Exposure Checks (ExposureIndex)
 # ---------------------------
 
-def check_overexposure(portfolio):
-    return []
+def portfolio_exposure(portfolio):
+    """ExposureIndex over a portfolio's open broker positions."""
+    return ExposureIndex.from_positions(open_positions(portfolio))
+
+
+def trade_exposure(trades):
+    """ExposureIndex over the journal's open trades."""
+    return ExposureIndex.from_positions(open_trades(trades))
+
+
+def _risk_prefs(prefs):
+    prefs = prefs if prefs is not None else load_cached_preferences()
+    return prefs.get("risk_limits", {}), prefs
+
+
+def _flag(mode, label, msg):
+    if mode.upper() == "LIVE":
+        return f"❌ {label} violation: {msg}"
+    return f"⚠️ {label} warning: {msg}"
+
+
+def check_overexposure(portfolio, mode="SIM", prefs=None, index=None):
+    """Underlyings whose defined risk exceeds risk_limits.max_symbol_allocation of account_size."""
+    limits, prefs = _risk_prefs(prefs)
+    max_share = limits.get("max_symbol_allocation", MAX_SYMBOL_ALLOCATION)
+    index = index if index is not None else portfolio_exposure(portfolio)
+    return [
+        _flag(mode, "Exposure", f"{sym} risk is {share:.0%} of account, above the {max_share:.0%} limit.")
+        for sym, share in index.overexposed(prefs.get("account_size", 10000), max_share)
+    ]
+
+
+def check_expiration_clusters(trades, mode="SIM", prefs=None, index=None):
+    """ISO weeks with more open positions expiring than risk_limits.max_expiry_cluster."""
+    limits, _ = _risk_prefs(prefs)
+    max_cluster = limits.get("max_expiry_cluster", MAX_EXPIRY_CLUSTER)
+    index = index if index is not None else trade_exposure(trades)
+    return [
+        _flag(mode, "Expiration", f"{n} positions expire in {week} (limit {max_cluster}).")
+        for week, n in index.clusters(max_cluster)
+    ]
 
-def check_expiration_clusters(trades):
-    return []
 
-def check_contract_skew(portfolio):
-    return []
+def check_contract_skew(portfolio, prefs=None, index=None):
+    """Underlyings whose call/put contracts are lopsided beyond risk_limits.max_contract_skew."""
+    limits, _ = _risk_prefs(prefs)
+    max_skew = limits.get("max_contract_skew", MAX_CONTRACT_SKEW)
+    index = index if index is not None else portfolio_exposure(portfolio)
+    return [
+        f"⚠️ Skew warning: {sym} holds {calls} call vs {puts} put contracts."
+        for sym, calls, puts in index.skewed(max_skew)
+    ]
 
 
 # ---------------------------
 # Unified Discipline Runner
 # ---------------------------
 
-def run_discipline_checks(graduated=False, trades=None, portfolio=None, mode="SIM"):
+def run_discipline_checks(graduated=False, trades=None, portfolio=None, mode="SIM", prefs=None):
     violations = []
+    exposure = portfolio_exposure(portfolio) if portfolio else None  # shared by overexposure and skew
 
     if trades:
-        violations.extend(check_scaling_ladder(trades, mode=mode, graduated=graduated))
+        violations.extend(check_scaling_ladder(trades, mode=mode, graduated=graduated, prefs=prefs))
     if trades:
-        violations.extend(check_profitability(trades, mode=mode))
+        violations.extend(check_profitability(trades, mode=mode, prefs=prefs))
     if portfolio:
-        violations.extend(check_overexposure(portfolio))
+        violations.extend(check_overexposure(portfolio, mode=mode, prefs=prefs, index=exposure))
     if trades:
-        violations.extend(check_expiration_clusters(trades))
+        violations.extend(check_expiration_clusters(trades, mode=mode, prefs=prefs))
     if portfolio:
-        violations.extend(check_contract_skew(portfolio))
+        violations.extend(check_contract_skew(portfolio, prefs=prefs, index=exposure))
 
     blocked = any("❌" in v for v in violations)
 
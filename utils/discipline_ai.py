@@ -6,120 +6,444 @@ Phase 18: Continuous Discipline AI
 - Provides real-time corrective guidance
 - Aggregates repeated violations into summaries
 - Reinforces positive behavior (clean sessions)
+
+Habit rules read shared accumulators filled in one pass. HabitTracker keeps
+those accumulators current per journal append/close in O(1) and persists
+them next to the journal from the journal event hook only (reads rebuild in
+memory); the full scan remains the validation fallback. Past days are settled
+into a running clean-session tally, so the persisted state holds per-day
+counts only for today onward and days with open trades, not one per day traded.
 """
 
 import datetime
+import json
+import os
+
+from utils.dates import NO_DATE, to_ordinal
+from utils.journal import cached_for_journal, journal_version, load_trade_records, resolve_journal_path, store_cached
+from utils.trade import Trade, iter_records
 
 
-def _flatten(trades):
-    """Helper: flatten nested lists of trades into a flat list of dicts."""
-    flat = []
-    for t in trades:
-        if isinstance(t, list):
-            flat.extend(_flatten(t))
-        elif isinstance(t, dict):
-            flat.append(t)
-    return flat
+# ---------------------------
+# Shared per-trade state
+# ---------------------------
 
+def _row(t):
+    """Compact per-trade state: (id, date, pnl, stop violated, symbol, closed)."""
+    return (t.id, t.date, t.pnl, t.exceeded_max_loss(), t.symbol, t.closed)
 
-def analyze_habits(journal: list) -> dict:
+
+class HabitState:
     """
-    Analyze trading journal for bad habits and clean sessions.
-    Args:
-        journal: list of trade dicts (possibly nested)
-    Returns:
-        dict with 'messages'
+    Accumulators the habit rules read from, filled by one push() per trade.
+    Only the accumulators named in `needs` are maintained.
+    Open trades (and their neighbours, for revenge pairs) keep their row so a
+    later close can be applied with replace() instead of a rescan.
     """
-    journal = _flatten(journal)
-    messages = []
-    today = datetime.date.today()
 
-    # ---------------------------
-    # Overtrading (daily trade count)
-    # ---------------------------
-    trades_today = [t for t in journal if t.get("date") == today.strftime("%Y-%m-%d")]
-    if len(trades_today) > 2:
-        messages.append(
-            f"[Discipline AI] {len(trades_today)} trades today — risk of overtrading. Cap at 2 per day."
+    def __init__(self, needs=None):
+        self.needs = frozenset(ACCUMULATORS if needs is None else needs)
+        unknown = self.needs - set(ACCUMULATORS)
+        if unknown:
+            raise ValueError(f"Unknown habit accumulator(s): {sorted(unknown)}")
+        self._updaters = [ACCUMULATORS[name] for name in ACCUMULATORS if name in self.needs and ACCUMULATORS[name]]
+        self.trades = 0
+        self.prev = None  # row of the last trade pushed (revenge pairs look one trade back)
+        self.day_trades = {}  # trade-date ordinal -> trades that day (unsettled days only)
+        self.day_violations = {}  # trade-date ordinal -> stop-loss violations that day (unsettled days only)
+        self.settled_clean = 0  # clean sessions among settled days
+        self.settled_through = NO_DATE  # latest settled day; earlier days may no longer have counts
+        self.revenge = 0
+        self.stop_violations = 0
+        self.symbol_counts = {}  # symbol -> trades, in first-seen order
+        self.open_positions = {}  # str(trade id) -> journal position, open trades only
+        self.rows = {}  # journal position -> row, for open trades and their neighbours
+
+    def _apply(self, row, sign):
+        day = to_ordinal(row[1])
+        for update in self._updaters:
+            update(self, row, day, sign)
+
+    def push(self, trade):
+        """Add the next trade in journal order."""
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        row, position = _row(t), self.trades
+        if "revenge" in self.needs:
+            self.revenge += _is_revenge(self.prev, row)
+        self._apply(row, 1)
+        if not t.closed and t.id is not None:
+            self.open_positions[str(t.id)] = position
+            self.rows[position] = row
+            if self.prev is not None:
+                self.rows[position - 1] = self.prev
+        elif position - 1 in self.open_positions.values():
+            self.rows[position] = row  # right-hand neighbour of an open trade
+        self.prev = row
+        self.trades += 1
+        return self
+
+    def accepts(self, trade):
+        """True if the trade's day still has its own counts (it was never settled)."""
+        day = to_ordinal(trade[1] if isinstance(trade, tuple) else trade.date)
+        return day == NO_DATE or day > self.settled_through or day in self.day_trades or day in self.day_violations
+
+    def settle(self, today=None):
+        """
+        Fold per-day counts for days before today without open trades into the
+        running clean-session tally. Those days take no further trades in journal
+        order, so the per-day dicts stay O(open trades + days from today on).
+        """
+        today = (today or datetime.date.today()).toordinal()
+        live = {to_ordinal(self.rows[p][1]) for p in self.open_positions.values()}
+        for day in [d for d in set(self.day_trades) | set(self.day_violations) if d < today and d not in live]:
+            n = self.day_trades.pop(day, 0)
+            violations = self.day_violations.pop(day, 0)
+            if "day_trades" in self.needs and "day_violations" in self.needs and n and not violations:
+                self.settled_clean += 1
+            self.settled_through = max(self.settled_through, day)
+        return self
+
+    def clean_sessions(self):
+        """Dated sessions with zero stop-loss violations."""
+        return self.settled_clean + sum(
+            1 for day, n in self.day_trades.items() if n and not self.day_violations.get(day)
         )
 
+    def replace(self, trade):
+        """
+        Swap in a new version of an open trade (e.g. once it closes) in O(1).
+        Returns False if the trade is not tracked, in which case a rebuild is needed.
+        """
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        position = self.open_positions.get(str(t.id))
+        if position is None or not self.accepts(t):
+            return False
+        old, new = self.rows[position], _row(t)
+        before, after = self.rows.get(position - 1), self.rows.get(position + 1)
+        if "revenge" in self.needs:
+            self.revenge += (
+                _is_revenge(before, new) + _is_revenge(new, after)
+                - _is_revenge(before, old) - _is_revenge(old, after)
+            )
+        self._apply(old, -1)
+        self._apply(new, 1)
+        self.rows[position] = new
+        if position == self.trades - 1:
+            self.prev = new
+        if t.closed:
+            del self.open_positions[str(t.id)]
+            keep = {p + d for p in self.open_positions.values() for d in (-1, 0, 1)}
+            self.rows = {p: r for p, r in self.rows.items() if p in keep}
+        return True
+
     # ---------------------------
-    # Revenge trading (after losses)
+    # Persistence
     # ---------------------------
-    revenge_count = 0
-    for i in range(1, len(journal)):
-        prev, curr = journal[i - 1], journal[i]
-        if prev.get("pnl", 0) < 0 and curr.get("date") == prev.get("date"):
-            revenge_count += 1
-    if revenge_count > 0:
-        messages.append(
-            f"[Discipline AI] Detected {revenge_count} revenge trade(s). Wait before re-entering after losses."
-        )
 
-    # ---------------------------
+    def to_dict(self):
+        return {
+            "needs": sorted(self.needs),
+            "trades": self.trades,
+            "prev": self.prev,
+            "day_trades": list(self.day_trades.items()),
+            "day_violations": list(self.day_violations.items()),
+            "settled_clean": self.settled_clean,
+            "settled_through": self.settled_through,
+            "revenge": self.revenge,
+            "stop_violations": self.stop_violations,
+            "symbol_counts": list(self.symbol_counts.items()),
+            "open_positions": self.open_positions,
+            "rows": list(self.rows.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["needs"])
+        state.trades = data["trades"]
+        state.prev = tuple(data["prev"]) if data["prev"] is not None else None
+        state.day_trades = dict(data["day_trades"])
+        state.day_violations = dict(data["day_violations"])
+        state.settled_clean = data["settled_clean"]
+        state.settled_through = data["settled_through"]
+        state.revenge = data["revenge"]
+        state.stop_violations = data["stop_violations"]
+        state.symbol_counts = dict(data["symbol_counts"])
+        state.open_positions = dict(data["open_positions"])
+        state.rows = {p: tuple(r) for p, r in data["rows"]}
+        return state
+
+    def snapshot(self):
+        """Accumulator values with empty counters dropped, for comparing two states."""
+        return {
+            "trades": self.trades,
+            "revenge": self.revenge,
+            "stop_violations": self.stop_violations,
+            "day_trades": {k: v for k, v in self.day_trades.items() if v},
+            "day_violations": {k: v for k, v in self.day_violations.items() if v},
+            "clean_sessions": self.clean_sessions(),
+            "symbol_counts": {k: v for k, v in self.symbol_counts.items() if v},
+        }
+
+
+def _is_revenge(prev, row):
+    """Same-day re-entry right after a losing trade."""
+    return int(prev is not None and row is not None and prev[2] < 0 and row[1] == prev[1])
+
+
+def _count_day(state, row, day, sign):
+    if day != NO_DATE:
+        state.day_trades[day] = state.day_trades.get(day, 0) + sign
+
+
+def _count_day_violation(state, row, day, sign):
+    if day != NO_DATE:
+        state.day_violations[day] = state.day_violations.get(day, 0) + sign * row[3]
+
+
+def _count_stop_violation(state, row, day, sign):
+    state.stop_violations += sign * row[3]
+
+
+def _count_symbol(state, row, day, sign):
+    state.symbol_counts[row[4]] = state.symbol_counts.get(row[4], 0) + sign
+
+
+# Accumulator name -> per-trade update (state, row, trade-date ordinal, +1 / -1);
+# revenge counts consecutive trade pairs, so push() / replace() maintain it directly
+ACCUMULATORS = {
+    "day_trades": _count_day,
+    "day_violations": _count_day_violation,
+    "revenge": None,
+    "stop_violations": _count_stop_violation,
+    "symbol_counts": _count_symbol,
+}
+
+
+# ---------------------------
+# Habit rules
+# ---------------------------
+
+class HabitRule:
+    """A habit check: the accumulators it needs and a report(state, today) -> messages function."""
+
+    def __init__(self, name, needs, report):
+        self.name = name
+        self.needs = tuple(needs)
+        self.report = report
+
+
+def _overtrading(state, today):
+    # Overtrading (daily trade count)
+    trades_today = state.day_trades.get(today.toordinal(), 0)
+    if trades_today > 2:
+        return [f"[Discipline AI] {trades_today} trades today — risk of overtrading. Cap at 2 per day."]
+    return []
+
+
+def _revenge(state, today):
+    # Revenge trading (same-day re-entry after a loss)
+    if state.revenge > 0:
+        return [f"[Discipline AI] Detected {state.revenge} revenge trade(s). Wait before re-entering after losses."]
+    return []
+
+
+def _stop_loss(state, today):
     # Ignoring stop-loss
-    # ---------------------------
-    stop_loss_violations = sum(
-        1 for t in journal if t.get("pnl", 0) < -t.get("max_loss", -100)
-    )
-    if stop_loss_violations > 0:
-        messages.append(
-            f"[Discipline AI] {stop_loss_violations} trades exceeded planned max loss. "
+    if state.stop_violations > 0:
+        return [
+            f"[Discipline AI] {state.stop_violations} trades exceeded planned max loss. "
             f"Stick to stop-loss discipline and exit earlier."
-        )
+        ]
+    return []
 
-    # ---------------------------
+
+def _overexposure(state, today):
     # Symbol overexposure
-    # ---------------------------
-    symbol_counts = {}
-    for t in journal:
-        sym = t.get("symbol")
-        if sym:
-            symbol_counts[sym] = symbol_counts.get(sym, 0) + 1
-    for sym, count in symbol_counts.items():
-        if count > 5:
-            messages.append(
-                f"[Discipline AI] {count} trades in {sym}. Diversify to reduce symbol risk."
-            )
+    return [
+        f"[Discipline AI] {count} trades in {sym}. Diversify to reduce symbol risk."
+        for sym, count in state.symbol_counts.items()
+        if sym and count > 5
+    ]
 
-    # ---------------------------
-    # Positive Reinforcement: Clean Sessions
-    # ---------------------------
-    clean_sessions = 0
-    session_map = {}
-    for t in journal:
-        d = t.get("date")
-        if not d:
-            continue
-        if d not in session_map:
-            session_map[d] = {"violations": 0, "count": 0}
-        session_map[d]["count"] += 1
-        if t.get("pnl", 0) < -t.get("max_loss", -100):
-            session_map[d]["violations"] += 1
-
-    for d, stats in session_map.items():
-        if stats["count"] > 0 and stats["violations"] == 0:
-            clean_sessions += 1
-
-    if clean_sessions > 0:
-        messages.append(
-            f"[Discipline AI] {clean_sessions} session(s) were clean with zero violations. Stay consistent!"
-        )
 
-    # ---------------------------
+def _clean_sessions(state, today):
+    # Positive reinforcement: dated sessions with zero stop-loss violations
+    clean = state.clean_sessions()
+    if clean > 0:
+        return [f"[Discipline AI] {clean} session(s) were clean with zero violations. Stay consistent!"]
+    return []
+
+
+RULES = (
+    HabitRule("overtrading", ("day_trades",), _overtrading),
+    HabitRule("revenge", ("revenge",), _revenge),
+    HabitRule("stop_loss", ("stop_violations",), _stop_loss),
+    HabitRule("overexposure", ("symbol_counts",), _overexposure),
+    HabitRule("clean_sessions", ("day_trades", "day_violations"), _clean_sessions),
+)
+
+
+def needs_of(rules):
+    return {name for rule in rules for name in rule.needs}
+
+
+def build_state(journal, rules=RULES) -> HabitState:
+    """One pass over the journal, maintaining only what the rules need."""
+    state = HabitState(needs_of(rules))
+    for t in iter_records(journal):
+        state.push(t)
+    return state.settle()
+
+
+def report(state: HabitState, rules=RULES, today=None) -> dict:
+    """Messages from every rule, in rule order."""
+    today = today or datetime.date.today()
+    messages = []
+    for rule in rules:
+        messages.extend(rule.report(state, today))
+
     # No violations at all
-    # ---------------------------
     if not messages:
         messages.append("[Discipline AI] No bad habits detected. Stay consistent.")
-
     return {"messages": messages}
 
 
+def analyze_habits(journal: list, rules=RULES) -> dict:
+    """
+    Analyze trading journal for bad habits and clean sessions.
+    Args:
+        journal: list of trade dicts or Trade records (possibly nested)
+        rules: habit rules to run (default RULES); all share a single pass over the trades
+    Returns:
+        dict with 'messages'
+    """
+    return report(build_state(journal, rules), rules)
+
+
+# ---------------------------
+# Incremental, persisted state
+# ---------------------------
+
+class HabitTracker:
+    """
+    Habit state for one journal, updated per append / close and persisted as
+    <journal>.habits.json. The journal_version() it was last synced with is
+    stored alongside; any mismatch means the journal was edited out of band
+    and the tracker rebuilds itself from a full scan.
+    """
+
+    def __init__(self, path, state=None, version=None):
+        self.path = path
+        self.state = state or HabitState()
+        self.version = version
+
+    @staticmethod
+    def state_path(path):
+        return os.path.splitext(resolve_journal_path(path))[0] + ".habits.json"
+
+    @classmethod
+    def _read(cls, path):
+        state_file = cls.state_path(path)
+        if not os.path.exists(state_file):
+            return None
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(path, HabitState.from_dict(data["state"]), tuple(data["version"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            print(f"[DEBUG] Ignoring unreadable habit state {state_file}")
+            return None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Persisted tracker for a journal, recomputed in memory (not saved)
+        if the journal changed behind its back.
+        """
+        tracker = cls._read(path)
+        if tracker is not None and tracker.version == journal_version(path):
+            return tracker
+        return cls.rebuild(path, save=False)
+
+    @classmethod
+    def rebuild(cls, path, save=True):
+        tracker = cls(path, build_state(load_trade_records(path)), journal_version(path))
+        if save:
+            tracker.save()
+            print(f"[DEBUG] Rebuilt habit state ({tracker.state.trades} trades) -> {cls.state_path(path)}")
+        return tracker
+
+    def record(self, event, trade):
+        """
+        Apply one journal event in O(1): appends are pushed, closes / updates of
+        open trades (and appends reusing an open trade's id, which supersede it)
+        replace their row. Returns False if a rebuild is needed instead, e.g. for
+        a back-dated trade on an already settled day.
+        """
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        if event == "append" and str(t.id) not in self.state.open_positions:
+            if not self.state.accepts(t):
+                return False
+            self.state.push(t)
+        elif not self.state.replace(t):
+            return False
+        self.state.settle()
+        self.version = journal_version(self.path)
+        self.save()
+        return True
+
+    def save(self):
+        if self.version is None or self.version[1] is None:
+            return  # no journal on disk yet
+        state_file = self.state_path(self.path)
+        tmp = state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": list(self.version), "state": self.state.to_dict()}, f)
+        os.replace(tmp, state_file)
+
+    def verify(self):
+        """Accumulators that differ from a full rescan, as {name: (incremental, full)}."""
+        current = self.state.settle().snapshot()
+        full = build_state(load_trade_records(self.path)).snapshot()
+        return {k: (current[k], full[k]) for k in full if current[k] != full[k]}
+
+
+def on_journal_event(event, path, trade, previous_version):
+    """
+    journal.subscribe() hook: O(1) update on append / close of an open trade.
+    Edits to closed trades, or a stale persisted state, trigger a rebuild.
+    """
+    tracker = HabitTracker._read(path)
+    if tracker is None or tracker.version != previous_version or not tracker.record(event, trade):
+        tracker = HabitTracker.rebuild(path)
+    store_cached(path, "habits", tracker)
+
+
+def load_habits(path) -> HabitState:
+    """Habit state for a journal, without rescanning it when nothing changed."""
+    return cached_for_journal(path, "habits", HabitTracker.load).state
+
+
+def evaluate_journal(path, verify=False) -> dict:
+    """
+    Habit messages for a journal from its incremental state.
+    verify=True cross-checks against a full scan and falls back to it on any mismatch.
+    """
+    if verify:
+        tracker = HabitTracker.load(path)
+        mismatches = tracker.verify()
+        if mismatches:
+            print(f"[DEBUG] Habit state drifted from journal ({sorted(mismatches)}); rebuilding")
+            return report(HabitTracker.rebuild(path, save=False).state)
+        return report(tracker.state)
+    return report(load_habits(path))
+
+
 def evaluate(journal: list, prefs: dict = None) -> dict:
-    journal = _flatten(journal)
     return analyze_habits(journal)
 
 
 def check_alerts(session: dict) -> dict:
-    journal = _flatten(session.get("trades", []))
-    return analyze_habits(journal)
+    if session.get("journal_path"):
+        return evaluate_journal(session["journal_path"])
+    return analyze_habits(session.get("records") or session.get("trades", []))
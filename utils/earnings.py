@@ -8,6 +8,8 @@ Provides upcoming earnings events.
 
 from datetime import datetime, timedelta
 
+from utils.dates import to_date
+
 
 def get_upcoming_earnings(days_ahead=7):
     """
@@ -31,9 +33,10 @@ def get_upcoming_earnings(days_ahead=7):
         {"symbol": "GOOG", "date": (today + timedelta(days=9)).strftime("%Y-%m-%d")},  # will be filtered out if > days_ahead
     ]
 
-    upcoming = [
-        e for e in dummy_earnings
-        if datetime.strptime(e["date"], "%Y-%m-%d") <= cutoff
-    ]
+    upcoming = []
+    for e in dummy_earnings:
+        e_date = to_date(e["date"])
+        if e_date and e_date <= cutoff.date():
+            upcoming.append(e)
 
     return upcoming
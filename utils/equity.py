@@ -0,0 +1,273 @@
+"""
+utils/equity.py
+
+Equity-curve analytics over the journal's closed trades (journal order).
+- Cumulative-sum equity and running-max peak arrays; extend() appends in place
+- Max drawdown, longest underwater stretch and recovery time
+- Sharpe / Calmar-style ratios and per-symbol curves
+All metrics are array reductions, so millions of trades need no Python-level loops.
+"""
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from utils.journal import cached_for_journal
+from utils.trade import Trade, as_trades
+from utils.dates import NO_DATE, to_ordinals
+from utils.trade_table import load_trade_table
+
+TRADING_DAYS = 252
+
+
+def _run_lengths(mask: np.ndarray):
+    """(start, length) arrays for each run of True in a boolean mask."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges[::2], edges[1::2] - edges[::2]
+
+
+class EquityCurve:
+    """Cumulative PnL curve with growable buffers; extend() is O(k) per k appended trades."""
+
+    def __init__(self, start_balance: float = 0.0, capacity: int = 1024):
+        self.start_balance = float(start_balance)
+        self._n = 0
+        self._pnl = np.empty(capacity, dtype=np.float64)
+        self._equity = np.empty(capacity, dtype=np.float64)
+        self._peak = np.empty(capacity, dtype=np.float64)
+        self._date = np.empty(capacity, dtype=np.int32)
+        self._symbol = np.empty(capacity, dtype=np.int32)
+        self.symbols = []
+        self._symbol_codes = {}
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+
+    @classmethod
+    def from_trades(cls, trades, start_balance: float = 0.0) -> "EquityCurve":
+        """Curve over the closed trades in an iterable of dicts or Trade records."""
+        closed = [t for t in as_trades(trades) if t.closed]
+        curve = cls(start_balance, capacity=max(1024, len(closed)))
+        curve.extend(
+            [t.pnl for t in closed],
+            dates=[t.closed_date or t.date for t in closed],
+            symbols=[t.symbol for t in closed],
+        )
+        return curve
+
+    @classmethod
+    def from_table(cls, table, start_balance: float = 0.0) -> "EquityCurve":
+        """Curve from a TradeTable's columns, without touching per-trade objects."""
+        closed = table.closed
+        curve = cls(start_balance, capacity=max(1024, int(closed.sum())))
+        dates = np.where(table.closed_date != NO_DATE, table.closed_date, table.date)[closed]
+        curve.symbols = list(table.symbols)
+        curve._symbol_codes = {s: i for i, s in enumerate(curve.symbols)}
+        curve._append(table.pnl[closed], dates, table.symbol[closed])
+        return curve
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._n + extra
+        if needed <= len(self._pnl):
+            return
+        capacity = max(needed, 2 * len(self._pnl))
+        for name in ("_pnl", "_equity", "_peak", "_date", "_symbol"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._n] = old[: self._n]
+            setattr(self, name, new)
+
+    def _code(self, symbol) -> int:
+        if symbol is None:
+            return -1
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = self._symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+
+    def _append(self, pnl: np.ndarray, dates: np.ndarray, symbols: np.ndarray) -> None:
+        k = len(pnl)
+        if not k:
+            return
+        self._reserve(k)
+        lo, hi = self._n, self._n + k
+        last_equity = self._equity[lo - 1] if lo else 0.0
+        last_peak = self._peak[lo - 1] if lo else 0.0
+        self._pnl[lo:hi] = pnl
+        np.cumsum(pnl, out=self._equity[lo:hi])
+        self._equity[lo:hi] += last_equity
+        np.maximum.accumulate(self._equity[lo:hi], out=self._peak[lo:hi])
+        np.maximum(self._peak[lo:hi], last_peak, out=self._peak[lo:hi])
+        self._date[lo:hi] = dates
+        self._symbol[lo:hi] = symbols
+        self._n = hi
+
+    def extend(self, pnl, dates=None, symbols=None) -> "EquityCurve":
+        """Append trades' PnL (with optional ISO dates and symbols)."""
+        pnl = np.asarray(pnl, dtype=np.float64)
+        k = len(pnl)
+        date_codes = to_ordinals(dates) if dates is not None else np.full(k, NO_DATE, dtype=np.int32)
+        symbol_codes = np.full(k, -1, dtype=np.int32)
+        if symbols is not None:
+            symbol_codes[:] = [self._code(s) for s in symbols]
+        self._append(pnl, date_codes, symbol_codes)
+        return self
+
+    def push(self, trade) -> "EquityCurve":
+        """Append one trade (dict or Trade) if it is closed."""
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        if t.closed:
+            self.extend([t.pnl], dates=[t.closed_date or t.date], symbols=[t.symbol])
+        return self
+
+    # -----------------------------
+    # Arrays
+    # -----------------------------
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return self._pnl[: self._n]
+
+    @property
+    def equity(self) -> np.ndarray:
+        """Account balance after each trade."""
+        return self.start_balance + self._equity[: self._n]
+
+    @property
+    def peak(self) -> np.ndarray:
+        """Running high-water mark (the starting balance counts as the first peak)."""
+        return self.start_balance + np.maximum(self._peak[: self._n], 0.0)
+
+    @property
+    def drawdown(self) -> np.ndarray:
+        """Distance below the high-water mark after each trade (<= 0)."""
+        return self.equity - self.peak
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+
+    def max_drawdown(self) -> Dict[str, Any]:
+        """
+        Deepest drawdown with its peak / trough / recovery trade indices.
+        pct is relative to start_balance + peak PnL, so it is None without a starting balance.
+        """
+        if not self._n:
+            return {"amount": 0.0, "pct": 0.0, "peak": None, "trough": None, "recovery": None, "recovery_trades": None}
+        drawdown = self.drawdown
+        trough = int(drawdown.argmin())
+        amount = float(-drawdown[trough])
+        if amount <= 0:
+            return {"amount": 0.0, "pct": 0.0, "peak": None, "trough": None, "recovery": None, "recovery_trades": None}
+        peak_value = self.peak[trough]
+        at_peak = np.flatnonzero(self.equity[:trough] >= peak_value)
+        recovered = np.flatnonzero(drawdown[trough:] >= 0)
+        recovery = int(trough + recovered[0]) if len(recovered) else None
+        return {
+            "amount": amount,
+            "pct": float(amount / peak_value * 100) if self.start_balance > 0 else None,
+            "peak": int(at_peak[-1]) if len(at_peak) else None,
+            "trough": trough,
+            "recovery": recovery,
+            "recovery_trades": recovery - trough if recovery is not None else None,
+        }
+
+    def underwater(self) -> Dict[str, Any]:
+        """Longest stretch below the high-water mark, in trades and (when dated) calendar days."""
+        below = self.drawdown < 0
+        starts, lengths = _run_lengths(below)
+        if not len(lengths):
+            return {"longest_trades": 0, "longest_days": 0, "current_trades": 0, "pct_time": 0.0}
+        i = int(lengths.argmax())
+        start, stop = starts[i], starts[i] + lengths[i]
+        # Duration runs from the last peak before the stretch to the first trade back at the peak
+        dates = self._date[: self._n]
+        first = dates[start - 1] if start > 0 else dates[start]
+        last = dates[stop] if stop < self._n else dates[stop - 1]
+        days = int(last - first) if first != NO_DATE and last != NO_DATE else None
+        return {
+            "longest_trades": int(lengths[i]),
+            "longest_days": days,
+            "current_trades": int(lengths[-1]) if starts[-1] + lengths[-1] == self._n else 0,
+            "pct_time": float(below.mean() * 100),
+        }
+
+    def ratios(self) -> Dict[str, Optional[float]]:
+        """Per-trade Sharpe, annualized Sharpe / Calmar when dated, and recovery factor."""
+        pnl = self.pnl
+        if len(pnl) < 2:
+            return {"sharpe": None, "sharpe_annual": None, "calmar": None, "recovery_factor": None}
+        std = pnl.std(ddof=1)
+        sharpe = float(pnl.mean() / std) if std > 0 else None
+        max_dd = self.max_drawdown()["amount"]
+        total = float(pnl.sum())
+
+        dates = self._date[: self._n]
+        dated = dates[dates != NO_DATE]
+        years = (dated.max() - dated.min() + 1) / 365.25 if len(dated) else 0
+        sharpe_annual = calmar = None
+        if years > 0:
+            # Aggregate to daily PnL so the annualization uses trading days, not trades
+            days = dated - dated.min()
+            daily = np.bincount(days, weights=pnl[dates != NO_DATE])
+            active = daily[np.bincount(days) > 0]
+            if len(active) > 1 and active.std(ddof=1) > 0:
+                sharpe_annual = float(active.mean() / active.std(ddof=1) * np.sqrt(TRADING_DAYS))
+            if max_dd > 0:
+                calmar = float(total / years / max_dd)
+        return {
+            "sharpe": sharpe,
+            "sharpe_annual": sharpe_annual,
+            "calmar": calmar,
+            "recovery_factor": float(total / max_dd) if max_dd > 0 else None,
+        }
+
+    def symbol_curves(self) -> Dict[str, np.ndarray]:
+        """Cumulative PnL curve per symbol, in trade order."""
+        codes = self._symbol[: self._n]
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+        curves = np.split(self.pnl[order], bounds)
+        labels = sorted_codes[np.concatenate(([0], bounds))] if self._n else []
+        return {
+            self.symbols[c] if c >= 0 else None: np.cumsum(curve)
+            for c, curve in zip(labels, curves)
+        }
+
+    def per_symbol(self) -> Dict[str, Dict[str, Any]]:
+        """Total PnL, max drawdown and trade count per symbol."""
+        report = {}
+        for symbol, curve in self.symbol_curves().items():
+            peak = np.maximum(np.maximum.accumulate(curve), 0.0)
+            report[symbol] = {
+                "total": float(curve[-1]),
+                "max_drawdown": float((peak - curve).max()),
+                "trades": int(len(curve)),
+            }
+        return report
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trades": self._n,
+            "total_pnl": float(self._equity[self._n - 1]) if self._n else 0.0,
+            "max_drawdown": self.max_drawdown(),
+            "underwater": self.underwater(),
+            "ratios": self.ratios(),
+            "per_symbol": self.per_symbol(),
+        }
+
+
+# -----------------------------
+# Journal-backed curves
+# -----------------------------
+
+def load_equity(path: str) -> EquityCurve:
+    """Equity curve for a journal; rebuilt from the cached TradeTable once per journal version."""
+    return cached_for_journal(path, "equity", lambda p: EquityCurve.from_table(load_trade_table(p)))
+
@@ -0,0 +1,238 @@
+"""
+utils/expectancy.py
+
+Unified expectancy engine.
+One O(n) pass produces every expectancy statistic used across the cockpit:
+count, wins, losses, sums, means, variance and payoff ratio.
+
+Definitions (shared by analytics, profits and AnalyticsEngine):
+  - win = pnl > 0, loss = pnl < 0, breakeven = pnl == 0 (neither)
+  - expectancy = mean PnL = win_rate × avg_win − loss_rate × avg_loss
+
+ExpectancyAccumulator keeps closed-trade expectancy current in O(1) per
+journal append/close. Only the journal.subscribe() hook persists it next to
+the journal; reads rebuild a stale accumulator in memory and never write.
+"""
+
+import json
+import math
+import os
+
+from utils.journal import cached_for_journal, iter_trades, journal_version, resolve_journal_path
+from utils.trade import Trade, iter_records
+
+
+class ExpectancyStats:
+    """Running expectancy statistics; push() one PnL at a time (Welford mean/variance)."""
+
+    __slots__ = ("count", "wins", "losses", "sum_win", "sum_loss", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.wins = 0
+        self.losses = 0
+        self.sum_win = 0.0
+        self.sum_loss = 0.0  # negative or zero
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, pnl):
+        self.count += 1
+        if pnl > 0:
+            self.wins += 1
+            self.sum_win += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.sum_loss += pnl
+        delta = pnl - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (pnl - self.mean)
+        return self
+
+    @property
+    def breakevens(self):
+        return self.count - self.wins - self.losses
+
+    @property
+    def total_pnl(self):
+        return self.sum_win + self.sum_loss
+
+    @property
+    def expectancy(self):
+        return self.mean
+
+    @property
+    def win_rate(self):
+        """Winning trades as a percentage of all trades."""
+        return self.wins / self.count * 100 if self.count else 0
+
+    @property
+    def loss_rate(self):
+        return self.losses / self.count * 100 if self.count else 0
+
+    @property
+    def avg_win(self):
+        return self.sum_win / self.wins if self.wins else 0
+
+    @property
+    def avg_loss(self):
+        """Average losing trade as a positive number."""
+        return abs(self.sum_loss) / self.losses if self.losses else 0
+
+    @property
+    def variance(self):
+        """Sample variance of PnL."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def payoff_ratio(self):
+        """avg_win / avg_loss; 0 when there are no losses to compare against."""
+        return self.avg_win / self.avg_loss if self.avg_loss else 0
+
+    def as_dict(self):
+        return {
+            "expectancy": self.expectancy,
+            "win_rate": self.win_rate,
+            "loss_rate": self.loss_rate,
+            "avg_win": self.avg_win,
+            "avg_loss": self.avg_loss,
+            "payoff_ratio": self.payoff_ratio,
+            "count": self.count,
+            "wins": self.wins,
+            "losses": self.losses,
+            "breakevens": self.breakevens,
+            "total_pnl": self.total_pnl,
+            "variance": self.variance,
+            "std": self.std,
+        }
+
+
+def compute_expectancy(trades) -> ExpectancyStats:
+    """Single pass over trades (dicts, records or a generator)."""
+    stats = ExpectancyStats()
+    for t in iter_records(trades):
+        stats.push(t.pnl)
+    return stats
+
+
+def expectancy_from_array(pnl) -> ExpectancyStats:
+    """Same statistics computed with array reductions over a NumPy PnL column."""
+    stats = ExpectancyStats()
+    stats.count = int(len(pnl))
+    if not stats.count:
+        return stats
+    win_mask, loss_mask = pnl > 0, pnl < 0
+    stats.wins = int(win_mask.sum())
+    stats.losses = int(loss_mask.sum())
+    stats.sum_win = float(pnl[win_mask].sum())
+    stats.sum_loss = float(pnl[loss_mask].sum())
+    stats.mean = float(pnl.mean())
+    stats.m2 = float(((pnl - stats.mean) ** 2).sum())
+    return stats
+
+
+# -----------------------------
+# Incremental accumulator
+# -----------------------------
+
+class ExpectancyAccumulator:
+    """
+    Closed-trade expectancy for one journal, updated per closed trade.
+    The journal_version() it was last synced with is stored alongside the
+    statistics; any mismatch means the journal was edited out of band and
+    the accumulator rebuilds itself from a streaming scan.
+    """
+
+    def __init__(self, path, stats=None, version=None):
+        self.path = path
+        self.stats = stats or ExpectancyStats()
+        self.version = version
+
+    @staticmethod
+    def state_path(path):
+        return os.path.splitext(resolve_journal_path(path))[0] + ".expectancy.json"
+
+    @classmethod
+    def _read(cls, path):
+        state_file = cls.state_path(path)
+        if not os.path.exists(state_file):
+            return None
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            stats = ExpectancyStats()
+            for name in ExpectancyStats.__slots__:
+                setattr(stats, name, state["stats"][name])
+            return cls(path, stats, tuple(state["version"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            print(f"[DEBUG] Ignoring unreadable expectancy state {state_file}")
+            return None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Persisted accumulator for a journal, recomputed in memory (not saved)
+        if the journal changed behind its back.
+        """
+        acc = cls._read(path)
+        if acc is not None and acc.version == journal_version(path):
+            return acc
+        return cls.rebuild(path, save=False)
+
+    @classmethod
+    def rebuild(cls, path, save=True):
+        stats = ExpectancyStats()
+        for t in iter_records(iter_trades(path)):
+            if t.closed:
+                stats.push(t.pnl)
+        acc = cls(path, stats, journal_version(path))
+        if save:
+            acc.save()
+            print(f"[DEBUG] Rebuilt expectancy accumulator ({stats.count} closed trades) -> {cls.state_path(path)}")
+        return acc
+
+    def record(self, trade):
+        """Add one trade (dict or Trade) if it is closed, then persist."""
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        if t.closed:
+            self.stats.push(t.pnl)
+        self.version = journal_version(self.path)
+        self.save()
+        return self
+
+    def save(self):
+        if self.version is None or self.version[1] is None:
+            return  # no journal on disk yet
+        state_file = self.state_path(self.path)
+        tmp = state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": list(self.version),
+                    "stats": {name: getattr(self.stats, name) for name in ExpectancyStats.__slots__},
+                },
+                f,
+            )
+        os.replace(tmp, state_file)
+
+
+def on_journal_event(event, path, trade, previous_version):
+    """
+    journal.subscribe() hook: O(1) update on append/close.
+    Edits to a closed trade's PnL, or a stale accumulator, trigger a rebuild.
+    """
+    acc = ExpectancyAccumulator._read(path)
+    closed = Trade.from_mapping(trade).closed
+    if acc is None or acc.version != previous_version or (event == "update" and closed):
+        ExpectancyAccumulator.rebuild(path)
+    else:
+        acc.record(trade)
+
+
+def load_expectancy(path) -> ExpectancyStats:
+    """Closed-trade expectancy for a journal, without rescanning it when nothing changed."""
+    return cached_for_journal(path, "expectancy", ExpectancyAccumulator.load).stats
@@ -0,0 +1,240 @@
+"""
+utils/exposure.py
+
+Incremental exposure index over open positions.
+- Symbol exposure: underlying -> [positions, summed defined risk (max_loss / risk)]
+- Expiry histogram: ISO week ("YYYY-Www") -> open positions expiring that week
+- Call/put counter: underlying -> [call contracts, put contracts]
+- add() / remove() / record(event, trade) touch one entry in each map (O(1));
+  sync() diffs a full position snapshot by position key (O(positions)), so a
+  refresh only re-applies positions that were opened, closed or changed
+- Broker positions stay open until explicitly closed (unrealized PnL does not
+  close them); journal trades use the journal's own status inference
+- The index has no module-level instance: callers own it and pass it in
+Discipline's overexposure / expiration-cluster / contract-skew checks and
+AnalyticsEngine._check_risks read their limits against this index.
+"""
+
+import re
+from collections.abc import Mapping
+
+from utils.attribution import iso_week_key
+from utils.journal_db import trade_columns
+
+MAX_SYMBOL_ALLOCATION = 0.3  # max defined risk per underlying, as a fraction of account_size
+MAX_EXPIRY_CLUSTER = 5  # max open positions expiring in the same ISO week
+MAX_CONTRACT_SKEW = 0.8  # max |calls − puts| / (calls + puts) per underlying
+MIN_SKEW_CONTRACTS = 4  # contracts on an underlying before skew is judged
+
+_UNDERLYING_FIELDS = ("underlying", "underlying_symbol", "underlying-symbol")
+_EXPIRY_FIELDS = ("expiry", "expiration", "expiration_date", "expires-at", "expires_at")
+_SIDE_FIELDS = ("option_type", "put_call", "putCall", "call_or_put", "option-type", "type")
+_OCC_SIDE = re.compile(r"\d{6}([CP])\d{8}$")  # e.g. "SPY   250919P00500000"
+
+
+def _first(pos, fields):
+    for f in fields:
+        value = pos.get(f)
+        if value:
+            return value
+    return None
+
+
+def _side(pos):
+    """Option side ("call" / "put") from an option-type field or an OCC option symbol, else None."""
+    value = _first(pos, _SIDE_FIELDS)
+    if isinstance(value, str):
+        v = value.strip().lower()
+        if v in ("call", "c"):
+            return "call"
+        if v in ("put", "p"):
+            return "put"
+    match = _OCC_SIDE.search(str(pos.get("symbol") or "").replace(" ", ""))
+    if match:
+        return "call" if match.group(1) == "C" else "put"
+    return None
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _underlying(pos):
+    symbol = _first(pos, _UNDERLYING_FIELDS) or pos.get("symbol")
+    compact = str(symbol or "").replace(" ", "")
+    if _OCC_SIDE.search(compact):
+        return compact[:-15]  # OCC root: drop YYMMDD + C/P + 8-digit strike
+    return symbol
+
+
+def position_entry(pos):
+    """(underlying, risk, expiry week, side, contracts) a position contributes to the index."""
+    risk = _number(pos.get("max_loss", pos.get("risk")))
+    contracts = abs(int(_number(pos.get("contracts") or pos.get("quantity"), 1.0))) or 1
+    return (_underlying(pos), risk, iso_week_key(_first(pos, _EXPIRY_FIELDS)), _side(pos), contracts)
+
+
+def position_key(pos):
+    """Identity used by sync(): the position's id, else its symbol, expiry, strike and side."""
+    if pos.get("id") is not None:
+        return pos["id"]
+    return (pos.get("symbol"), _first(pos, _EXPIRY_FIELDS), pos.get("strike"), _side(pos))
+
+
+def is_open(pos):
+    """
+    True unless a broker position is explicitly closed (status CLOSED, or a closed_date / closed_at).
+    Unlike the journal's closed-trade inference, a pnl field alone does not close it:
+    live broker positions carry unrealized PnL.
+    """
+    return (
+        str(pos.get("status") or "").upper() != "CLOSED"
+        and not pos.get("closed_date")
+        and not pos.get("closed_at")
+    )
+
+
+def is_open_trade(trade):
+    """True if a journal trade is still open, by the journal's own status inference (pnl closes it)."""
+    return trade_columns(trade)["status"] != "CLOSED"
+
+
+def open_positions(portfolio):
+    """Open broker positions from a portfolio dict ({"positions": [...]}) or a position list."""
+    if isinstance(portfolio, Mapping):
+        portfolio = portfolio.get("positions", [])
+    return [p for p in portfolio or [] if isinstance(p, Mapping) and is_open(p)]
+
+
+def open_trades(trades):
+    """Open trades from a flat list of journal trades."""
+    return [t for t in trades or [] if isinstance(t, Mapping) and is_open_trade(t)]
+
+
+class ExposureIndex:
+    """Symbol exposure, expiry-week histogram and call/put counts for open positions."""
+
+    def __init__(self):
+        self.entries = {}  # position key -> position_entry(...)
+        self.exposure = {}  # underlying -> [positions, risk]
+        self.weeks = {}  # ISO week -> positions
+        self.sides = {}  # underlying -> [call contracts, put contracts]
+
+    @classmethod
+    def from_positions(cls, positions):
+        return cls().sync(positions)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _apply(self, entry, sign):
+        symbol, risk, week, side, contracts = entry
+        cell = self.exposure.setdefault(symbol, [0, 0.0])
+        cell[0] += sign
+        cell[1] += sign * risk
+        if not cell[0]:
+            del self.exposure[symbol]
+        if week is not None:
+            count = self.weeks.get(week, 0) + sign
+            if count:
+                self.weeks[week] = count
+            else:
+                del self.weeks[week]
+        if side is not None:
+            counts = self.sides.setdefault(symbol, [0, 0])
+            counts[side == "put"] += sign * contracts
+            if not any(counts):
+                del self.sides[symbol]
+
+    def _free_key(self, base):
+        key, n = base, 0
+        while key in self.entries:
+            n += 1
+            key = (base, n)
+        return key
+
+    def add(self, position, key=None):
+        """Index one open position; returns the key to remove() it by."""
+        key = self._free_key(position_key(position) if key is None else key)
+        entry = self.entries[key] = position_entry(position)
+        self._apply(entry, +1)
+        return key
+
+    def remove(self, key):
+        """Drop a position by key; False if it was not indexed."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self._apply(entry, -1)
+        return True
+
+    def record(self, event, trade):
+        """
+        Apply one journal event (append / update / close) for a trade in O(1):
+        its previous entry is dropped and it is re-added while still open.
+        The owner of the index feeds these, e.g. from a journal.subscribe() callback.
+        """
+        key = position_key(trade)
+        self.remove(key)
+        if is_open_trade(trade):
+            self.add(trade, key)
+        return self
+
+    def sync(self, positions):
+        """
+        Make the index match a snapshot of positions (dicts), re-applying only what changed.
+        Diffing the snapshot is O(positions) per call; use add() / remove() / record()
+        when individual changes are known. Identical positions without an id are told
+        apart by occurrence.
+        """
+        fresh = {}
+        for pos in positions:
+            base = position_key(pos)
+            key, n = base, 0
+            while key in fresh:
+                n += 1
+                key = (base, n)
+            fresh[key] = pos
+
+        for key in [k for k in self.entries if k not in fresh]:
+            self.remove(key)
+        for key, pos in fresh.items():
+            entry = position_entry(pos)
+            old = self.entries.get(key)
+            if old == entry:
+                continue
+            if old is not None:
+                self._apply(old, -1)
+            self.entries[key] = entry
+            self._apply(entry, +1)
+        return self
+
+    # -----------------------------
+    # Limit checks
+    # -----------------------------
+
+    def overexposed(self, account_size, max_share=MAX_SYMBOL_ALLOCATION):
+        """[(underlying, share of account)] above max_share."""
+        if not account_size:
+            return []
+        return [
+            (sym, risk / account_size)
+            for sym, (_, risk) in self.exposure.items()
+            if risk / account_size > max_share
+        ]
+
+    def clusters(self, max_positions=MAX_EXPIRY_CLUSTER):
+        """[(ISO week, positions)] with more than max_positions expiring, by week."""
+        return sorted((week, n) for week, n in self.weeks.items() if n > max_positions)
+
+    def skewed(self, max_skew=MAX_CONTRACT_SKEW, min_contracts=MIN_SKEW_CONTRACTS):
+        """[(underlying, calls, puts)] whose call/put imbalance exceeds max_skew."""
+        out = []
+        for sym, (calls, puts) in self.sides.items():
+            total = calls + puts
+            if total >= min_contracts and abs(calls - puts) / total > max_skew:
+                out.append((sym, calls, puts))
+        return out
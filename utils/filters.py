@@ -9,6 +9,8 @@ Phase 16: Advanced Market Filters
 
 from datetime import datetime, timedelta
 
+from utils.dates import days_until
+
 def check_filters(market: dict, events: list = None, vix: float = None) -> dict:
     """
     Evaluate advanced filters.
@@ -27,15 +29,12 @@ def check_filters(market: dict, events: list = None, vix: float = None) -> dict:
     for sym, data in market.get("symbols", {}).items():
         earnings_date = data.get("earnings_date")
         if earnings_date:
-            try:
-                e_date = datetime.strptime(earnings_date, "%Y-%m-%d").date()
-                if abs((e_date - today).days) <= 3:
-                    compliant = False
-                    messages.append(
-                        f"🚫 {sym} has earnings {earnings_date} — no trades allowed ±3 days."
-                    )
-            except Exception:
-                pass
+            days = days_until(earnings_date, today)
+            if days is not None and abs(days) <= 3:
+                compliant = False
+                messages.append(
+                    f"🚫 {sym} has earnings {earnings_date} — no trades allowed ±3 days."
+                )
 
     # Macro event filter
     if events:
@@ -4,9 +4,17 @@ utils/graduation.py
 Graduation Gate — SIM → LIVE Readiness
 """
 
+import json
 import os
-from utils.analytics import calculate_expectancy
-from utils.journal import load_all_trades
+from collections import deque
+
+from utils.bootstrap import graduation_confidence
+from utils.dates import NO_DATE, to_ordinal
+from utils.expectancy import ExpectancyStats, expectancy_from_array
+from utils.journal import cached_for_journal, journal_version, load_trade_records, resolve_journal_path, store_cached
+from utils.trade import Trade, as_trades
+from utils.time_index import TimeIndex
+from utils.trade_table import load_trade_table
 from utils.broker import broker_status, BrokerSession
 from utils.preferences import load_preferences
 
@@ -14,65 +22,302 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 JOURNAL_PATH = os.path.join(BASE_DIR, "trade_journal.json")
 
 
-def _flatten_trades(trades):
-    """Helper: flatten nested lists of trades into a flat list of dicts."""
-    flat = []
-    for t in trades:
-        if isinstance(t, list):
-            flat.extend(_flatten_trades(t))
-        elif isinstance(t, dict):
-            flat.append(t)
-    return flat
+def _compute_clean_sessions(trades):
+    """
+    Compute clean sessions by trade date (no stop-loss violations).
+    `trades` may be a generator such as journal.iter_trades(path).
+    """
+    return TimeIndex.from_trades(trades, field="date").clean_sessions()
 
 
-def _compute_clean_sessions(trades):
-    """Compute clean sessions by trade date (no stop-loss violations)."""
-    sessions = {}
-    for t in trades:
-        if not isinstance(t, dict):
-            continue
-        date = t.get("date")
-        if not date:
-            continue
-        if date not in sessions:
-            sessions[date] = {"violations": 0, "count": 0}
-        sessions[date]["count"] += 1
-        if t.get("pnl", 0) < -t.get("max_loss", -100):
-            sessions[date]["violations"] += 1
-
-    clean_sessions = sum(
-        1 for stats in sessions.values() if stats["count"] > 0 and stats["violations"] == 0
-    )
-    return clean_sessions
+class GraduationTracker:
+    """
+    Graduation metrics for one journal, updated one trade at a time.
+    Keeps the trade count, clean-session tally, expectancy over all trades
+    (open trades count at their PnL, as calculate_expectancy(trades) does)
+    and a 10-trade ring buffer for the loss streak, so the verdict never
+    rescans the journal. Persisted as <journal>.graduation.json by the
+    journal.subscribe() hook with only the latest trading day's counts, so a
+    save is O(1); a trade dated before that day triggers a rebuild instead.
+    """
+
+    STREAK_WINDOW = 10
+
+    def __init__(self, path=None, version=None):
+        self.path = path
+        self.version = version
+        self.count = 0
+        self.sessions = {}  # trade-date ordinal -> [trades, stop-loss violations], from first_day on
+        self.first_day = None  # oldest ordinal self.sessions covers (the latest day once persisted)
+        self.last_day = None
+        self.days = 0  # dated sessions
+        self.clean = 0
+        self.expectancy = ExpectancyStats()
+        self.recent_losses = deque(maxlen=self.STREAK_WINDOW)
+
+    @staticmethod
+    def state_path(path):
+        return os.path.splitext(resolve_journal_path(path))[0] + ".graduation.json"
+
+    @classmethod
+    def _read(cls, path):
+        state_file = cls.state_path(path)
+        if not os.path.exists(state_file):
+            return None
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            tracker = cls(path, tuple(state["version"]))
+            tracker.count, tracker.days, tracker.clean = state["count"], state["days"], state["clean"]
+            for name in ExpectancyStats.__slots__:
+                setattr(tracker.expectancy, name, state["expectancy"][name])
+            tracker.recent_losses.extend(state["recent_losses"])
+            if state["last_day"] is not None:
+                day, trades, violations = state["last_day"]
+                tracker.sessions = {day: [trades, violations]}
+                tracker.first_day = tracker.last_day = day
+            return tracker
+        except (OSError, ValueError, KeyError, TypeError):
+            print(f"[DEBUG] Ignoring unreadable graduation state {state_file}")
+            return None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Persisted tracker for a journal, recomputed in memory (not saved)
+        if the journal changed behind its back.
+        """
+        tracker = cls._read(path)
+        if tracker is not None and tracker.version == journal_version(path):
+            return tracker
+        return cls.rebuild(path, save=False)
+
+    @classmethod
+    def rebuild(cls, path, save=True):
+        tracker = cls(path, journal_version(path))
+        for t in load_trade_records(path):
+            tracker.push(t)
+        if save:
+            tracker.save()
+            print(f"[DEBUG] Rebuilt graduation tracker ({tracker.count} trades) -> {cls.state_path(path)}")
+        return tracker
+
+    def push(self, trade):
+        """Add one trade (dict or Trade record) in journal order."""
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        self.count += 1
+        ordinal = to_ordinal(t.date)
+        if ordinal != NO_DATE:
+            day = self.sessions.get(ordinal)
+            if day is None:
+                day = self.sessions[ordinal] = [0, 0]
+                self.days += 1
+                self.clean += 1
+                self.first_day = ordinal if self.first_day is None else min(self.first_day, ordinal)
+                self.last_day = ordinal if self.last_day is None else max(self.last_day, ordinal)
+            day[0] += 1
+            if t.exceeded_max_loss():
+                if day[1] == 0:
+                    self.clean -= 1
+                day[1] += 1
+        self.expectancy.push(t.pnl)
+        self.recent_losses.append(t.pnl < 0)
+        return self
+
+    def record(self, trade):
+        """
+        Apply an appended trade and persist; False if it is dated before the days
+        this tracker still holds (a rebuild is needed to tell whether that day is new).
+        """
+        t = trade if isinstance(trade, Trade) else Trade.from_mapping(trade)
+        ordinal = to_ordinal(t.date)
+        if ordinal != NO_DATE and self.first_day is not None and ordinal < self.first_day:
+            return False
+        self.push(t)
+        self.version = journal_version(self.path)
+        self.save()
+        return True
+
+    def save(self):
+        if self.version is None or self.version[1] is None:
+            return  # no journal on disk yet
+        last = self.sessions.get(self.last_day) if self.last_day is not None else None
+        state_file = self.state_path(self.path)
+        tmp = state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": list(self.version),
+                    "count": self.count,
+                    "days": self.days,
+                    "clean": self.clean,
+                    "expectancy": {name: getattr(self.expectancy, name) for name in ExpectancyStats.__slots__},
+                    "recent_losses": list(self.recent_losses),
+                    "last_day": [self.last_day, *last] if last is not None else None,
+                },
+                f,
+            )
+        os.replace(tmp, state_file)
+
+    def loss_streak(self):
+        """Longest run of consecutive losers in the last STREAK_WINDOW trades."""
+        longest = run = 0
+        for lost in self.recent_losses:
+            run = run + 1 if lost else 0
+            longest = max(longest, run)
+        return longest
+
+    def metrics(self):
+        return {
+            "trades": self.count,
+            "clean_sessions": self.clean,
+            "expectancy": self.expectancy.expectancy,
+            "win_rate": self.expectancy.win_rate,
+            "loss_streak": self.loss_streak(),
+        }
+
+    def verify(self):
+        """
+        Cross-check the incremental metrics against a full recompute.
+        Returns a {metric: (tracked, recomputed)} dict of mismatches (empty when consistent).
+        """
+        expected = _recompute_metrics(self.path)
+        actual = self.metrics()
+        return {
+            k: (actual[k], v) for k, v in expected.items()
+            if abs(actual[k] - v) > 1e-9 * max(1.0, abs(v))
+        }
+
+
+def load_tracker(path=None):
+    """Tracker for a journal: the persisted state when current, else rebuilt in memory."""
+    return cached_for_journal(path or JOURNAL_PATH, "graduation", GraduationTracker.load)
 
 
-def check_graduation(discipline=None, session: BrokerSession = None, path: str = None, test_mode=False):
+def on_journal_event(event, path, trade, previous_version):
     """
-    Decide if the trader is ready to graduate from SIM to LIVE.
+    journal.subscribe() hook: appends are recorded in O(1) and persisted.
+    Updates change a trade already counted, and stale or back-dated state, trigger a rebuild.
+    """
+    tracker = GraduationTracker._read(path)
+    if tracker is None or tracker.version != previous_version or event != "append" or not tracker.record(trade):
+        tracker = GraduationTracker.rebuild(path)
+    store_cached(path, "graduation", tracker)
+
+
+def _recompute_metrics(path):
+    """Graduation metrics from a full pass over the journal (verification reference)."""
+    table = load_trade_table(path)
+    stats = expectancy_from_array(table.pnl)
+    return {
+        "trades": len(table),
+        "clean_sessions": table.clean_sessions(),
+        "expectancy": stats.expectancy,
+        "win_rate": stats.win_rate,
+        "loss_streak": table.max_loss_streak(last=GraduationTracker.STREAK_WINDOW),
+    }
+
+
+def evaluate_graduation(metrics, prefs, session=None, confidence=None):
+    """
+    Pure graduation criteria over precomputed metrics
+    (trades, clean_sessions, expectancy, win_rate, loss_streak).
     Returns a dict with {graduated: bool, message: str}.
-    In test_mode, criteria are simplified: ≥10 trades, positive expectancy, ≥1 clean session.
     """
-    prefs = load_preferences()
     grad_prefs = prefs.get("graduation", {"min_trades": 25, "clean_sessions": 15})
     min_trades = grad_prefs.get("min_trades", 25)
     clean_sessions_required = grad_prefs.get("clean_sessions", 15)
     min_win_rate = grad_prefs.get("min_win_rate", 55)
 
-    trades = load_all_trades(path or JOURNAL_PATH)
-    trades = _flatten_trades(trades)
+    trades = metrics["trades"]
+    clean_sessions = metrics["clean_sessions"]
+    exp = metrics["expectancy"]
+    win_rate = metrics["win_rate"]
+
+    if trades < min_trades:
+        return {"graduated": False, "message": f"Graduation Locked - need {min_trades} trades"}
+
+    def locked(message):
+        result = {"graduated": False, "message": message}
+        if confidence is not None:
+            result["confidence"] = confidence
+        return result
+
+    if exp <= 0:
+        return locked("Graduation Locked - expectancy must be positive")
+
+    if win_rate < min_win_rate:
+        return locked(f"Graduation Locked - win rate {win_rate:.1f}% < {min_win_rate}%")
+
+    # Optional: require the lower confidence bounds to clear the thresholds too
+    if confidence is not None and grad_prefs.get("require_confidence", False):
+        exp_low = confidence["expectancy"]["low"]
+        win_low = confidence["win_rate"]["low"]
+        if exp_low <= 0 or win_low < min_win_rate:
+            return locked(
+                f"Graduation Locked - edge not yet significant "
+                f"(expectancy low {exp_low:.2f}, win rate low {win_low:.1f}%)"
+            )
+
+    # Loss streak check (last 10 trades)
+    if metrics["loss_streak"] > 2:
+        return locked("Graduation Locked - more than 2 consecutive losers in last 10 trades")
+
+    if clean_sessions < clean_sessions_required:
+        return locked(f"Graduation Locked - need {clean_sessions_required} clean sessions")
+
+    # Broker check (optional, non-blocking)
+    try:
+        broker_ok = broker_status(session)
+    except Exception:
+        broker_ok = "UNKNOWN"
+
+    if prefs.get("mode", "SIM").upper() == "LIVE" and broker_ok == "SIM":
+        return locked("Graduation Locked - broker unavailable")
+
+    result = {
+        "graduated": True,
+        "message": (
+            f"Graduation Achieved - Ready for LIVE. "
+            f"Trades {trades}/{min_trades}, "
+            f"Clean Sessions {clean_sessions}/{clean_sessions_required}, "
+            f"Expectancy {exp:.2f}, Win Rate {win_rate:.1f}%"
+        ),
+    }
+    if confidence is not None:
+        result["confidence"] = confidence
+    return result
+
+
+def check_graduation(discipline=None, session: BrokerSession = None, path: str = None, test_mode=False, verify=False):
+    """
+    Decide if the trader is ready to graduate from SIM to LIVE.
+    Returns a dict with {graduated: bool, message: str}.
+    In test_mode, criteria are simplified: ≥10 trades, positive expectancy, ≥1 clean session.
+    With verify=True the incremental tracker is cross-checked against a full recompute.
+    """
+    prefs = load_preferences()
+    path = path or JOURNAL_PATH
+
+    # Incremental metrics, rebuilt only when the journal changes
+    tracker = load_tracker(path)
+    if verify:
+        mismatches = tracker.verify()
+        if mismatches:
+            print(f"[DEBUG] GraduationTracker drift {mismatches} — rebuilding from {path}")
+            tracker = store_cached(path, "graduation", GraduationTracker.rebuild(path, save=False))
+    metrics = tracker.metrics()
 
     # Count clean sessions
     if discipline and hasattr(discipline, "sessions"):
         sessions = discipline.sessions
-        clean_sessions = sum(
+        metrics["clean_sessions"] = sum(
             1 for s in sessions if isinstance(s, dict) and s.get("clean", False)
         )
-    else:
-        clean_sessions = _compute_clean_sessions(trades)
 
     print(
-        f"[DEBUG] Loaded {len(trades)} trades | "
-        f"{clean_sessions} clean sessions from {path or JOURNAL_PATH}"
+        f"[DEBUG] Loaded {metrics['trades']} trades | "
+        f"{metrics['clean_sessions']} clean sessions from {path}"
     )
 
     # Simplified criteria for tests
@@ -87,75 +332,21 @@ def check_graduation(discipline=None, session: BrokerSession = None, path: str =
             if "clean_sessions" in session:
                 clean_override = int(session["clean_sessions"])
 
-        if exp == 0:  # fallback to computed expectancy
-            expectancy_stats = calculate_expectancy(trades)
-            exp = expectancy_stats.get("expectancy", 0)
+        if exp == 0:  # fallback to the journal's running expectancy
+            exp = metrics["expectancy"]
 
-        clean_sessions_final = clean_override if clean_override is not None else clean_sessions
+        clean_sessions_final = clean_override if clean_override is not None else metrics["clean_sessions"]
 
-        graduated = len(trades) >= 10 and exp > 0 and clean_sessions_final > 0
+        graduated = metrics["trades"] >= 10 and exp > 0 and clean_sessions_final > 0
         return {
             "graduated": graduated,
             "message": "Test Mode Graduation" if graduated else "Test Mode Rejected",
         }
 
-    # Full criteria for real use
-    if len(trades) < min_trades:
-        return {"graduated": False, "message": f"Graduation Locked - need {min_trades} trades"}
-
-    expectancy_stats = calculate_expectancy(trades)
-    exp = expectancy_stats.get("expectancy", 0)
-    win_rate = expectancy_stats.get("win_rate", 0)
-
-    if exp <= 0:
-        return {"graduated": False, "message": "Graduation Locked - expectancy must be positive"}
-
-    if win_rate < min_win_rate:
-        return {
-            "graduated": False,
-            "message": f"Graduation Locked - win rate {win_rate:.1f}% < {min_win_rate}%",
-        }
-
-    # Loss streak check (last 10 trades)
-    last_10 = trades[-10:]
-    loss_streak = 0
-    max_loss_streak = 0
-    for t in last_10:
-        if t.get("pnl", 0) < 0:
-            loss_streak += 1
-            max_loss_streak = max(max_loss_streak, loss_streak)
-        else:
-            loss_streak = 0
-    if max_loss_streak > 2:
-        return {
-            "graduated": False,
-            "message": "Graduation Locked - more than 2 consecutive losers in last 10 trades",
-        }
-
-    if clean_sessions < clean_sessions_required:
-        return {
-            "graduated": False,
-            "message": f"Graduation Locked - need {clean_sessions_required} clean sessions",
-        }
-
-    # Broker check (optional, non-blocking)
-    try:
-        broker_ok = broker_status(session)
-    except Exception:
-        broker_ok = "UNKNOWN"
-
-    if prefs.get("mode", "SIM").upper() == "LIVE" and broker_ok == "SIM":
-        return {"graduated": False, "message": "Graduation Locked - broker unavailable"}
-
-    return {
-        "graduated": True,
-        "message": (
-            f"Graduation Achieved - Ready for LIVE. "
-            f"Trades {len(trades)}/{min_trades}, "
-            f"Clean Sessions {clean_sessions}/{clean_sessions_required}, "
-            f"Expectancy {exp:.2f}, Win Rate {win_rate:.1f}%"
-        ),
-    }
+    # Bootstrap confidence intervals (cached per journal version)
+    min_trades = prefs.get("graduation", {}).get("min_trades", 25)
+    confidence = graduation_confidence(path) if metrics["trades"] >= min_trades else None
+    return evaluate_graduation(metrics, prefs, session=session, confidence=confidence)
 
 
 def check_sandbox_ready(session=None, min_clean_sessions: int = 0):
@@ -166,14 +357,14 @@ def check_sandbox_ready(session=None, min_clean_sessions: int = 0):
     if session is None:
         return {"ready": False, "reason": "No session provided"}
 
-    trades = _flatten_trades(session.get("trades", []))
+    trades = as_trades(session.get("trades", []))
     mode = session.get("mode", "").upper()
 
     # If session says SANDBOX, include all trades
     if mode == "SANDBOX":
         sandbox_trades = trades
     else:
-        sandbox_trades = [t for t in trades if isinstance(t, dict) and t.get("mode", "").upper() == "SANDBOX"]
+        sandbox_trades = [t for t in trades if t.mode == "SANDBOX"]
 
     if len(sandbox_trades) < 10:
         return {"ready": False, "reason": f"Need 10 SANDBOX trades (have {len(sandbox_trades)})"}
@@ -1,7 +1,30 @@
 import json
+import math
 import os
 
+import numpy as np
+
 STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "state.json")
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), "..", "analytics_history.bin")
+
+# Fixed-size record for the binary analytics history (one per run, appended in place).
+# The first five fields match the legacy state.json analytics_history entries.
+HISTORY_DTYPE = np.dtype([
+    ("trades", "<i4"),
+    ("winrate", "<f8"),
+    ("reward_risk", "<f8"),
+    ("risk_fraction", "<f8"),
+    ("final_balance", "<f8"),
+    ("paths", "<i4"),
+    ("start_balance", "<f8"),
+    ("final_p5", "<f8"),
+    ("final_p50", "<f8"),
+    ("final_p95", "<f8"),
+    ("drawdown_p50", "<f8"),
+    ("drawdown_p95", "<f8"),
+    ("mean_drawdown", "<f8"),
+    ("ruin_probability", "<f8"),
+])
 
 
 def load_state() -> dict:
@@ -26,20 +49,65 @@ def save_state(new_state: dict) -> None:
         pass
 
 
+def _history_record(run: dict) -> np.ndarray:
+    """Pack a run dict (legacy or Monte Carlo summary) into one HISTORY_DTYPE record."""
+    record = np.zeros(1, dtype=HISTORY_DTYPE)
+    for name in HISTORY_DTYPE.names:
+        if HISTORY_DTYPE[name].kind == "f":
+            record[name] = np.nan
+    final_q = run.get("final_quantiles", {})
+    drawdown_q = run.get("drawdown_quantiles", {})
+    values = dict(
+        run,
+        paths=run.get("paths", 1),
+        final_p5=final_q.get(5),
+        final_p50=final_q.get(50),
+        final_p95=final_q.get(95),
+        drawdown_p50=drawdown_q.get(50),
+        drawdown_p95=drawdown_q.get(95),
+    )
+    for name in HISTORY_DTYPE.names:
+        if values.get(name) is not None:
+            record[name] = values[name]
+    return record
+
+
 def append_analytics_run(run: dict) -> None:
     """
     Append an analytics run to history.
+    Runs are written as fixed-size binary records to HISTORY_FILE, so an
+    append never rewrites state.json or earlier runs.
     """
-    state = load_state()
-    history = state.get("analytics_history", [])
-    history.append(run)
-    state["analytics_history"] = history
-    save_state(state)
+    try:
+        with open(HISTORY_FILE, "ab") as f:
+            f.write(_history_record(run).tobytes())
+    except Exception:
+        pass
+
+
+def load_analytics_history() -> np.ndarray:
+    """Binary history as a structured array (one row per run; missing fields are NaN)."""
+    try:
+        with open(HISTORY_FILE, "rb") as f:
+            data = f.read()
+    except OSError:
+        return np.zeros(0, dtype=HISTORY_DTYPE)
+    usable = len(data) - len(data) % HISTORY_DTYPE.itemsize  # ignore a torn trailing record
+    return np.frombuffer(data[:usable], dtype=HISTORY_DTYPE)
 
 
 def get_analytics_history() -> list:
     """
     Retrieve saved analytics runs.
+    Legacy entries from state.json come first, followed by the binary history.
     """
     state = load_state()
-    return state.get("analytics_history", [])
+    history = list(state.get("analytics_history", []))
+    for record in load_analytics_history():
+        run = {}
+        for name in HISTORY_DTYPE.names:
+            value = record[name].item()
+            if not (isinstance(value, float) and math.isnan(value)):
+                run[name] = value
+        history.append(run)
+    return history
@@ -1,6 +1,20 @@
 # -*- coding: utf-8 -*-
+import datetime
 import json
 import os
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from utils import journal_db
+from utils.trade import as_trades
+
+# Append-only journal format: one JSON record per line.
+#   - trade lines are plain trade dicts
+#   - session header lines are {"_session": {...session metadata...}}
+# A trade line whose id was already seen supersedes the earlier version.
+JSONL_EXT = ".jsonl"
+INDEX_EXT = ".idx"
+SESSION_KEY = "_session"
 
 
 def load_all_trades(path):
@@ -8,7 +22,19 @@ def load_all_trades(path):
     Load all trades from a JSON file.
     Always returns a flat list of trade dicts.
     Handles both flat trade lists and nested trade sessions.
+    If an append-only JSONL journal exists for this path it is read instead;
+    .db/.sqlite paths are read from the SQLite backend.
     """
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        trades = journal_db.load_trades(path)
+        print(f"[DEBUG] Parsed {len(trades)} trades -> {path}")
+        return trades
+    if path.endswith(JSONL_EXT):
+        trades = [t for s in _load_jsonl_sessions(path) for t in s["trades"]]
+        print(f"[DEBUG] Parsed {len(trades)} trades -> {path}")
+        return trades
+
     if not os.path.exists(path):
         print(f"[DEBUG] No journal file at {path}, returning []")
         return []
@@ -47,6 +73,16 @@ def load_sessions(path):
     Each session is a dict with a 'trades' list inside.
     Used by graduation/sandbox logic.
     """
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        sessions = journal_db.load_sessions(path)
+        print(f"[DEBUG] Parsed {len(sessions)} sessions -> {path}")
+        return sessions
+    if path.endswith(JSONL_EXT):
+        sessions = _load_jsonl_sessions(path)
+        print(f"[DEBUG] Parsed {len(sessions)} sessions -> {path}")
+        return sessions
+
     if not os.path.exists(path):
         print(f"[DEBUG] No journal file at {path}, returning []")
         return []
@@ -83,7 +119,19 @@ def save_trades(path, trades):
     """
     Save trades to a JSON file.
     Writes a flat list of trade dicts for simplicity.
+    If the journal has been migrated to JSONL, the JSONL file is rewritten instead.
     """
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path) or path.endswith(JSONL_EXT):
+        if trades and not isinstance(trades, list):
+            trades = [trades]
+        if journal_db.is_db_path(path):
+            journal_db.write_entries(path, trades or [])
+        else:
+            _write_jsonl(path, trades or [])
+        print(f"[DEBUG] Saved {len(trades or [])} entries -> {path}")
+        return
+
     if not trades:
         with open(path, "w", encoding="utf-8") as f:
             json.dump([], f, indent=2)
@@ -99,6 +147,648 @@ def save_trades(path, trades):
     print(f"[DEBUG] Saved {len(trades)} trades -> {path}")
 
 
+# ---------------------------
+# Streaming readers
+# ---------------------------
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def iter_trades(path):
+    """
+    Yield trade dicts one at a time without loading the whole journal.
+    Accepts the same layouts as load_all_trades (flat, nested sessions, JSONL, SQLite).
+    In a JSONL journal an updated trade is yielded once, in its latest version but at
+    the position it was first appended (the order load_all_trades returns).
+    """
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        yield from journal_db.iter_trades(path)
+        return
+    if path.endswith(JSONL_EXT):
+        for record in _iter_jsonl_latest(path):
+            if SESSION_KEY not in record:
+                yield record
+        return
+
+    for entry in _iter_json_entries(path):
+        if isinstance(entry.get("trades"), list):
+            yield from (t for t in entry["trades"] if isinstance(t, dict))
+        else:
+            yield entry
+
+
+def iter_sessions(path):
+    """
+    Yield sessions (dicts with a 'trades' list) one at a time.
+    Bare trades are wrapped as single-trade sessions, as in load_sessions; in a JSONL
+    journal an updated trade stays in the session it was first appended to.
+    Memory is bounded by the largest single session (plus the set of JSONL trade ids).
+    """
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        yield from journal_db.load_sessions(path)
+        return
+    if path.endswith(JSONL_EXT):
+        current = None
+        for record in _iter_jsonl_latest(path):
+            if SESSION_KEY in record:
+                if current is not None:
+                    yield current
+                current = dict(record[SESSION_KEY], trades=[])
+            elif current is not None:
+                current["trades"].append(record)
+            else:
+                yield {"trades": [record]}
+        if current is not None:
+            yield current
+        return
+
+    for entry in _iter_json_entries(path):
+        if isinstance(entry.get("trades"), list):
+            yield entry
+        else:
+            yield {"trades": [entry]}
+
+
+def _iter_json_entries(path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Incrementally decode the top-level entries of a legacy JSON journal.
+    A top-level array is decoded element by element; a single top-level
+    object is yielded as one entry.
+    """
+    if not os.path.exists(path):
+        print(f"[DEBUG] No journal file at {path}, returning []")
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = _skip_ws(buf, 0)
+        while pos == len(buf) and not eof:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            pos = _skip_ws(buf, pos)
+        if pos == len(buf):
+            return
+
+        if buf[pos] != "[":
+            try:
+                data = json.loads(buf[pos:] + f.read())
+            except json.JSONDecodeError:
+                print(f"[DEBUG] Failed to parse {path}, stopping")
+                return
+            if isinstance(data, dict):
+                yield data
+            return
+
+        pos += 1
+        while True:
+            pos = _skip_ws(buf, pos, ",")
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos == len(buf):
+                    raise json.JSONDecodeError("need more data", buf, pos)
+                obj, end = decoder.raw_decode(buf, pos)
+                if end == len(buf) and not eof:
+                    raise json.JSONDecodeError("value may continue", buf, end)
+            except json.JSONDecodeError:
+                if eof:
+                    print(f"[DEBUG] Failed to parse {path}, stopping")
+                    return
+                # Grow the window geometrically so one large entry is re-decoded
+                # O(log n) times rather than once per chunk
+                pending = buf[pos:]
+                chunk = f.read(max(chunk_size, len(pending)))
+                eof = not chunk
+                buf = pending + chunk
+                pos = 0
+                continue
+            if isinstance(obj, dict):
+                yield obj
+            pos = end
+
+
+def _skip_ws(buf, pos, extra=""):
+    while pos < len(buf) and (buf[pos].isspace() or buf[pos] in extra):
+        pos += 1
+    return pos
+
+
+def _iter_jsonl_latest(path):
+    """
+    Yield JSONL records with each trade at its first-seen position but carrying its
+    latest version (read through the offset index), as _load_jsonl_sessions orders them.
+    Later versions of a trade are skipped where they were appended.
+    """
+    if not os.path.exists(path):
+        return
+    index = _load_index(path)
+    seen = set()
+    with open(path, "rb") as latest:
+        for offset, record in _iter_jsonl_records(path):
+            if not isinstance(record, dict):
+                continue
+            trade_id = record.get("id")
+            if SESSION_KEY in record or trade_id is None:
+                yield record
+                continue
+            key = str(trade_id)
+            if key in seen:
+                continue
+            seen.add(key)
+            newest = index.get(key, offset)
+            if newest != offset:
+                latest.seek(newest)
+                try:
+                    record = json.loads(latest.readline())
+                except json.JSONDecodeError:
+                    print(f"[DEBUG] Skipping corrupt journal line at byte {newest} in {path}")
+            yield record
+
+
+# ---------------------------
+# Append-only JSONL journal
+# ---------------------------
+
+def jsonl_path(path):
+    """Return the JSONL journal path that belongs to a legacy JSON journal path."""
+    if path.endswith(JSONL_EXT):
+        return path
+    return os.path.splitext(path)[0] + JSONL_EXT
+
+
+def index_path(path):
+    """Return the sidecar offset index path for a JSONL journal."""
+    return jsonl_path(path) + INDEX_EXT
+
+
+def resolve_journal_path(path):
+    """
+    Return the file that actually backs a journal path.
+    A migrated JSONL journal takes precedence over the legacy JSON file.
+    """
+    if path.endswith(JSONL_EXT) or journal_db.is_db_path(path):
+        return path
+    candidate = jsonl_path(path)
+    if os.path.exists(candidate):
+        return candidate
+    return path
+
+
+def migrate_to_jsonl(path):
+    """
+    Convert a legacy JSON journal (flat list or nested sessions) to JSONL.
+    No-op if the JSONL journal already exists. Returns the JSONL path.
+    """
+    target = jsonl_path(path)
+    if os.path.exists(target):
+        return target
+
+    entries = []
+    if path != target and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"[DEBUG] Failed to parse {path}, migrating empty journal")
+                data = []
+        if isinstance(data, dict):
+            entries = [data]
+        elif isinstance(data, list):
+            entries = data
+
+    _write_jsonl(target, entries)
+    print(f"[DEBUG] Migrated {path} -> {target}")
+    return target
+
+
+def append_trade(path, trade):
+    """
+    Append a trade to the most recent session of a JSONL journal in O(1).
+    Legacy JSON journals are migrated on first append.
+    Publishes an "append" event to journal subscribers. A trade whose id is
+    already in the journal supersedes that record, so it is published as
+    "close" / "update" exactly as update_trade would.
+    """
+    before = journal_version(path)
+    target = path if journal_db.is_db_path(path) else migrate_to_jsonl(path)
+    previous = get_trade(target, trade["id"]) if trade.get("id") is not None else None
+    if journal_db.is_db_path(target):
+        journal_db.append_trade(target, trade)
+    else:
+        _append_record(target, trade)
+        print(f"[DEBUG] Appended trade {trade.get('id')} -> {target}")
+    if previous is None:
+        _publish("append", path, trade, before)
+    else:
+        was_closed = journal_db.trade_columns(previous)["status"] == "CLOSED"
+        closed = journal_db.trade_columns(trade)["status"] == "CLOSED"
+        _publish("close" if closed and not was_closed else "update", path, trade, before)
+    return trade
+
+
+def append_session(path, session):
+    """Start a new session in a JSONL journal. Any 'trades' key is ignored."""
+    meta = {k: v for k, v in session.items() if k != "trades"}
+    if journal_db.is_db_path(path):
+        journal_db.append_session(path, meta)
+        return meta
+    target = migrate_to_jsonl(path)
+    _append_record(target, {SESSION_KEY: meta})
+    return meta
+
+
+def get_trade(path, trade_id):
+    """Return the latest version of a trade by id using the offset index, or None."""
+    target = resolve_journal_path(path)
+    if journal_db.is_db_path(target):
+        return journal_db.get_trade(target, trade_id)
+    if not target.endswith(JSONL_EXT) or not os.path.exists(target):
+        return None
+    offset = _load_index(target).get(str(trade_id))
+    if offset is None:
+        return None
+    with open(target, "rb") as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+
+def update_trade(path, trade_id, fields):
+    """
+    Update a trade in O(1) by appending a new version of its record.
+    Returns the updated trade, or None if the id is unknown.
+    Publishes "close" if the update closed the trade, otherwise "update".
+    """
+    before = journal_version(path)
+    target = path if journal_db.is_db_path(path) else migrate_to_jsonl(path)
+    trade = get_trade(target, trade_id)
+    if trade is None:
+        print(f"[DEBUG] No trade {trade_id} in {target}")
+        return None
+    was_closed = journal_db.trade_columns(trade)["status"] == "CLOSED"
+    trade.update(fields)
+    if journal_db.is_db_path(target):
+        journal_db.update_trade(target, trade_id, fields)
+    else:
+        _append_record(target, trade)
+        print(f"[DEBUG] Updated trade {trade_id} -> {target}")
+    closed = journal_db.trade_columns(trade)["status"] == "CLOSED"
+    _publish("close" if closed and not was_closed else "update", path, trade, before)
+    return trade
+
+
+def compact_journal(path):
+    """Rewrite a JSONL journal without superseded trade versions."""
+    target = resolve_journal_path(path)
+    if not target.endswith(JSONL_EXT):
+        return target
+    _write_jsonl(target, _load_jsonl_sessions(target, keep_headerless=True))
+    return target
+
+
+# ---------------------------
+# Journal events
+# ---------------------------
+
+_SUBSCRIBERS = []
+
+
+def subscribe(callback):
+    """
+    Register callback(event, path, trade, previous_version) for journal writes.
+    event is "append", "update" or "close"; previous_version is the
+    journal_version() from just before the write, so subscribers can tell
+    whether their own state was current.
+    """
+    if callback not in _SUBSCRIBERS:
+        _SUBSCRIBERS.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    if callback in _SUBSCRIBERS:
+        _SUBSCRIBERS.remove(callback)
+
+
+def _publish(event, path, trade, previous_version):
+    for callback in list(_SUBSCRIBERS):
+        try:
+            callback(event, path, trade, previous_version)
+        except Exception as e:
+            print(f"[DEBUG] Journal subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+
+# ---------------------------
+# Query helpers
+# ---------------------------
+
+def _iso(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def trades_between(path, start, end, field="closed_date"):
+    """
+    Trades whose date field (closed_date or date) falls in [start, end], inclusive.
+    Uses the indexed column on the SQLite backend.
+    """
+    if field not in ("closed_date", "date"):
+        raise ValueError(f"Unsupported date field: {field}")
+    start, end = _iso(start), _iso(end)
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        return journal_db.load_trades(path, f"{field} BETWEEN ? AND ?", (start, end))
+    return [
+        t for t in load_all_trades(path)
+        if start <= (journal_db.day_of(journal_db.trade_columns(t)[field]) or "") <= end
+    ]
+
+
+def open_trades(path):
+    """Trades whose status is OPEN."""
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        return journal_db.load_trades(path, "status = ?", ("OPEN",))
+    return [t for t in load_all_trades(path) if journal_db.trade_columns(t)["status"] == "OPEN"]
+
+
+def by_symbol(path, symbol):
+    """Trades for one underlying symbol."""
+    path = resolve_journal_path(path)
+    if journal_db.is_db_path(path):
+        return journal_db.load_trades(path, "symbol = ?", (symbol,))
+    return [t for t in load_all_trades(path) if t.get("symbol") == symbol]
+
+
+def import_journal(src, dest):
+    """Copy a journal between formats (JSON, JSONL or SQLite), keeping sessions."""
+    save_trades(dest, load_sessions_raw(src))
+    return dest
+
+
+def export_journal(src, dest):
+    """Export any journal to a plain nested-session JSON file."""
+    with open(dest, "w", encoding="utf-8") as f:
+        json.dump(load_sessions_raw(src), f, indent=2)
+    return dest
+
+
+def load_sessions_raw(path):
+    """
+    Like load_sessions, but bare trades are returned as-is rather than wrapped,
+    so a flat journal round-trips as a flat journal.
+    """
+    return [
+        s["trades"][0] if set(s) == {"trades"} and len(s["trades"]) == 1 else s
+        for s in load_sessions(path)
+    ]
+
+
+def _write_jsonl(path, entries):
+    """Write legacy-style entries (trades and/or sessions) as JSONL and rebuild the index."""
+    _INDEX_CACHE.pop(os.path.abspath(path), None)
+    index = []
+    with open(path, "wb") as f:
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            if isinstance(entry.get("trades"), list):
+                meta = {k: v for k, v in entry.items() if k != "trades"}
+                _write_line(f, {SESSION_KEY: meta})
+                records = entry["trades"]
+            else:
+                records = [entry]
+            for trade in records:
+                if not isinstance(trade, dict):
+                    continue
+                offset = _write_line(f, trade)
+                if trade.get("id") is not None:
+                    index.append(f"{trade['id']}\t{offset}\n")
+    with open(index_path(path), "w", encoding="utf-8") as f:
+        f.writelines(index)
+
+
+def _write_line(f, record):
+    offset = f.tell()
+    f.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+    return offset
+
+
+def _append_record(path, record):
+    before = _file_stamp(path)
+    with open(path, "ab") as f:
+        offset = _write_line(f, record)
+    idx = index_path(path)
+    if record.get("id") is not None:
+        with open(idx, "a", encoding="utf-8") as f:
+            f.write(f"{record['id']}\t{offset}\n")
+    elif os.path.exists(idx):
+        os.utime(idx)  # keep the index marked fresh so it is not rebuilt
+
+    # Carry the in-memory index across our own append instead of re-reading the sidecar
+    key = os.path.abspath(path)
+    cached = _INDEX_CACHE.pop(key, None)
+    if cached and cached[0] == before:
+        if record.get("id") is not None and SESSION_KEY not in record:
+            cached[1][str(record["id"])] = offset
+        _INDEX_CACHE[key] = (_file_stamp(path), cached[1])
+    return offset
+
+
+_INDEX_CACHE = {}  # abs JSONL path -> ((mtime_ns, size), id -> byte offset)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _iter_jsonl_records(path):
+    """Yield (offset, record) for every parseable line of a JSONL journal."""
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                try:
+                    yield offset, json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[DEBUG] Skipping corrupt journal line at byte {offset} in {path}")
+            offset += len(line)
+
+
+def _load_index(path):
+    """
+    Load the id -> byte offset index for a JSONL journal (read-only; do not mutate).
+    Kept in memory per journal file stamp and patched by _append_record(), so
+    appends and updates in one process never re-read the sidecar. The sidecar
+    is rebuilt from a full scan if it is missing or older than the journal.
+    """
+    key = os.path.abspath(path)
+    stamp = _file_stamp(path)
+    cached = _INDEX_CACHE.get(key)
+    if cached and cached[0] == stamp and os.path.exists(index_path(path)):
+        return cached[1]
+    index = _read_index(path)
+    _INDEX_CACHE[key] = (stamp, index)
+    return index
+
+
+def _read_index(path):
+    idx = index_path(path)
+    if os.path.exists(idx) and os.stat(idx).st_mtime_ns >= os.stat(path).st_mtime_ns:
+        index = {}
+        with open(idx, "r", encoding="utf-8") as f:
+            for line in f:
+                trade_id, _, offset = line.rstrip("\n").rpartition("\t")
+                if trade_id:
+                    index[trade_id] = int(offset)
+        return index
+
+    index = {}
+    for offset, record in _iter_jsonl_records(path):
+        if isinstance(record, dict) and SESSION_KEY not in record and record.get("id") is not None:
+            index[str(record["id"])] = offset
+    with open(idx, "w", encoding="utf-8") as f:
+        f.writelines(f"{k}\t{v}\n" for k, v in index.items())
+    print(f"[DEBUG] Rebuilt journal index -> {idx}")
+    return index
+
+
+def _load_jsonl_sessions(path, keep_headerless=False):
+    """
+    Read a JSONL journal into legacy-shaped sessions.
+    Trades outside any session header become single-trade sessions, mirroring
+    how load_sessions treats flat JSON journals (or bare trades if keep_headerless).
+    """
+    if not os.path.exists(path):
+        print(f"[DEBUG] No journal file at {path}, returning []")
+        return []
+
+    entries = []
+    current = None
+    positions = {}  # trade id -> (entry, position in its trade list)
+    for _, record in _iter_jsonl_records(path):
+        if not isinstance(record, dict):
+            continue
+        if SESSION_KEY in record:
+            current = dict(record[SESSION_KEY], trades=[])
+            entries.append(current)
+            continue
+
+        trade_id = record.get("id")
+        if trade_id is not None and str(trade_id) in positions:
+            owner, i = positions[str(trade_id)]
+            if owner is None:
+                entries[i] = record if keep_headerless else {"trades": [record]}
+            else:
+                owner["trades"][i] = record
+            continue
+
+        if current is not None:
+            key = (current, len(current["trades"]))
+            current["trades"].append(record)
+        else:
+            key = (None, len(entries))
+            entries.append(record if keep_headerless else {"trades": [record]})
+        if trade_id is not None:
+            positions[str(trade_id)] = key
+
+    return entries
+
+
+# ---------------------------
+# Shared cached trade view
+# ---------------------------
+
+class TradeView(tuple):
+    """
+    Immutable, already-flattened sequence of read-only trade mappings.
+    Returned by load_trades_cached(); flatten_trades() passes it through untouched.
+    Callers that annotate trades (e.g. discipline checks) must copy them first.
+    """
+
+
+_JOURNAL_CACHE = {}  # (abs path, name) -> (version, value)
+
+
+def journal_version(path):
+    """
+    Return (path, st_mtime_ns, st_size) for the file that backs a journal.
+    Changes whenever the journal is written; mtime/size are None if it is missing.
+    """
+    path = os.path.abspath(resolve_journal_path(path))
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def cached_for_journal(path, name, build):
+    """
+    Memoize build(path) under `name` until the journal's version changes.
+    Shared by every derived structure that should only be rebuilt on journal edits.
+    """
+    version = journal_version(path)
+    key = (version[0], name)
+    cached = _JOURNAL_CACHE.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    value = build(path)
+    _JOURNAL_CACHE[key] = (version, value)
+    return value
+
+
+def store_cached(path, name, value):
+    """Replace the cached_for_journal() value under `name` for the journal's current version."""
+    version = journal_version(path)
+    _JOURNAL_CACHE[(version[0], name)] = (version, value)
+    return value
+
+
+def load_trades_cached(path):
+    """
+    Flattened, read-only trades for a journal, parsed only when the file changes.
+    Every module should read the journal through here during a dashboard render.
+    """
+    return cached_for_journal(
+        path,
+        "trades",
+        lambda p: TradeView(MappingProxyType(t) for t in flatten_trades(load_all_trades(p))),
+    )
+
+
+def load_trade_records(path):
+    """Normalized Trade records for a journal, built once per journal version."""
+    return cached_for_journal(path, "records", lambda p: as_trades(load_trades_cached(p)))
+
+
+def clear_trade_cache():
+    _JOURNAL_CACHE.clear()
+
+
+def flatten_trades(trades):
+    """Flatten nested lists of trades into a flat list of trade mappings."""
+    if isinstance(trades, TradeView):
+        return trades
+    flat = []
+    for t in trades:
+        if isinstance(t, (list, tuple)):
+            flat.extend(flatten_trades(t))
+        elif isinstance(t, Mapping):
+            flat.append(t)
+    return flat
+
+
 def enrich_session(trades):
     """
     Add extra metadata to a session of trades.
@@ -108,7 +798,7 @@ def enrich_session(trades):
       - discipline_ai with score
       - broker stub
     """
-    expectancy = sum(t.get("pnl", 0) for t in trades if isinstance(t, dict)) / max(len(trades), 1)
+    expectancy = sum(t.get("pnl", 0) for t in trades if isinstance(t, Mapping)) / max(len(trades), 1)
 
     enriched = {
         "mode": "SANDBOX",
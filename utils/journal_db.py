@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+utils/journal_db.py
+
+Optional SQLite backend for the trade journal.
+Selected by utils/journal.py whenever the journal path ends in .db / .sqlite.
+Each trade is stored as its original JSON plus indexed columns
+(symbol, date, closed_date, status, mode, strategy) for fast queries.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+DB_EXTS = (".db", ".sqlite", ".sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    meta TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_id TEXT UNIQUE,
+    session_id INTEGER REFERENCES sessions(id),
+    symbol TEXT,
+    date TEXT,
+    closed_date TEXT,
+    status TEXT,
+    mode TEXT,
+    strategy TEXT,
+    pnl REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol);
+CREATE INDEX IF NOT EXISTS idx_trades_date ON trades(date);
+CREATE INDEX IF NOT EXISTS idx_trades_closed_date ON trades(closed_date);
+CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status);
+CREATE INDEX IF NOT EXISTS idx_trades_mode ON trades(mode);
+CREATE INDEX IF NOT EXISTS idx_trades_strategy ON trades(strategy);
+"""
+
+_COLUMNS = ("trade_id", "session_id", "symbol", "date", "closed_date", "status", "mode", "strategy", "pnl", "data")
+
+
+def is_db_path(path):
+    return str(path).lower().endswith(DB_EXTS)
+
+
+def day_of(value):
+    """Trim a date or timestamp string to its day, so BETWEEN day bounds match timestamps."""
+    return value[:10] if isinstance(value, str) else value
+
+
+def trade_columns(trade, session_mode=None):
+    """
+    Derive the indexed column values for a trade dict.
+    Shared with the JSON/JSONL query fallbacks in utils/journal.py.
+    """
+    closed_date = trade.get("closed_date")
+    if not closed_date and isinstance(trade.get("closed_at"), str):
+        closed_date = trade["closed_at"]
+    closed_date = day_of(closed_date)
+
+    status = trade.get("status")
+    if status:
+        status = str(status).upper()
+    elif trade.get("closed") or closed_date or any(k in trade for k in ("pnl", "realized", "realized_pnl")):
+        status = "CLOSED"
+    else:
+        status = "OPEN"
+
+    pnl = trade.get("pnl", trade.get("realized", trade.get("realized_pnl")))
+    try:
+        pnl = float(pnl) if pnl is not None else None
+    except (TypeError, ValueError):
+        pnl = None
+
+    mode = trade.get("mode") or session_mode
+    return {
+        "symbol": trade.get("symbol"),
+        "date": trade.get("date"),
+        "closed_date": closed_date,
+        "status": status,
+        "mode": str(mode).upper() if mode else None,
+        "strategy": trade.get("strategy") or trade.get("type"),
+        "pnl": pnl,
+    }
+
+
+def connect(path):
+    """Open (and create if needed) a journal database."""
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _row(trade, session_id, session_mode):
+    cols = trade_columns(trade, session_mode)
+    trade_id = trade.get("id")
+    return (
+        str(trade_id) if trade_id is not None else None,
+        session_id,
+        cols["symbol"],
+        day_of(cols["date"]),
+        cols["closed_date"],
+        cols["status"],
+        cols["mode"],
+        cols["strategy"],
+        cols["pnl"],
+        json.dumps(trade),
+    )
+
+
+def _upsert(conn, rows):
+    conn.executemany(
+        f"INSERT INTO trades ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+        "ON CONFLICT(trade_id) DO UPDATE SET "
+        + ", ".join(f"{c}=excluded.{c}" for c in _COLUMNS if c not in ("trade_id", "session_id")),
+        rows,
+    )
+
+
+def _session_mode(conn, session_id):
+    if session_id is None:
+        return None
+    row = conn.execute("SELECT meta FROM sessions WHERE id = ?", (session_id,)).fetchone()
+    return json.loads(row[0]).get("mode") if row else None
+
+
+def write_entries(path, entries):
+    """Replace the database contents with legacy-style entries (trades and/or sessions)."""
+    with closing(connect(path)) as conn, conn:
+        conn.execute("DELETE FROM trades")
+        conn.execute("DELETE FROM sessions")
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            if isinstance(entry.get("trades"), list):
+                meta = {k: v for k, v in entry.items() if k != "trades"}
+                session_id = conn.execute(
+                    "INSERT INTO sessions (meta) VALUES (?)", (json.dumps(meta),)
+                ).lastrowid
+                trades = [t for t in entry["trades"] if isinstance(t, dict)]
+                _upsert(conn, [_row(t, session_id, meta.get("mode")) for t in trades])
+            else:
+                _upsert(conn, [_row(entry, None, None)])
+
+
+def append_session(path, meta):
+    with closing(connect(path)) as conn, conn:
+        conn.execute("INSERT INTO sessions (meta) VALUES (?)", (json.dumps(meta),))
+
+
+def append_trade(path, trade):
+    """Insert a trade into the most recent session (or replace it if its id exists)."""
+    with closing(connect(path)) as conn, conn:
+        row = conn.execute("SELECT MAX(id) FROM sessions").fetchone()
+        session_id = row[0] if row else None
+        _upsert(conn, [_row(trade, session_id, _session_mode(conn, session_id))])
+
+
+def get_trade(path, trade_id):
+    if not os.path.exists(path):
+        return None
+    with closing(connect(path)) as conn:
+        row = conn.execute("SELECT data FROM trades WHERE trade_id = ?", (str(trade_id),)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def update_trade(path, trade_id, fields):
+    with closing(connect(path)) as conn, conn:
+        row = conn.execute(
+            "SELECT data, session_id FROM trades WHERE trade_id = ?", (str(trade_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        trade = json.loads(row[0])
+        trade.update(fields)
+        _upsert(conn, [_row(trade, row[1], _session_mode(conn, row[1]))])
+    return trade
+
+
+def load_trades(path, where="", params=()):
+    """Return trade dicts in insertion order, optionally filtered by an SQL WHERE clause."""
+    if not os.path.exists(path):
+        return []
+    sql = "SELECT data FROM trades"
+    if where:
+        sql += f" WHERE {where}"
+    sql += " ORDER BY seq"
+    with closing(connect(path)) as conn:
+        return [json.loads(r[0]) for r in conn.execute(sql, params)]
+
+
+def iter_trades(path):
+    """Yield trade dicts straight from the cursor, in insertion order."""
+    if not os.path.exists(path):
+        return
+    with closing(connect(path)) as conn:
+        for (data,) in conn.execute("SELECT data FROM trades ORDER BY seq"):
+            yield json.loads(data)
+
+
+def load_sessions(path):
+    """
+    Return legacy-shaped sessions; trades outside a session become single-trade sessions.
+    Entries keep their stored order: a session sits where its first trade (by seq) does,
+    and sessions without trades precede the next session in id order (or come last).
+    """
+    if not os.path.exists(path):
+        return []
+    with closing(connect(path)) as conn:
+        sessions = {
+            sid: dict(json.loads(meta), trades=[])
+            for sid, meta in conn.execute("SELECT id, meta FROM sessions ORDER BY id")
+        }
+        order, placed, entries = list(sessions), set(), []
+        for sid, data in conn.execute("SELECT session_id, data FROM trades ORDER BY seq"):
+            if sid not in sessions:
+                entries.append({"trades": [json.loads(data)]})
+                continue
+            while sid not in placed:  # place this session, after earlier ones without trades so far
+                placed.add(order[len(placed)])
+                entries.append(sessions[order[len(placed) - 1]])
+            sessions[sid]["trades"].append(json.loads(data))
+    return entries + [sessions[sid] for sid in order[len(placed):]]
@@ -0,0 +1,111 @@
+"""
+utils/montecarlo.py
+
+Batched Monte Carlo equity-curve simulator.
+- Simulates N paths × M trades of fixed-fractional risk as one NumPy matrix per chunk
+- Chunks are seeded from one SeedSequence, so results are reproducible
+  with or without the optional process pool
+- Summarizes final-balance quantiles, max-drawdown distribution and ruin probability
+- run_and_record() stores each run in the binary analytics history (utils/helpers.py)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import helpers
+
+# Upper bound on path cells (chunk paths × trades) simulated at once (~8 MB of float64)
+MAX_CHUNK_CELLS = 1_000_000
+QUANTILES = (5, 25, 50, 75, 95)
+
+
+def _simulate_chunk(seed, paths, trades, winrate, reward_risk, risk_fraction, ruin_level):
+    """
+    Simulate one chunk of equity paths (balances relative to a start of 1.0).
+    Returns (final, max_drawdown, ruined) arrays of length `paths`.
+    """
+    rng = np.random.default_rng(seed)
+    wins = rng.random((paths, trades)) < winrate
+    # Fixed-fractional sizing: a win adds risk × R, a loss gives up the risked fraction
+    log_growth = np.where(wins, np.log1p(risk_fraction * reward_risk), np.log1p(-risk_fraction))
+    np.cumsum(log_growth, axis=1, out=log_growth)
+    equity = np.exp(log_growth, out=log_growth)
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 1.0, out=peak)  # the starting balance is the first peak
+    drawdown = 1.0 - (equity / peak).min(axis=1)
+    ruined = equity.min(axis=1) <= ruin_level
+    return equity[:, -1].copy(), drawdown, ruined
+
+
+def simulate(
+    n_paths=10_000,
+    n_trades=50,
+    winrate=0.55,
+    reward_risk=1.5,
+    risk_fraction=0.02,
+    start_balance=10_000,
+    ruin_level=0.5,
+    seed=None,
+    workers=None,
+    max_chunk_cells=MAX_CHUNK_CELLS,
+):
+    """
+    Run a batched Monte Carlo simulation.
+    Args:
+        n_paths: number of simulated equity curves
+        n_trades: trades per curve
+        winrate: probability of a winning trade (0-1)
+        reward_risk: average win as a multiple of the amount risked
+        risk_fraction: fraction of the balance risked per trade
+        start_balance: starting account balance
+        ruin_level: a path is ruined once its balance falls to this fraction of start
+        seed: int seed for reproducible runs
+        workers: spread chunks over a process pool of this size (None = in-process)
+    Returns dict with final-balance quantiles, drawdown distribution and ruin probability.
+    """
+    n_paths, n_trades = int(n_paths), int(n_trades)
+    if n_paths <= 0 or n_trades <= 0:
+        raise ValueError("n_paths and n_trades must be positive")
+    if not 0 < risk_fraction < 1:
+        raise ValueError("risk_fraction must be between 0 and 1")
+
+    rows_per_chunk = max(1, min(n_paths, max_chunk_cells // n_trades))
+    sizes = [rows_per_chunk] * (n_paths // rows_per_chunk)
+    if n_paths % rows_per_chunk:
+        sizes.append(n_paths % rows_per_chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (n_trades, winrate, reward_risk, risk_fraction, ruin_level)
+
+    if workers and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate_chunk, s, rows, *args) for s, rows in zip(seeds, sizes)]
+            parts = [f.result() for f in futures]
+    else:
+        parts = [_simulate_chunk(s, rows, *args) for s, rows in zip(seeds, sizes)]
+
+    final = np.concatenate([p[0] for p in parts]) * start_balance
+    drawdown = np.concatenate([p[1] for p in parts])
+    ruined = np.concatenate([p[2] for p in parts])
+
+    return {
+        "trades": n_trades,
+        "winrate": winrate,
+        "reward_risk": reward_risk,
+        "risk_fraction": risk_fraction,
+        "paths": n_paths,
+        "start_balance": start_balance,
+        "final_balance": float(np.median(final)),
+        "final_quantiles": {q: float(v) for q, v in zip(QUANTILES, np.percentile(final, QUANTILES))},
+        "drawdown_quantiles": {q: float(v) for q, v in zip(QUANTILES, np.percentile(drawdown, QUANTILES))},
+        "mean_drawdown": float(drawdown.mean()),
+        "ruin_probability": float(ruined.mean()),
+    }
+
+
+def run_and_record(**kwargs):
+    """Simulate and append the summary to the analytics history."""
+    result = simulate(**kwargs)
+    helpers.append_analytics_run(result)
+    return result
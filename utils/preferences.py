@@ -44,6 +44,18 @@ def load_preferences(path=PREFS_PATH):
     return prefs
 
 
+def preferences_version(path=PREFS_PATH):
+    """
+    (abs path, mtime_ns, size) of the preferences file; changes whenever it is rewritten.
+    Lets callers cache structures derived from preferences without re-reading the file.
+    """
+    try:
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (os.path.abspath(path), None, None)
+
+
 def save_preferences(prefs, path=PREFS_PATH):
     """
     Save preferences dict back to JSON file.
@@ -65,7 +77,8 @@ def default_preferences():
         "discipline_threshold": 50,
         "risk_limits": {
             "max_symbol_allocation": 0.3,
-            "max_expiry_cluster": 5
+            "max_expiry_cluster": 5,
+            "max_contract_skew": 0.8
         },
         "scaling_rules": {
             "base_contracts": 1,
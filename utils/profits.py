@@ -9,20 +9,11 @@ Phase 17: Profit Distribution & Tracking
 
 import datetime
 
-__all__ = ["calculate_profits", "evaluate_distribution", "calculate_expectancy"]
+from utils.journal import flatten_trades
+from utils.expectancy import compute_expectancy
+from utils.time_index import TimeIndex, load_time_index
 
-
-def _flatten_trades(trades):
-    """
-    Helper: flatten nested lists of trades into a flat list of dicts.
-    """
-    flat = []
-    for t in trades:
-        if isinstance(t, list):
-            flat.extend(_flatten_trades(t))  # recursive flatten
-        elif isinstance(t, dict):
-            flat.append(t)
-    return flat
+__all__ = ["calculate_profits", "calculate_journal_profits", "evaluate_distribution", "calculate_expectancy"]
 
 
 def calculate_profits(journal: list, prefs: dict = None) -> dict:
@@ -34,29 +25,29 @@ def calculate_profits(journal: list, prefs: dict = None) -> dict:
     Returns:
         dict with 'realized', 'withdraw', 'reinvest', 'messages'
     """
+    # Closed trades indexed by close date (trades are normalized and flattened on the way in)
+    index = TimeIndex.from_trades(journal)
+    month_start = datetime.date.today().replace(day=1)
+    realized = index.realized_between(start=month_start)
+
+    return _distribute(realized, prefs)
+
+
+def calculate_journal_profits(path: str, prefs: dict = None) -> dict:
+    """
+    Same as calculate_profits, but answers month-to-date from the journal's
+    cached time index (two binary searches, rebuilt only when the journal changes).
+    """
+    realized = load_time_index(path).month_to_date()["pnl"]
+    return _distribute(realized, prefs)
+
+
+def _distribute(realized: float, prefs: dict = None) -> dict:
+    """Turn a realized monthly profit into withdraw/reinvest suggestions."""
     prefs = prefs or {}
     withdrawal_pct = prefs.get("withdrawal_pct", 0.25)
     profit_goal = prefs.get("profit_goal", 1000)
 
-    # Always flatten trades first
-    trades = _flatten_trades(journal)
-
-    today = datetime.date.today()
-    month_start = today.replace(day=1)
-
-    realized = 0
-    for trade in trades:
-        closed = trade.get("closed", False)
-        pnl = trade.get("pnl", 0)
-        closed_date = trade.get("closed_date")
-        if closed and closed_date:
-            try:
-                c_date = datetime.datetime.strptime(closed_date, "%Y-%m-%d").date()
-                if c_date >= month_start:
-                    realized += pnl
-            except Exception:
-                continue
-
     withdraw = 0
     reinvest = 0
     messages = []
@@ -89,37 +80,24 @@ def calculate_profits(journal: list, prefs: dict = None) -> dict:
 def evaluate_distribution(session: dict) -> dict:
     """
     Wrapper to evaluate profit distribution from a session object.
-    Ensures trades are flattened before calculation.
+    Uses the journal's time index when the session carries a journal_path;
+    otherwise trades are flattened before calculation.
     """
     journal = session.get("trades", [])
     prefs = session.get("preferences", {})
 
-    flat_trades = _flatten_trades(journal)
+    if session.get("journal_path"):
+        return calculate_journal_profits(session["journal_path"], prefs)
+
+    flat_trades = flatten_trades(journal)
     return calculate_profits(flat_trades, prefs)
 
 
 def calculate_expectancy(trades: list) -> dict:
     """
     Calculate expectancy from a list of trades.
-    Expectancy = (avg win × win rate) − (avg loss × loss rate).
+    Expectancy = (avg win × win rate) − (avg loss × loss rate), which equals
+    the mean PnL (breakevens count as neither wins nor losses).
+    See utils/expectancy.py for the full set of returned statistics.
     """
-    trades = _flatten_trades(trades)
-
-    if not trades:
-        return {"expectancy": 0, "win_rate": 0, "avg_win": 0, "avg_loss": 0}
-
-    wins = [t.get("pnl", 0) for t in trades if t.get("pnl", 0) > 0]
-    losses = [t.get("pnl", 0) for t in trades if t.get("pnl", 0) <= 0]
-
-    win_rate = len(wins) / len(trades) if trades else 0
-    avg_win = sum(wins) / len(wins) if wins else 0
-    avg_loss = abs(sum(losses) / len(losses)) if losses else 0
-
-    expectancy = (win_rate * avg_win) - ((1 - win_rate) * avg_loss)
-
-    return {
-        "expectancy": expectancy,
-        "win_rate": win_rate * 100,  # percentage
-        "avg_win": avg_win,
-        "avg_loss": avg_loss,
-    }
+    return compute_expectancy(trades).as_dict()
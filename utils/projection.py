@@ -0,0 +1,122 @@
+"""
+utils/projection.py
+
+Graduation ETA projector.
+- Bootstraps future trade sequences from the journal's own closed trades (PnL and
+  stop-loss violations resampled together), N paths × horizon in one matrix
+- Tracks every check_graduation criterion along each path: trade count, clean
+  sessions, expectancy, win rate and the 3-losers-in-last-10 rule
+- Returns the distribution of trades, sessions and business-day dates until graduation
+- Cached per journal version and graduation preferences
+"""
+
+import datetime
+
+import numpy as np
+
+from utils.graduation import GraduationTracker, load_tracker
+from utils.journal import cached_for_journal
+from utils.preferences import load_preferences
+from utils.trade_table import load_trade_table
+
+QUANTILES = (10, 50, 90)
+MIN_SAMPLE = 5  # closed trades needed before projecting
+
+
+def _criteria(prefs):
+    grad_prefs = prefs.get("graduation", {})
+    return (
+        grad_prefs.get("min_trades", 25),
+        grad_prefs.get("clean_sessions", 15),
+        grad_prefs.get("min_win_rate", 55),
+    )
+
+
+def _simulate(path, criteria, n_paths, horizon, seed):
+    """Trades-to-graduation per simulated path (0 = already there, -1 = not within horizon)."""
+    min_trades, clean_required, min_win_rate = criteria
+    table = load_trade_table(path)
+    tracker = load_tracker(path)
+
+    closed = table.closed
+    pnl_pool = table.pnl[closed]
+    violation_pool = table.stop_violations()[closed]
+    if len(pnl_pool) < MIN_SAMPLE:
+        return None, 1
+
+    per_session = max(1, round(tracker.count / tracker.days)) if tracker.days else 1
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(pnl_pool), size=(n_paths, horizon), dtype=np.int32)
+    pnl = pnl_pool[idx]
+    violated = violation_pool[idx]
+    steps = np.arange(1, horizon + 1)
+
+    # Trade count, expectancy and win rate after k more trades (drawn from closed ones)
+    stats = tracker.expectancy
+    n_seen = stats.count + steps
+    expectancy = (stats.total_pnl + np.cumsum(pnl, axis=1)) / n_seen
+    win_rate = (stats.wins + np.cumsum(pnl > 0, axis=1)) / n_seen * 100
+    ok = (tracker.count + steps >= min_trades) & (expectancy > 0) & (win_rate >= min_win_rate)
+
+    # Clean sessions: future trades grouped into sessions of the journal's typical size
+    n_sessions = horizon // per_session
+    session_clean = ~violated[:, : n_sessions * per_session].reshape(n_paths, n_sessions, per_session).any(axis=2)
+    clean_done = np.zeros((n_paths, horizon + 1), dtype=np.int32)
+    ends = np.arange(1, n_sessions + 1) * per_session
+    clean_done[:, ends] = np.cumsum(session_clean, axis=1)
+    clean_done = np.maximum.accumulate(clean_done, axis=1)[:, 1:]
+    ok &= tracker.clean + clean_done >= clean_required
+
+    # Loss streak: any 3 consecutive losers ending inside the trailing 10-trade window
+    window = GraduationTracker.STREAK_WINDOW
+    history = np.array(tracker.recent_losses, dtype=bool)
+    losses = np.concatenate((np.broadcast_to(history, (n_paths, len(history))), pnl < 0), axis=1)
+    triples = np.zeros((n_paths, losses.shape[1] + 1), dtype=np.int32)
+    triples[:, 3:] = losses[:, 2:] & losses[:, 1:-1] & losses[:, :-2]
+    np.cumsum(triples, axis=1, out=triples)
+    end = len(history) + steps  # one past the latest trade, in combined positions
+    start = np.maximum(end - (window - 2), 0)
+    ok &= (triples[:, end] - triples[:, start]) == 0
+
+    first = np.where(ok.any(axis=1), ok.argmax(axis=1) + 1, -1)
+    return first, per_session
+
+
+def project_graduation(path, prefs=None, n_paths=2000, horizon=250, seed=0, today=None):
+    """
+    Distribution of how many more trades / sessions / days until graduation.
+    Returns dict with probability (within horizon), trades_needed, sessions_needed
+    and eta dates at the 10th / 50th / 90th percentiles, plus a summary message.
+    """
+    prefs = prefs if prefs is not None else load_preferences()
+    criteria = _criteria(prefs)
+    first, per_session = cached_for_journal(
+        path,
+        ("projection", criteria, n_paths, horizon, seed),
+        lambda p: _simulate(p, criteria, n_paths, horizon, seed),
+    )
+    result = {"paths": n_paths, "horizon": horizon, "trades_per_session": per_session}
+    if first is None:
+        result.update(probability=0.0, message=f"⏳ Need at least {MIN_SAMPLE} closed trades to project graduation")
+        return result
+
+    reached = first[first >= 0]
+    result["probability"] = float(len(reached)) / n_paths
+    if not len(reached):
+        result["message"] = f"⏳ Graduation not reached within {horizon} simulated trades at the current edge"
+        return result
+
+    trades = np.percentile(reached, QUANTILES, method="higher").astype(int)
+    sessions = -(-trades // per_session)
+    today = np.datetime64(today or datetime.date.today(), "D")
+    eta = np.busday_offset(today, sessions, roll="forward")
+    result["trades_needed"] = dict(zip(QUANTILES, trades.tolist()))
+    result["sessions_needed"] = dict(zip(QUANTILES, sessions.tolist()))
+    result["eta"] = dict(zip(QUANTILES, (str(d) for d in eta)))
+    result["message"] = (
+        f"⏳ Projected graduation in ~{trades[1]} trades / {sessions[1]} sessions "
+        f"(ETA {result['eta'][50]}, 80% range {result['eta'][10]} → {result['eta'][90]}; "
+        f"{result['probability']:.0%} of paths within {horizon} trades)"
+    )
+    return result
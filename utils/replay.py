@@ -0,0 +1,269 @@
+"""
+utils/replay.py
+
+Chronological replay of the journal under alternative preference sets.
+- Trades are put in time order (trade date, falling back to closed_date; undated first)
+- Preference-independent features are computed once as prefix arrays:
+  running expectancy / win rate, clean sessions, 3-losers-in-last-10 flags,
+  ladder contracts, reward:risk, planned risk and risk already open on entry
+- Each variant is then a handful of vectorized masks over those arrays:
+  graduation gate, scaling ladder (using the graduation state *before* each
+  trade), profitability and per-trade / portfolio risk caps
+- Variants run in parallel across a process pool; each returns counts and a
+  timeline of state transitions
+Rules mirror discipline.check_scaling_ladder (via its compiled Ladder), check_profitability
+(via profitability_masks), precheck_trade_entry, graduation.evaluate_graduation and
+scaling.check_scaling. Risk caps come from scaling.check_scaling, which only warns, so
+they never count as blocks.
+"""
+
+import copy
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.dates import NO_DATE
+from utils.discipline import MIN_REWARD_RISK, Ladder, profitability_masks, reward_risk_ratio
+from utils.graduation import GraduationTracker
+from utils.journal import cached_for_journal, load_trade_records
+from utils.preferences import load_preferences
+from utils.scaling import MAX_PORTFOLIO_RISK, MAX_TRADE_RISK
+from utils.trade import as_trades
+from utils.trade_table import TradeTable
+
+
+# -----------------------------
+# Shared features
+# -----------------------------
+
+def build_features(trades):
+    """Time-ordered, preference-independent arrays for a list of trades or records."""
+    records = as_trades(trades)
+    table = TradeTable.from_trades(records)
+    day = np.where(table.date != NO_DATE, table.date, table.closed_date)
+    order = np.argsort(day, kind="stable")
+    n = len(order)
+
+    pnl = table.pnl[order]
+    closed = table.closed[order]
+    date = table.date[order]
+    violation = table.stop_violations()[order]
+
+    # Running expectancy and win rate over all trades so far (graduation's definition)
+    end = np.arange(1, n + 1)
+    expectancy = np.cumsum(pnl) / np.maximum(end, 1)
+    win_rate = np.cumsum(pnl > 0) / np.maximum(end, 1) * 100
+
+    # Clean sessions so far = dates seen − dates that already had a stop-loss violation
+    dated = np.flatnonzero(date != NO_DATE)
+    new_day = np.zeros(n, dtype=np.int32)
+    _, first = np.unique(date[dated], return_index=True)
+    new_day[dated[first]] = 1
+    dirty_day = np.zeros(n, dtype=np.int32)
+    violating = dated[violation[dated]]
+    _, first_bad = np.unique(date[violating], return_index=True)
+    dirty_day[violating[first_bad]] = 1
+    clean_sessions = np.cumsum(new_day) - np.cumsum(dirty_day)
+
+    # Loss streak rule: no 3 consecutive losers inside the trailing window
+    window = GraduationTracker.STREAK_WINDOW
+    losses = pnl < 0
+    triples = np.zeros(n + 1, dtype=np.int64)
+    if n >= 3:
+        triples[3:] = losses[2:] & losses[1:-1] & losses[:-2]
+    np.cumsum(triples, out=triples)
+    streak_ok = (triples[end] - triples[np.maximum(end - (window - 2), 0)]) == 0
+
+    # Per-trade expectancy and reward:risk as check_profitability reads them: a stored
+    # "expectancy" wins over the trade's own PnL
+    stored = table.stored_expectancy[order]
+    trade_expectancy = np.where(np.isnan(stored), pnl, stored)
+    max_gain = table.max_gain[order]
+    raw_max_loss = np.nan_to_num(table.max_loss[order], nan=0.0)
+    _, reward_risk = reward_risk_ratio(max_gain, raw_max_loss)
+
+    # Risk on the books when each trade opens: dated trades opened so far minus those
+    # closed on an earlier day (closed trades without a close date close on entry)
+    closed_day = np.where(closed & (table.closed_date[order] == NO_DATE), date, table.closed_date[order])
+    closed_day = np.where(closed, closed_day, np.iinfo(np.int32).max)
+    risk_dated = np.where(date != NO_DATE, raw_max_loss, 0.0)
+    by_open = np.argsort(date, kind="stable")
+    by_close = np.argsort(closed_day, kind="stable")
+    opened = np.concatenate(([0.0], np.cumsum(risk_dated[by_open])))
+    released = np.concatenate(([0.0], np.cumsum(risk_dated[by_close])))
+    open_risk = (
+        opened[np.searchsorted(date[by_open], date, side="right")]
+        - released[np.searchsorted(closed_day[by_close], date, side="left")]
+    )
+    open_risk[date == NO_DATE] = raw_max_loss[date == NO_DATE]
+
+    return {
+        "ids": [records[i].id for i in order],
+        "date": date,
+        "pnl": pnl,
+        "contracts": table.contracts[order],
+        "trades": end,
+        "expectancy": expectancy,
+        "win_rate": win_rate,
+        "clean_sessions": clean_sessions,
+        "streak_ok": streak_ok,
+        "trade_expectancy": trade_expectancy,
+        "reward_risk": reward_risk,
+        "risk": raw_max_loss,
+        "open_risk": open_risk,
+    }
+
+
+def load_features(path):
+    """Replay features for a journal, rebuilt only when the journal changes."""
+    return cached_for_journal(path, "replay_features", lambda p: build_features(load_trade_records(p)))
+
+
+# -----------------------------
+# Per-variant evaluation
+# -----------------------------
+
+def graduation_mask(features, graduation_prefs):
+    """Whether evaluate_graduation's criteria hold after each trade."""
+    return (
+        (features["trades"] >= graduation_prefs.get("min_trades", 25))
+        & (features["expectancy"] > 0)
+        & (features["win_rate"] >= graduation_prefs.get("min_win_rate", 55))
+        & features["streak_ok"]
+        & (features["clean_sessions"] >= graduation_prefs.get("clean_sessions", 15))
+    )
+
+
+def ladder_allowed(features, ladder, graduated):
+    """Allowed rung per trade given the graduation state *before* it was placed."""
+    graduated_before = np.concatenate(([False], graduated[:-1]))
+    return ladder.allowed_many(features["contracts"], graduated_before)
+
+
+def risk_masks(features, prefs):
+    """(per-trade, portfolio) cap violations for prefs' account_size and risk_limits."""
+    limits = prefs.get("risk_limits", {})
+    account = prefs.get("account_size", 10000)
+    trade_cap = account * limits.get("max_trade_risk", MAX_TRADE_RISK)
+    portfolio_cap = account * limits.get("max_portfolio_risk", MAX_PORTFOLIO_RISK)
+    return features["risk"] > trade_cap, features["open_risk"] > portfolio_cap
+
+
+def _event(features, i, event, **extra):
+    date = int(features["date"][i])
+    return dict(
+        extra,
+        trade=int(i),
+        id=features["ids"][i],
+        date=datetime.date.fromordinal(date).isoformat() if date != NO_DATE else None,
+        event=event,
+    )
+
+
+def profit_mask(features, min_rr=MIN_REWARD_RISK):
+    """Trades check_profitability flags (negative expectancy or reward:risk below min_rr)."""
+    negative, low_rr = profitability_masks(features["trade_expectancy"], features["reward_risk"], min_rr)
+    return negative | low_rr
+
+
+def replay_variant(features, prefs, name=None):
+    """
+    Replay one preference set over precomputed features.
+    - ladder_violations: oversize trades check_scaling_ladder reports (enforce_live / warn_sim)
+    - blocked: LIVE trades precheck_trade_entry refuses (any oversize order, whatever enforce_live says)
+    - discipline_blocks: LIVE trades run_discipline_checks marks ❌ (enforced ladder or profitability)
+    """
+    n = len(features["pnl"])
+    ladder = Ladder.from_prefs(prefs)
+    mode = str(prefs.get("mode", "SIM")).upper()
+    live = mode == "LIVE"
+
+    graduated = graduation_mask(features, prefs.get("graduation", {}))
+    contracts = features["contracts"]
+    allowed = ladder_allowed(features, ladder, graduated)
+    oversize = contracts > allowed
+    ladder_violation = oversize if ladder.enforced(mode) else np.zeros(n, dtype=bool)
+    blocked = oversize if live else np.zeros(n, dtype=bool)
+
+    profit_violation = profit_mask(features, prefs.get("min_reward_risk", MIN_REWARD_RISK))
+    discipline_blocks = (ladder_violation | profit_violation) if live else np.zeros(n, dtype=bool)
+    risk_violation, portfolio_violation = risk_masks(features, prefs)
+
+    timeline = []
+    flips = np.flatnonzero(np.diff(graduated.astype(np.int8), prepend=0))
+    for i in flips:
+        timeline.append(_event(features, i, "graduated" if graduated[i] else "graduation_lost"))
+    for label, mask in (("first_ladder_violation", ladder_violation), ("first_block", blocked)):
+        hits = np.flatnonzero(mask)
+        if len(hits):
+            timeline.append(_event(features, hits[0], label, contracts=int(contracts[hits[0]]), allowed=int(allowed[hits[0]])))
+    timeline.sort(key=lambda e: e["trade"])
+
+    first_grad = flips[0] if len(flips) and graduated[flips[0]] else None
+    return {
+        "name": name,
+        "trades": n,
+        "graduated": bool(graduated[-1]) if n else False,
+        "graduated_at": _event(features, first_grad, "graduated") if first_grad is not None else None,
+        "ladder_violations": int(ladder_violation.sum()),
+        "blocked": int(blocked.sum()),
+        "discipline_blocks": int(discipline_blocks.sum()),
+        "profit_violations": int(profit_violation.sum()),
+        "risk_violations": int(risk_violation.sum()),
+        "portfolio_risk_violations": int(portfolio_violation.sum()),
+        "timeline": timeline,
+    }
+
+
+# -----------------------------
+# Variants and parallel driver
+# -----------------------------
+
+def merge_prefs(base, overrides):
+    """Overrides on top of base; nested dicts (ladder, graduation, ...) are merged one level deep."""
+    merged = copy.deepcopy(base)
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = dict(merged[key], **value)
+        else:
+            merged[key] = value
+    return merged
+
+
+_WORKER_FEATURES = None
+
+
+def _init_worker(features):
+    global _WORKER_FEATURES
+    _WORKER_FEATURES = features
+
+
+def _run_in_worker(args):
+    name, prefs = args
+    return replay_variant(_WORKER_FEATURES, prefs, name)
+
+
+def replay(source, variants=None, base_prefs=None, workers=None):
+    """
+    Replay a journal (path) or trade list under each preference variant.
+    Args:
+        source: journal path or list of trades
+        variants: {name: overrides} or list of overrides (default: the base prefs only)
+        base_prefs: preferences the overrides apply to (default load_preferences())
+        workers: evaluate variants in a process pool of this size (None = in-process)
+    Returns list of per-variant results in variant order.
+    """
+    features = load_features(source) if isinstance(source, str) else build_features(source)
+    base = base_prefs if base_prefs is not None else load_preferences()
+
+    if variants is None:
+        variants = {"current": {}}
+    if not isinstance(variants, dict):
+        variants = {f"variant_{i}": v for i, v in enumerate(variants)}
+    jobs = [(name, merge_prefs(base, overrides)) for name, overrides in variants.items()]
+
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features,)) as pool:
+            return list(pool.map(_run_in_worker, jobs))
+    return [replay_variant(features, prefs, name) for name, prefs in jobs]
@@ -10,54 +10,62 @@ Phase 15: Portfolio Scaling Rules
 Outputs plain-English warnings for the dashboard.
 """
 
-def check_scaling(portfolio: dict, account_size: float = 10000, max_trades: int = 5) -> dict:
+from collections.abc import Mapping
+
+from utils.attribution import AttributionCube, load_cube
+from utils.journal import flatten_trades
+
+STRATEGY_LIMITS = {"iron_condor": 2, "butterfly": 2, "vertical": 3}
+MAX_TRADE_RISK = 0.02  # max defined risk per trade, as a fraction of account equity
+MAX_PORTFOLIO_RISK = 0.05  # max total open risk, as a fraction of account equity
+
+
+def check_scaling(portfolio: dict, account_size: float = 10000, max_trades: int = 5,
+                  cube: AttributionCube = None, max_trade_risk: float = MAX_TRADE_RISK,
+                  max_portfolio_risk: float = MAX_PORTFOLIO_RISK) -> dict:
     """
     Evaluate portfolio scaling rules.
+    Symbol exposure, strategy counts and totals are read from an attribution
+    cube over the positions (pass a prebuilt one, e.g. attribution.load_cube(path)).
+    Risk caps are fractions of account_size (risk_limits.max_trade_risk / max_portfolio_risk).
     Returns dict with compliance status and messages.
     """
     messages = []
     compliant = True
 
-    positions = portfolio.get("positions", [])
-    total_risk = 0
-    symbol_exposure = {}
-    strategy_counts = {"iron_condor": 0, "butterfly": 0, "vertical": 0}
+    # Skip malformed entries gracefully
+    positions = [pos for pos in portfolio.get("positions", []) if isinstance(pos, Mapping)]
+    if cube is None:
+        cube = AttributionCube.from_trades(positions)
+
+    totals = cube.total()
+    total_risk = totals["max_loss"]
+    symbol_exposure = {
+        (sym or "Unknown"): cell["max_loss"] for sym, cell in cube.rollup("symbol").items()
+    }
+    by_strategy = cube.rollup("strategy")
+    strategy_counts = {k: by_strategy.get(k, {}).get("count", 0) for k in STRATEGY_LIMITS}
 
     # ---------------------------
     # Per-trade and total risk checks
     # ---------------------------
     for pos in positions:
-        if not isinstance(pos, dict):
-            # Skip malformed entries gracefully
-            continue
-
         sym = pos.get("symbol", "Unknown")
-        strat = str(pos.get("strategy", "")).lower()
         risk = float(pos.get("max_loss", 0))  # defined-risk per trade
-        total_risk += risk
-        symbol_exposure[sym] = symbol_exposure.get(sym, 0) + risk
-
-        # Count strategies
-        if "condor" in strat:
-            strategy_counts["iron_condor"] += 1
-        elif "butterfly" in strat:
-            strategy_counts["butterfly"] += 1
-        elif "vertical" in strat or "spread" in strat:
-            strategy_counts["vertical"] += 1
 
         # Max risk per trade
-        if risk > account_size * 0.02:  # >2% equity
+        if risk > account_size * max_trade_risk:
             compliant = False
             messages.append(
-                f"⚠️ {sym}: Trade risk {risk} exceeds 2% of account equity. "
+                f"⚠️ {sym}: Trade risk {risk} exceeds {max_trade_risk:.0%} of account equity. "
                 "Reduce contract size."
             )
 
     # Max portfolio risk
-    if total_risk > account_size * 0.05:  # >5% equity
+    if total_risk > account_size * max_portfolio_risk:
         compliant = False
         messages.append(
-            f"⚠️ Total portfolio risk {total_risk} exceeds 5% of account equity. "
+            f"⚠️ Total portfolio risk {total_risk} exceeds {max_portfolio_risk:.0%} of account equity. "
             "Close or reduce positions."
         )
 
@@ -80,7 +88,7 @@ def check_scaling(portfolio: dict, account_size: float = 10000, max_trades: int
     # ---------------------------
     # Max number of trades
     # ---------------------------
-    open_trades = sum(1 for p in positions if isinstance(p, dict))
+    open_trades = totals["count"]
     if open_trades > max_trades:
         compliant = False
         messages.append(
@@ -93,24 +101,23 @@ def check_scaling(portfolio: dict, account_size: float = 10000, max_trades: int
     # ---------------------------
     # Per-strategy limits
     # ---------------------------
-    if strategy_counts["iron_condor"] > 2:
+    if strategy_counts["iron_condor"] > STRATEGY_LIMITS["iron_condor"]:
         compliant = False
         messages.append(
-            f"⚠️ Too many Iron Condors ({strategy_counts['iron_condor']}). Limit is 2."
+            f"⚠️ Too many Iron Condors ({strategy_counts['iron_condor']}). Limit is {STRATEGY_LIMITS['iron_condor']}."
         )
-    if strategy_counts["butterfly"] > 2:
+    if strategy_counts["butterfly"] > STRATEGY_LIMITS["butterfly"]:
         compliant = False
         messages.append(
-            f"⚠️ Too many Butterflies ({strategy_counts['butterfly']}). Limit is 2."
+            f"⚠️ Too many Butterflies ({strategy_counts['butterfly']}). Limit is {STRATEGY_LIMITS['butterfly']}."
         )
-    if strategy_counts["vertical"] > 3:
+    if strategy_counts["vertical"] > STRATEGY_LIMITS["vertical"]:
         compliant = False
         messages.append(
-            f"⚠️ Too many Verticals ({strategy_counts['vertical']}). Limit is 3."
+            f"⚠️ Too many Verticals ({strategy_counts['vertical']}). Limit is {STRATEGY_LIMITS['vertical']}."
         )
 
-    if all(count <= limit for count, limit in zip(
-        strategy_counts.values(), [2, 2, 3])):
+    if all(strategy_counts[k] <= limit for k, limit in STRATEGY_LIMITS.items()):
         messages.append("✅ Strategy mix is within safe limits.")
 
     # ---------------------------
@@ -126,15 +133,13 @@ def check_allocation(session: dict) -> dict:
     """
     Alias wrapper so app_dash.py can call scaling.check_allocation(session).
     """
-    trades = session.get("trades", [])
-    # Flatten in case of nested lists
-    flat_positions = []
-    for t in trades:
-        if isinstance(t, list):
-            flat_positions.extend(t)
-        else:
-            flat_positions.append(t)
-
-    portfolio = {"positions": flat_positions}
+    # Flatten in case of nested lists (no-op for the cached journal view)
+    portfolio = {"positions": flatten_trades(session.get("trades", []))}
     account_size = session.get("account_size", 10000)
-    return check_scaling(portfolio, account_size=account_size)
+    cube = load_cube(session["journal_path"]) if session.get("journal_path") else None
+    limits = session.get("preferences", {}).get("risk_limits", {})
+    return check_scaling(
+        portfolio, account_size=account_size, cube=cube,
+        max_trade_risk=limits.get("max_trade_risk", MAX_TRADE_RISK),
+        max_portfolio_risk=limits.get("max_portfolio_risk", MAX_PORTFOLIO_RISK),
+    )
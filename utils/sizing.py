@@ -0,0 +1,171 @@
+"""
+utils/sizing.py
+
+Kelly / optimal-f position sizing from the journal's closed trades.
+- PnL is normalized per contract and grouped by symbol and by strategy bucket
+- Kelly fraction from win rate and payoff ratio, scaled down to fractional Kelly
+- Optimal-f (Vince) by evaluating the log terminal wealth ratio over a whole
+  fraction grid at once, in chunks of trades to bound memory
+- Contract recommendations are capped by the per-trade risk cap
+  (risk_limits.max_trade_risk, default scaling.MAX_TRADE_RISK)
+- Cached per journal version (see load_sizing)
+"""
+
+import numpy as np
+
+from utils.attribution import normalize_strategy
+from utils.journal import cached_for_journal
+from utils.scaling import MAX_TRADE_RISK
+from utils.trade_table import TradeTable, load_trade_table
+
+KELLY_FRACTION = 0.5  # half-Kelly by default
+MIN_SIZING_TRADES = 10  # closed trades needed before a group gets a recommendation
+FRACTION_GRID = np.arange(1, 100) / 100  # optimal-f candidates 0.01 .. 0.99
+MAX_CHUNK_CELLS = 1_000_000  # grid × trades cells evaluated at once
+
+
+def kelly(pnl):
+    """Win rate, payoff ratio (avg win / avg loss) and Kelly fraction W − (1 − W) / R."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+    win_rate = len(wins) / len(pnl) if len(pnl) else 0.0
+    if not len(losses):
+        payoff, fraction = None, (1.0 if len(wins) else 0.0)
+    elif not len(wins):
+        payoff, fraction = 0.0, 0.0
+    else:
+        payoff = float(wins.mean() / -losses.mean())
+        fraction = win_rate - (1 - win_rate) / payoff
+    return {"win_rate": win_rate, "payoff": payoff, "kelly": max(0.0, float(fraction))}
+
+
+def optimal_f(pnl, grid=FRACTION_GRID, max_chunk_cells=MAX_CHUNK_CELLS):
+    """
+    Fraction f maximizing TWR = Π(1 + f · pnl / |largest loss|), searched over grid.
+    Returns {"f", "geo_mean", "largest_loss"}; f is None when there are no losses.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    grid = np.asarray(grid, dtype=np.float64)
+    worst = float(pnl.min()) if len(pnl) else 0.0
+    if worst >= 0:
+        return {"f": None, "geo_mean": None, "largest_loss": None}
+
+    hpr = pnl / -worst  # holding-period returns at f = 1 (the worst trade loses everything)
+    log_twr = np.zeros(len(grid))
+    step = max(1, max_chunk_cells // len(grid))
+    for lo in range(0, len(hpr), step):
+        log_twr += np.log1p(grid[:, None] * hpr[None, lo:lo + step]).sum(axis=1)
+
+    best = int(log_twr.argmax())
+    return {
+        "f": float(grid[best]),
+        "geo_mean": float(np.exp(log_twr[best] / len(pnl))),
+        "largest_loss": -worst,
+    }
+
+
+def _size_group(pnl, risk, account_size, kelly_fraction, max_trade_risk):
+    stats = {"trades": int(len(pnl))}
+    stats.update(kelly(pnl))
+    opt = optimal_f(pnl)
+    stats["optimal_f"] = opt["f"]
+    stats["geo_mean"] = opt["geo_mean"]
+    stats["fractional_kelly"] = stats["kelly"] * kelly_fraction
+
+    # Risk per contract: planned max loss when the journal has it, else the worst realized loss
+    planned = risk[~np.isnan(risk)]
+    risk_per_contract = float(planned.mean()) if len(planned) else opt["largest_loss"]
+    stats["risk_per_contract"] = risk_per_contract
+    if len(pnl) < MIN_SIZING_TRADES:
+        stats["unsized"] = "trades"
+    elif not risk_per_contract:
+        stats["unsized"] = "risk"  # no planned max_loss and no losing trade to measure risk by
+    else:
+        stats["unsized"] = None
+    if stats["unsized"]:
+        stats.update(kelly_contracts=None, optimal_f_contracts=None, cap_contracts=None, recommended_contracts=None)
+        return stats
+
+    stats["kelly_contracts"] = int(account_size * stats["fractional_kelly"] // risk_per_contract)
+    stats["optimal_f_contracts"] = (
+        int(account_size * opt["f"] // opt["largest_loss"]) if opt["f"] is not None else None
+    )
+    stats["cap_contracts"] = int(account_size * max_trade_risk // risk_per_contract)
+    stats["recommended_contracts"] = min(stats["kelly_contracts"], stats["cap_contracts"])
+    return stats
+
+
+def _by_group(codes, labels, pnl, risk, *sizing_args):
+    report = {}
+    for code, label in enumerate(labels):
+        mask = codes == code
+        if mask.any():
+            report[label] = _size_group(pnl[mask], risk[mask], *sizing_args)
+    return report
+
+
+def sizing_table(table: TradeTable, account_size=10000, kelly_fraction=KELLY_FRACTION,
+                 max_trade_risk=MAX_TRADE_RISK):
+    """Per-symbol and per-strategy sizing stats for a TradeTable's closed trades."""
+    closed = table.closed
+    contracts = np.maximum(table.contracts[closed], 1)
+    pnl = table.pnl[closed] / contracts
+    risk = table.max_loss[closed] / contracts
+
+    # Strategy codes re-encoded onto normalized buckets (e.g. "Iron Condor" -> iron_condor)
+    buckets = [normalize_strategy(s) for s in table.strategies]
+    strategy_labels = list(dict.fromkeys(buckets))
+    remap = np.array([strategy_labels.index(b) for b in buckets] + [-1], dtype=np.int32)
+    strategy = remap[table.strategy[closed]]  # -1 (no strategy) indexes the trailing -1
+
+    args = (account_size, kelly_fraction, max_trade_risk)
+    return {
+        "account_size": account_size,
+        "kelly_fraction": kelly_fraction,
+        "max_trade_risk": max_trade_risk,
+        "by_symbol": _by_group(table.symbol[closed], table.symbols, pnl, risk, *args),
+        "by_strategy": _by_group(strategy, strategy_labels, pnl, risk, *args),
+    }
+
+
+def load_sizing(path, account_size=10000, kelly_fraction=KELLY_FRACTION, max_trade_risk=MAX_TRADE_RISK):
+    """Sizing stats for a journal, recomputed only when the journal changes."""
+    return cached_for_journal(
+        path,
+        ("sizing", account_size, kelly_fraction, max_trade_risk),
+        lambda p: sizing_table(load_trade_table(p), account_size, kelly_fraction, max_trade_risk),
+    )
+
+
+def recommend(session: dict) -> dict:
+    """
+    Recommended contracts per symbol for the dashboard's scaling card.
+    Returns dict with per-symbol stats and messages.
+    """
+    prefs = session.get("preferences", {})
+    account_size = session.get("account_size", 10000)
+    kelly_fraction = prefs.get("sizing", {}).get("kelly_fraction", KELLY_FRACTION)
+    max_trade_risk = prefs.get("risk_limits", {}).get("max_trade_risk", MAX_TRADE_RISK)
+    args = (account_size, kelly_fraction, max_trade_risk)
+    if session.get("journal_path"):
+        table = load_sizing(session["journal_path"], *args)
+    else:
+        table = sizing_table(TradeTable.from_trades(session.get("trades", [])), *args)
+
+    messages = []
+    for sym, stats in table["by_symbol"].items():
+        if stats["unsized"] == "trades":
+            messages.append(
+                f"ℹ️ {sym}: {stats['trades']} closed trades — need {MIN_SIZING_TRADES} for a sizing estimate."
+            )
+            continue
+        if stats["unsized"] == "risk":
+            messages.append(f"ℹ️ {sym}: no max_loss or losing trades recorded — cannot size by risk yet.")
+            continue
+        opt = f"{stats['optimal_f']:.2f}" if stats["optimal_f"] is not None else "n/a"
+        messages.append(
+            f"📏 {sym}: recommended {stats['recommended_contracts']} contract(s) "
+            f"(Kelly×{kelly_fraction:g} {stats['fractional_kelly']:.1%}, optimal-f {opt}, "
+            f"{max_trade_risk:.0%} cap {stats['cap_contracts']})."
+        )
+    return {"per_symbol": table["by_symbol"], "messages": messages}
@@ -0,0 +1,210 @@
+"""
+utils/sweep.py
+
+Parameter sweeps over the hand-tuned thresholds in preferences.json.
+- Search space keys are dotted preference paths, values are candidate lists:
+  {"graduation.min_trades": [10, 25, 50], "ladder.contracts": [[1, 2, 5], [1, 3, 6]],
+   "risk_limits.max_trade_risk": [0.01, 0.02]}
+  (a (low, high) tuple is a uniform range for random search)
+- grid() enumerates every combination, sample() draws n of them at random
+- Replay features are built once per journal version and shared by every
+  combination; graduation, ladder and risk masks are memoized per distinct
+  sub-setting, so a combination costs a few array reductions
+- Combinations are split across a process pool and come back as a ranked table
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.discipline import MIN_REWARD_RISK, Ladder
+from utils.preferences import load_preferences
+from utils.replay import build_features, graduation_mask, load_features, merge_prefs, profit_mask, risk_masks
+
+RANK_COLUMNS = (
+    "compliant_pnl", "max_drawdown", "trades_to_graduate", "ladder_violations",
+    "risk_violations", "portfolio_risk_violations", "profit_violations",
+)
+
+
+# -----------------------------
+# Search space
+# -----------------------------
+
+def grid(space):
+    """Every combination of the candidate lists, as {dotted_key: value} dicts."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def sample(space, n, seed=None):
+    """n random combinations; lists are sampled uniformly, (low, high) tuples as ranges."""
+    rng = np.random.default_rng(seed)
+    draws = []
+    for _ in range(n):
+        params = {}
+        for key, values in space.items():
+            if isinstance(values, tuple) and len(values) == 2:
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    params[key] = int(rng.integers(low, high + 1))
+                else:
+                    params[key] = float(rng.uniform(low, high))
+            else:
+                params[key] = values[int(rng.integers(len(values)))]
+        draws.append(params)
+    return draws
+
+
+def to_overrides(params):
+    """{"graduation.min_trades": 10} -> {"graduation": {"min_trades": 10}}."""
+    overrides = {}
+    for key, value in params.items():
+        section, _, name = key.partition(".")
+        if name:
+            overrides.setdefault(section, {})[name] = value
+        else:
+            overrides[section] = value
+    return overrides
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+
+def _memo(cache, key, build):
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = build()
+    return value
+
+
+def score(features, prefs, cache=None):
+    """
+    Score one preference set against the journal history.
+    "Compliant" trades are those the ladder and both risk caps would have let through;
+    oversize only counts where the ladder is enforced for prefs["mode"] (enforce_live / warn_sim),
+    as in replay_variant.
+    cache: dict reused across calls to share masks between combinations.
+    """
+    cache = {} if cache is None else cache
+    grad_prefs = prefs.get("graduation", {})
+    rungs = tuple(prefs.get("ladder", {}).get("contracts", [1]) or [1])
+    limits = prefs.get("risk_limits", {})
+
+    grad_key = tuple(grad_prefs.get(k) for k in ("min_trades", "min_win_rate", "clean_sessions"))
+    graduated = _memo(cache, ("graduated", grad_key), lambda: graduation_mask(features, grad_prefs))
+    over_ungraduated, over_diff = _memo(cache, ("rungs", rungs), lambda: _ladder_masks(features, rungs))
+    risk_key = (prefs.get("account_size", 10000), limits.get("max_trade_risk"), limits.get("max_portfolio_risk"))
+    trade_risk, portfolio_risk = _memo(cache, ("risk", risk_key), lambda: risk_masks(features, prefs))
+    min_rr = prefs.get("min_reward_risk", MIN_REWARD_RISK)
+    profit_violations = _memo(cache, ("profit", min_rr), lambda: np.count_nonzero(profit_mask(features, min_rr)))
+
+    # Oversize against the rungs in force before each trade: the full ladder once graduated
+    n = len(graduated)
+    graduated_before = np.concatenate(([False], graduated[:-1]))
+    oversize = over_ungraduated ^ (graduated_before & over_diff)
+    if not Ladder.from_prefs(prefs).enforced(str(prefs.get("mode", "SIM"))):
+        oversize = np.zeros(n, dtype=bool)
+    compliant = ~(oversize | trade_risk | portfolio_risk)
+
+    # Equity of the compliant trades only, in reusable scratch buffers
+    equity, peak = _memo(cache, ("scratch", n), lambda: (np.empty(n), np.empty(n)))
+    np.multiply(features["pnl"], compliant, out=equity)
+    np.cumsum(equity, out=equity)
+    np.maximum.accumulate(equity, out=peak)
+    np.maximum(peak, 0.0, out=peak)
+    drawdown = float(np.subtract(peak, equity, out=peak).max()) if n else 0.0
+
+    ever = bool(graduated.any())
+    return {
+        "graduated": bool(graduated[-1]) if n else False,
+        "trades_to_graduate": int(graduated.argmax()) + 1 if ever else None,
+        "ladder_violations": int(np.count_nonzero(oversize)),
+        "risk_violations": int(np.count_nonzero(trade_risk)),
+        "portfolio_risk_violations": int(np.count_nonzero(portfolio_risk)),
+        "profit_violations": int(profit_violations),
+        "compliant_trades": int(np.count_nonzero(compliant)),
+        "compliant_pnl": float(equity[-1]) if n else 0.0,
+        "max_drawdown": drawdown,
+    }
+
+
+def _ladder_masks(features, rungs):
+    """(oversize before graduation, where graduating changes the answer) for one ladder."""
+    contracts = features["contracts"]
+    ladder = Ladder(rungs)
+    over_ungraduated = contracts > ladder.allowed_many(contracts, False)
+    return over_ungraduated, over_ungraduated ^ (contracts > ladder.allowed_many(contracts, True))
+
+
+_WORKER_FEATURES = None
+
+
+def _init_worker(features):
+    global _WORKER_FEATURES
+    _WORKER_FEATURES = features
+
+
+def _score_chunk(jobs, features=None):
+    features = _WORKER_FEATURES if features is None else features
+    cache = {}
+    return [(i, score(features, prefs, cache)) for i, prefs in jobs]
+
+
+def _rank_key(rank_by, descending):
+    def key(row):
+        value = row[rank_by]
+        if value is None:  # e.g. never graduated: always last
+            return (1, 0)
+        return (0, -value if descending else value)
+    return key
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+
+def sweep(source, space, n_samples=None, base_prefs=None, workers=None, seed=None,
+          rank_by="compliant_pnl", descending=None, top=None):
+    """
+    Evaluate a grid (or n_samples random draws) of preference overrides over a journal.
+    Args:
+        source: journal path or list of trades
+        space: {dotted_key: candidates} (see module docstring)
+        n_samples: random search with this many draws instead of the full grid
+        base_prefs: preferences the overrides apply to (default load_preferences())
+        workers: process pool size (None = in-process)
+        rank_by: result column to sort on (see RANK_COLUMNS); descending defaults to
+            True for compliant_pnl and False for drawdown / violations / trades_to_graduate
+        top: keep only the first `top` rows
+    Returns ranked list of rows: {"rank", "params", **score(...)}.
+    """
+    if rank_by not in RANK_COLUMNS:
+        raise ValueError(f"Unknown rank column: {rank_by}")
+    if descending is None:
+        descending = rank_by == "compliant_pnl"
+
+    features = load_features(source) if isinstance(source, str) else build_features(source)
+    base = base_prefs if base_prefs is not None else load_preferences()
+    combos = sample(space, n_samples, seed) if n_samples else grid(space)
+    jobs = [(i, merge_prefs(base, to_overrides(params))) for i, params in enumerate(combos)]
+
+    # Neighbouring jobs share graduation settings, so each chunk's mask cache stays warm
+    grad_keys = [sorted(p.get("graduation", {}).items()) for _, p in jobs]
+    jobs = [jobs[i] for i in sorted(range(len(jobs)), key=lambda i: repr(grad_keys[i]))]
+
+    if workers and workers > 1 and len(jobs) > 1:
+        chunks = [list(c) for c in np.array_split(np.arange(len(jobs)), workers * 4) if len(c)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features,)) as pool:
+            parts = pool.map(_score_chunk, [[jobs[i] for i in chunk] for chunk in chunks])
+            scored = [row for part in parts for row in part]
+    else:
+        scored = _score_chunk(jobs, features)
+
+    rows = [dict(params=combos[i], **result) for i, result in scored]
+    rows.sort(key=_rank_key(rank_by, descending))
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    return rows[:top] if top else rows
@@ -0,0 +1,123 @@
+"""
+utils/time_index.py
+
+Prefix-sum time index over the journal.
+- Trades sorted by day ordinal (closed_date for realized PnL, date for sessions)
+- Cumulative PnL, win and stop-loss violation counts, so any date-range
+  query is two binary searches and three subtractions
+- Per-day session stats (clean sessions, trades today) from the same arrays
+- Rebuilt lazily, once per journal version (see load_time_index)
+"""
+
+import datetime
+
+import numpy as np
+
+from utils.dates import NO_DATE, to_ordinal
+from utils.journal import cached_for_journal
+from utils.trade_table import TradeTable, load_trade_table
+
+FIELDS = ("closed_date", "date")
+
+
+class TimeIndex:
+    """Day-sorted trades with prefix sums of PnL, wins and violations."""
+
+    def __init__(self, days, pnl, violations):
+        order = np.argsort(days, kind="stable")
+        self.days = days[order]
+        n = len(self.days)
+        self.cum_pnl = np.zeros(n + 1, dtype=np.float64)
+        self.cum_wins = np.zeros(n + 1, dtype=np.int64)
+        self.cum_violations = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(pnl[order], out=self.cum_pnl[1:])
+        np.cumsum(pnl[order] > 0, out=self.cum_wins[1:])
+        np.cumsum(violations[order], out=self.cum_violations[1:])
+
+    @classmethod
+    def from_table(cls, table, field="closed_date"):
+        """
+        Index a TradeTable by field: "closed_date" covers closed trades (realized PnL),
+        "date" covers every dated trade (trading sessions).
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unsupported date field: {field}")
+        days = table.closed_date if field == "closed_date" else table.date
+        mask = days != NO_DATE
+        if field == "closed_date":
+            mask &= table.closed
+        return cls(days[mask], table.pnl[mask], table.stop_violations()[mask])
+
+    @classmethod
+    def from_trades(cls, trades, field="closed_date"):
+        return cls.from_table(TradeTable.from_trades(trades), field)
+
+    def __len__(self):
+        return len(self.days)
+
+    # -----------------------------
+    # Range queries
+    # -----------------------------
+
+    def _bounds(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.days, to_ordinal(start), side="left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, to_ordinal(end), side="right"))
+        return lo, max(lo, hi)
+
+    def range(self, start=None, end=None):
+        """Totals for start <= day <= end (either bound may be None for open-ended)."""
+        lo, hi = self._bounds(start, end)
+        return {
+            "trades": hi - lo,
+            "pnl": float(self.cum_pnl[hi] - self.cum_pnl[lo]),
+            "wins": int(self.cum_wins[hi] - self.cum_wins[lo]),
+            "violations": int(self.cum_violations[hi] - self.cum_violations[lo]),
+        }
+
+    def realized_between(self, start=None, end=None):
+        lo, hi = self._bounds(start, end)
+        return float(self.cum_pnl[hi] - self.cum_pnl[lo])
+
+    def month_to_date(self, today=None):
+        today = today or datetime.date.today()
+        return self.range(today.replace(day=1), today)
+
+    def week_to_date(self, today=None):
+        today = today or datetime.date.today()
+        return self.range(today - datetime.timedelta(days=today.weekday()), today)
+
+    def day(self, date=None):
+        """Totals for a single trading day (default today)."""
+        date = date or datetime.date.today()
+        return self.range(date, date)
+
+    # -----------------------------
+    # Sessions
+    # -----------------------------
+
+    def sessions(self):
+        """
+        Per-day arrays (days, trades, pnl, wins, violations), one entry per distinct day.
+        Computed from the prefix sums at the day boundaries.
+        """
+        if not len(self.days):
+            empty = np.zeros(0, dtype=np.int64)
+            return {"days": empty, "trades": empty, "pnl": empty.astype(np.float64), "wins": empty, "violations": empty}
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(self.days)) + 1))
+        ends = np.append(starts[1:], len(self.days))
+        return {
+            "days": self.days[starts],
+            "trades": ends - starts,
+            "pnl": self.cum_pnl[ends] - self.cum_pnl[starts],
+            "wins": self.cum_wins[ends] - self.cum_wins[starts],
+            "violations": self.cum_violations[ends] - self.cum_violations[starts],
+        }
+
+    def clean_sessions(self):
+        """Number of days with trades and no stop-loss violations."""
+        return int(np.count_nonzero(self.sessions()["violations"] == 0))
+
+
+def load_time_index(path, field="closed_date"):
+    """Time index for a journal, rebuilt only when the journal changes."""
+    return cached_for_journal(path, ("time_index", field), lambda p: TimeIndex.from_table(load_trade_table(p), field))
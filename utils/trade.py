@@ -0,0 +1,126 @@
+"""
+utils/trade.py
+
+Compact trade record.
+- One normalization pass turns loose journal dicts into Trade records
+- Canonical fields: PnL is read from pnl / realized / realized_pnl, strategy from strategy / type
+- __slots__ keeps per-trade memory and attribute access cheap
+"""
+
+from collections.abc import Mapping
+
+from utils.journal_db import trade_columns
+
+# max_loss assumed by the clean-session / stop-loss rule when a trade has none
+DEFAULT_MAX_LOSS = -100
+
+
+def _float(value, default=None):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class Trade:
+    """Normalized, read-only view of one journal trade."""
+
+    __slots__ = (
+        "id",
+        "symbol",
+        "strategy",
+        "mode",
+        "status",
+        "date",
+        "closed_date",
+        "expiry",
+        "pnl",
+        "max_loss",
+        "max_gain",
+        "contracts",
+        "expectancy",
+    )
+
+    def __init__(self, id=None, symbol=None, strategy=None, mode=None, status="OPEN", date=None,
+                 closed_date=None, expiry=None, pnl=0.0, max_loss=None, max_gain=None, contracts=0,
+                 expectancy=None):
+        self.id = id
+        self.symbol = symbol
+        self.strategy = strategy
+        self.mode = mode
+        self.status = status
+        self.date = date
+        self.closed_date = closed_date
+        self.expiry = expiry
+        self.pnl = pnl
+        self.max_loss = max_loss
+        self.max_gain = max_gain
+        self.contracts = contracts
+        self.expectancy = expectancy  # stored per-trade expectancy, if the journal has one
+
+    @classmethod
+    def from_mapping(cls, t):
+        """Normalize one trade dict (or read-only mapping) into a Trade."""
+        cols = trade_columns(t)
+        try:
+            contracts = int(t.get("contracts") or 0)
+        except (TypeError, ValueError):
+            contracts = 0
+        return cls(
+            id=t.get("id"),
+            symbol=cols["symbol"],
+            strategy=cols["strategy"],
+            mode=cols["mode"] or "",
+            status=cols["status"],
+            date=cols["date"],
+            closed_date=cols["closed_date"],
+            expiry=t.get("expiry") or t.get("expiration"),
+            pnl=cols["pnl"] if cols["pnl"] is not None else 0.0,
+            max_loss=_float(t.get("max_loss")),
+            max_gain=_float(t.get("max_gain")),
+            contracts=contracts,
+            expectancy=_float(t.get("expectancy")),
+        )
+
+    @property
+    def closed(self):
+        return self.status == "CLOSED"
+
+    def exceeded_max_loss(self):
+        """True if the loss went past the planned max loss (stop-loss violation)."""
+        max_loss = self.max_loss if self.max_loss is not None else DEFAULT_MAX_LOSS
+        return self.pnl < -max_loss
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Trade(id={self.id!r}, symbol={self.symbol!r}, pnl={self.pnl!r}, status={self.status!r})"
+
+
+class TradeRecords(tuple):
+    """Tuple of Trade records that has already been through normalization."""
+
+
+def iter_records(trades):
+    """
+    Yield Trade records from trades, records or nested lists.
+    Mappings are normalized on the fly; Trade records pass straight through.
+    """
+    if isinstance(trades, TradeRecords):
+        yield from trades
+        return
+    for t in trades:
+        if isinstance(t, Trade):
+            yield t
+        elif isinstance(t, Mapping):
+            yield Trade.from_mapping(t)
+        elif isinstance(t, (list, tuple)):
+            yield from iter_records(t)
+
+
+def as_trades(trades):
+    """Normalize once; an existing TradeRecords is returned unchanged."""
+    if isinstance(trades, TradeRecords):
+        return trades
+    return TradeRecords(iter_records(trades))
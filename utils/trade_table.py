@@ -0,0 +1,139 @@
+"""
+utils/trade_table.py
+
+Columnar trade table for analytics hot paths.
+- NumPy columns: pnl, max_loss, max_gain, stored expectancy, contracts, date / closed_date
+  ordinals, symbol and strategy codes
+- Built once per journal version (see load_trade_table)
+- Vectorized expectancy, win rate, clean sessions, loss streaks and realized profit
+"""
+
+import datetime
+
+import numpy as np
+
+from utils.dates import NO_DATE, to_ordinal, to_ordinals
+from utils.expectancy import expectancy_from_array
+from utils.journal import cached_for_journal, load_trade_records
+from utils.trade import DEFAULT_MAX_LOSS, as_trades
+
+def _encode(values):
+    """Map labels to int32 codes; returns (codes, labels). None maps to -1."""
+    labels, lookup = [], {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is None:
+            codes[i] = -1
+            continue
+        code = lookup.get(v)
+        if code is None:
+            code = lookup[v] = len(labels)
+            labels.append(v)
+        codes[i] = code
+    return codes, labels
+
+
+class TradeTable:
+    """Column-oriented copy of a journal's trades, in journal order."""
+
+    def __init__(self, pnl, max_loss, contracts, date, closed_date, closed, symbol, strategy, symbols, strategies,
+                 max_gain=None, stored_expectancy=None):
+        self.pnl = pnl
+        self.max_loss = max_loss
+        self.max_gain = max_gain if max_gain is not None else np.zeros(len(pnl))  # 0 where missing
+        self.stored_expectancy = (  # a trade's own "expectancy" field, NaN where not stored
+            stored_expectancy if stored_expectancy is not None else np.full(len(pnl), np.nan)
+        )
+        self.contracts = contracts
+        self.date = date
+        self.closed_date = closed_date
+        self.closed = closed
+        self.symbol = symbol
+        self.strategy = strategy
+        self.symbols = symbols
+        self.strategies = strategies
+
+    @classmethod
+    def from_trades(cls, trades):
+        records = as_trades(trades)
+        n = len(records)
+        symbol, symbols = _encode([t.symbol for t in records])
+        strategy, strategies = _encode([t.strategy for t in records])
+        return cls(
+            pnl=np.fromiter((t.pnl for t in records), dtype=np.float64, count=n),
+            max_loss=np.fromiter(
+                (t.max_loss if t.max_loss is not None else np.nan for t in records), dtype=np.float64, count=n
+            ),
+            contracts=np.fromiter((t.contracts for t in records), dtype=np.int32, count=n),
+            date=to_ordinals(t.date for t in records),
+            closed_date=to_ordinals(t.closed_date for t in records),
+            closed=np.fromiter((t.closed for t in records), dtype=bool, count=n),
+            symbol=symbol,
+            strategy=strategy,
+            symbols=symbols,
+            strategies=strategies,
+            max_gain=np.fromiter((t.max_gain or 0.0 for t in records), dtype=np.float64, count=n),
+            stored_expectancy=np.fromiter(
+                (t.expectancy if t.expectancy is not None else np.nan for t in records), dtype=np.float64, count=n
+            ),
+        )
+
+    def __len__(self):
+        return len(self.pnl)
+
+    # -----------------------------
+    # Vectorized metrics
+    # -----------------------------
+
+    def expectancy(self):
+        """Expectancy statistics, as analytics.calculate_expectancy (see utils/expectancy.py)."""
+        return expectancy_from_array(self.pnl).as_dict()
+
+    def stop_violations(self):
+        """Boolean mask of trades that lost more than their planned max loss."""
+        max_loss = np.where(np.isnan(self.max_loss), DEFAULT_MAX_LOSS, self.max_loss)
+        return self.pnl < -max_loss
+
+    def clean_sessions(self):
+        """Number of trade dates with no stop-loss violations."""
+        dated = self.date != NO_DATE
+        if not dated.any():
+            return 0
+        days = self.date[dated]
+        offset = days - days.min()
+        counts = np.bincount(offset)
+        violations = np.bincount(offset, weights=self.stop_violations()[dated])
+        return int(np.count_nonzero((counts > 0) & (violations == 0)))
+
+    def max_loss_streak(self, last=None):
+        """Longest run of consecutive losing trades (optionally over the last N trades; N <= 0 is empty)."""
+        if last is None:
+            pnl = self.pnl
+        else:
+            pnl = self.pnl[-last:] if last > 0 else self.pnl[:0]
+        losing = np.concatenate(([False], pnl < 0, [False]))
+        edges = np.flatnonzero(np.diff(losing.astype(np.int8)))
+        if not len(edges):
+            return 0
+        return int((edges[1::2] - edges[::2]).max())
+
+    def realized_between(self, start, end):
+        """Sum of PnL for closed trades with start <= closed_date <= end."""
+        start, end = to_ordinal(start), to_ordinal(end)
+        mask = self.closed & (self.closed_date >= start) & (self.closed_date <= end)
+        return float(self.pnl[mask].sum())
+
+    def month_to_date_realized(self, today=None):
+        today = today or datetime.date.today()
+        return self.realized_between(today.replace(day=1), today)
+
+    def symbol_counts(self):
+        """Trades per symbol, as {symbol: count}."""
+        known = self.symbol[self.symbol >= 0]
+        counts = np.bincount(known, minlength=len(self.symbols))
+        return {sym: int(c) for sym, c in zip(self.symbols, counts)}
+
+
+def load_trade_table(path):
+    """Columnar table for a journal, rebuilt only when the journal changes."""
+    return cached_for_journal(path, "table", lambda p: TradeTable.from_trades(load_trade_records(p)))